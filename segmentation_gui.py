@@ -0,0 +1,2191 @@
+# -*- coding: utf-8 -*-
+import sys
+import os
+import pandas as pd
+import numpy as np
+from enum import Enum
+import time
+from functools import partial
+
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+from matplotlib.patches import Polygon
+from PyQt5.QtWidgets import QApplication, QStyle, QWidget, QVBoxLayout, QHBoxLayout, QFileDialog, QSizePolicy, QLabel, \
+        QPushButton, QRubberBand, QFileSystemModel, QTreeView, QSlider, QComboBox, QMessageBox, QTableView, \
+        QGroupBox, QGridLayout, QCheckBox
+from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
+from PyQt5.QtMultimediaWidgets import QVideoWidget
+from PyQt5.QtCore import Qt, QUrl, pyqtSignal, QTimer, QSize, QRect, QDir, QModelIndex, QObject, QRunnable, \
+        QThreadPool, QAbstractTableModel, QLineF, QRectF, QPointF
+from PyQt5.QtGui import QFont, QBrush, QColor, QPainter, QPixmap, QPen, QImage
+try:
+    import pyqtgraph as pg
+    PlotWidget = pg.PlotWidget
+except ImportError:  # pyqtgraph为可选绘图后端
+    pg = None
+    PlotWidget = QWidget
+from segmentation_system import PatientCache, find_patient_folders, classify_source, extract_process_folder, \
+        direct_envelope, build_pyramids, WINDOW_LENGTHS, DEFAULT_WINDOW, time_window_ends, PaddedSignal, \
+        SignalWindow, build_signal_index, audio_window_ends, prepare_audio, prepare_table, SEGMENT_MODELS, \
+        PREDICTION_FILE, segment_model_version, segment_signals, FEATURE_PARAMS, load_spectrogram, build_spectrogram, \
+        read_frame_index, AnnotationStore, read_predictions, write_predictions
+
+
+class State(Enum):
+    IDLE = 1
+    RUNNING = 2
+    PAUSED = 3
+    STOPPED = 4
+
+
+def show_message(message, closeFlg=True):
+    msg = QMessageBox()
+    msg.setIcon(QMessageBox.Icon.Information)
+    msg.setText(message)
+    msg.setWindowTitle("提示")
+    if closeFlg:
+        QTimer.singleShot(1000, msg.close)
+    msg.exec_()
+
+
+class Console(QWidget):
+    '''
+    控制台
+    '''
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.treetogle = QPushButton(self, text="显示目录")
+        self.treetogle.setIcon(QApplication.style().standardIcon(QStyle.StandardPixmap.SP_ArrowLeft))
+
+        self.openButton = QPushButton(self, text="打开文件")
+        self.openButton.setIcon(QApplication.style().standardIcon(QStyle.StandardPixmap.SP_DirHomeIcon))
+
+        self.stopbutton = QPushButton(self, text="停止")
+        self.stopbutton.setIcon(QApplication.style().standardIcon(QStyle.StandardPixmap.SP_MediaStop))
+
+        self.playButton = QPushButton(self, text="播放")
+        self.playButton.setIcon(QApplication.style().standardIcon(QStyle.StandardPixmap.SP_MediaPlay))
+
+        self.preButton = QPushButton(self, text="上一个")
+        self.preButton.setIcon(QApplication.style().standardIcon(QStyle.StandardPixmap.SP_MediaSkipBackward))
+
+        self.nextButton = QPushButton(self, text="下一个")
+        self.nextButton.setIcon(QApplication.style().standardIcon(QStyle.StandardPixmap.SP_MediaSkipForward))
+
+        self.backButton = QPushButton(self, text="后退1秒(30帧)")
+        self.preFrameButton = QPushButton(self, text="后退1帧")
+        self.quickButton = QPushButton(self, text="前进1帧")
+
+        self.checkbox = QCheckBox("删除模式")
+        self.spectrogram_checkbox = QCheckBox("频谱图")
+
+        self.window_label = QLabel("显示窗口")
+        self.window_comboBox = QComboBox()
+        self.window_comboBox.addItems([f"{window_length / 1000:g}s" for window_length in WINDOW_LENGTHS])
+        self.window_comboBox.setCurrentIndex(WINDOW_LENGTHS.index(DEFAULT_WINDOW))
+
+        horizontalLayout = QHBoxLayout()
+        horizontalLayout.addWidget(self.treetogle)
+        horizontalLayout.addWidget(self.openButton)
+        horizontalLayout.addWidget(self.stopbutton)
+        horizontalLayout.addWidget(self.playButton)
+        horizontalLayout.addWidget(self.preButton)
+        horizontalLayout.addWidget(self.nextButton)
+        horizontalLayout.addWidget(self.backButton)
+        horizontalLayout.addWidget(self.preFrameButton)
+        horizontalLayout.addWidget(self.quickButton)
+        horizontalLayout.addWidget(self.checkbox)
+        horizontalLayout.addWidget(self.spectrogram_checkbox)
+        horizontalLayout.addWidget(self.window_label)
+        horizontalLayout.addWidget(self.window_comboBox)
+
+        self.contrlSlider = QSlider(self)
+        self.contrlSlider.setOrientation(Qt.Orientation.Horizontal)
+        self.contrlSlider.setValue(0)
+
+        self.time_label = QLabel()
+        self.time_label.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Maximum)
+        self.time_label.setText("00:00:00:000 ms")
+
+        slider_layout = QHBoxLayout()
+        slider_layout.addWidget(self.contrlSlider)
+        slider_layout.addWidget(self.time_label)
+
+        self.get_positon_button = QPushButton(self, text="设置当前时间")
+        self.swallow_record = QPushButton(self, text="吞咽")
+        self.detail_swallow1 = QPushButton(self, text="口腔期")
+        self.detail_swallow2 = QPushButton(self, text="咽期")
+        self.detail_swallow3 = QPushButton(self, text="食管期")
+        self.detail_swallow4 = QPushButton(self, text="吞咽前")
+        self.detail_swallow5 = QPushButton(self, text="吞咽暂停")
+        self.detail_swallow6 = QPushButton(self, text="吞咽后")
+
+        self.segment_label = QLabel()
+        self.segment_label.setText("00:00:00:000 - 00:00:00:000 ms")
+        self.segment_pre_time = 0
+        self.segment_aft_time = 0
+
+        self.segment_groupBox = QGroupBox("吞咽分割")
+        segment_layout = QGridLayout()
+        segment_layout.addWidget(self.swallow_record, 0, 0)
+        segment_layout.addWidget(self.get_positon_button, 0, 1)
+        segment_layout.addWidget(self.segment_label, 0, 2)
+        segment_layout.addWidget(self.detail_swallow1, 1, 0)
+        segment_layout.addWidget(self.detail_swallow2, 1, 1)
+        segment_layout.addWidget(self.detail_swallow3, 1, 2)
+        segment_layout.addWidget(self.detail_swallow4, 2, 0)
+        segment_layout.addWidget(self.detail_swallow5, 2, 1)
+        segment_layout.addWidget(self.detail_swallow6, 2, 2)
+        self.segment_groupBox.setLayout(segment_layout)
+
+        self.selected_model_label = QLabel("选择模型")
+        self.model_comboBox = QComboBox()
+        self.model_comboBox.addItems(SEGMENT_MODELS)
+        self.model_segment_button = QPushButton(self, text="模型吞咽分割")
+        self.detail_segment_button = QPushButton(self, text="模型细分割")
+        self.model_groupBox = QGroupBox("模型分割")
+
+        model_layout = QVBoxLayout()
+        h_layout = QHBoxLayout()
+        h_layout.addWidget(self.selected_model_label, 1)
+        h_layout.addWidget(self.model_comboBox, 4)
+        model_layout.addLayout(h_layout)
+        model_layout.addWidget(self.model_segment_button)
+        model_layout.addWidget(self.detail_segment_button)
+        self.model_groupBox.setLayout(model_layout)
+
+        verti_layout = QVBoxLayout()
+        verti_layout.addLayout(slider_layout)
+        verti_layout.addLayout(horizontalLayout)
+        h_layout = QHBoxLayout()
+        h_layout.addWidget(self.model_groupBox, 1)
+        h_layout.addWidget(self.segment_groupBox, 4)
+        verti_layout.addLayout(h_layout)
+        self.setLayout(verti_layout)
+
+    def set_icon(self, icon_type):
+        self.playButton.setIcon(QApplication.style().standardIcon(icon_type))
+
+    def set_slider_duration(self, duration):
+        self.contrlSlider.setRange(0, duration)
+
+    def set_cur_time(self, postion):
+        self.segment_pre_time = self.segment_aft_time
+        self.segment_aft_time = postion
+        self.segment_label.setText(f"{format_time(self.segment_pre_time)} - {format_time(self.segment_aft_time)} ms")
+
+
+class TreeWidget(QWidget):
+    '''
+    目录控件
+    '''
+    select_file = pyqtSignal(str)
+    select_folder = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.treeview = QTreeView(self)
+        self.model = QFileSystemModel(self)
+        self.model.setRootPath(QDir.currentPath() + "/..")
+        self.model.setNameFilterDisables(False)
+        self.model.setNameFilters(["*.csv", "*.mp4", "*.wav", "*.avi", "*.json"])
+        self.treeview.setModel(self.model)
+        self.treeview.setColumnHidden(1, True)
+        self.treeview.setColumnHidden(2, True)
+        self.treeview.setColumnHidden(3, True)
+        self.treeview.setRootIndex(self.model.index(self.model.rootPath()))
+        self.treeview.clicked.connect(self.treeview_clicked)
+        self.folders = []
+        self.current_fold_idx = -1
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.treeview)
+        self.setLayout(layout)
+
+    def treeview_clicked(self, index: QModelIndex):
+        '''
+        选择文件
+        '''
+        file_path = self.model.filePath(index)
+        self.select_file.emit(file_path)
+
+    def tree_open(self):
+        '''
+        打开文件夹
+        '''
+        fileroot = QFileDialog.getExistingDirectory(self, 'open')
+        self.model.setRootPath(fileroot)
+        self.treeview.setRootIndex(self.model.index(fileroot))
+        self.folders = find_patient_folders(fileroot)
+        self.current_fold_idx = -1
+        self.next()
+
+    def next(self):
+        if self.current_fold_idx < len(self.folders) - 1:
+            self.current_fold_idx += 1
+            self.select_folder.emit(self.folders[self.current_fold_idx], "已切换下一个病人")
+
+    def pre(self):
+        if self.current_fold_idx > 0:
+            self.current_fold_idx -= 1
+            self.select_folder.emit(self.folders[self.current_fold_idx], "已切换上一个病人")
+
+
+class PrefetchTask(QRunnable):
+    '''
+    后台预取任务, 只写入缓存
+    '''
+
+    def __init__(self, cache, filepath, load_func):
+        super().__init__()
+        self.cache = cache
+        self.filepath = filepath
+        self.load_func = load_func
+
+    def run(self):
+        try:
+            self.cache.load(self.filepath, self.load_func)
+        except Exception:
+            pass  # 预取失败不影响使用, 正式切换时会再次加载并提示
+
+
+class LoadTask(QRunnable):
+    '''
+    后台加载任务, 结果通过PatientLoader的信号回到界面线程
+    '''
+
+    def __init__(self, loader, generation, filepath, load_func):
+        super().__init__()
+        self.loader = loader
+        self.generation = generation
+        self.filepath = filepath
+        self.load_func = load_func
+
+    def run(self):
+        if self.generation != self.loader.generation:
+            return  # 已被新的加载取消
+        try:
+            if self.loader.cache is not None:
+                result = self.loader.cache.load(self.filepath, self.load_func)
+            else:
+                result = self.load_func(self.filepath)
+        except Exception as e:
+            self.loader.failed.emit(self.generation, self.filepath, str(e))
+            return
+        self.loader.loaded.emit(self.generation, self.filepath, result)
+
+
+class PatientLoader(QObject):
+    '''
+    病人数据后台加载
+    每个文件(模态)一个线程池任务, 完成一个应用一个; 再次加载时作废未完成的任务
+    '''
+    loaded = pyqtSignal(int, str, object)
+    failed = pyqtSignal(int, str, str)
+    finished = pyqtSignal(list)
+
+    def __init__(self, parent=None, cache=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.pool = QThreadPool(self)
+        self.generation = 0
+        self.pending = 0
+        self.errors = []
+        self.appliers = {}
+        self.loaded.connect(self.on_loaded)
+        self.failed.connect(self.on_failed)
+
+    def load(self, tasks):
+        '''
+        提交一组(文件路径, 后台加载函数, 界面应用函数)
+        '''
+        self.generation += 1
+        self.pool.clear()
+        self.pending = len(tasks)
+        self.errors = []
+        self.appliers = {filepath: apply_func for filepath, _, apply_func in tasks}
+        for filepath, load_func, _ in tasks:
+            self.pool.start(LoadTask(self, self.generation, filepath, load_func))
+        if not tasks:
+            self.finished.emit([])
+
+    def prefetch(self, tasks):
+        '''
+        以低优先级预取一组(文件路径, 加载函数)到缓存
+        '''
+        if self.cache is None:
+            return
+        for filepath, load_func in tasks:
+            if filepath not in self.cache:
+                self.pool.start(PrefetchTask(self.cache, filepath, load_func), -1)
+
+    def on_loaded(self, generation, filepath, result):
+        if generation != self.generation:
+            return
+        try:
+            self.appliers[filepath](result)
+        except Exception as e:
+            self.errors.append(f"{os.path.basename(filepath)}: {e}")
+        self.task_done()
+
+    def on_failed(self, generation, filepath, message):
+        if generation != self.generation:
+            return
+        self.errors.append(f"{os.path.basename(filepath)}: {message}")
+        self.task_done()
+
+    def task_done(self):
+        self.pending -= 1
+        if self.pending == 0:
+            self.finished.emit(self.errors)
+
+
+class IndexTask(QRunnable):
+    '''
+    后台建立完整索引任务
+    '''
+
+    def __init__(self, indexer, filepath, signal_window, interval):
+        super().__init__()
+        self.indexer = indexer
+        self.filepath = filepath
+        self.signal_window = signal_window
+        self.interval = interval
+
+    def run(self):
+        try:
+            build_signal_index(self.filepath, self.signal_window, self.interval)
+        except Exception:
+            self.signal_window.building = False
+            return  # 建立失败时继续按窗口直接计算
+        self.indexer.indexed.emit(self.signal_window)
+
+
+class SignalIndexer(QObject):
+    '''
+    文件打开后在后台补建逐步y轴范围和包络金字塔, 完成后在界面线程通知
+    '''
+    indexed = pyqtSignal(object)
+
+    def build(self, filepath, signal_window, interval):
+        if signal_window.pyramids is None and not signal_window.building:
+            signal_window.building = True
+            QThreadPool.globalInstance().start(IndexTask(self, filepath, signal_window, interval), -1)
+
+
+class PlotBackend:
+    '''
+    绘图后端接口
+    统一数据源/显示窗口/y轴范围/框选区域/刷新, 以及鼠标框选信号signal_select
+    '''
+
+    def init_backend(self, length):
+        self.length = length
+        self.columns = None
+        self.pyramids = None
+        self.ylim = None
+        self.rubberBand = QRubberBand(QRubberBand.Shape.Rectangle, self)
+        self.rubberBand.hide()
+        self.origin = None
+
+    def set_source(self, data, pyramids=None):
+        '''
+        设置整段绘图数据, 可传入预先建立的包络金字塔; 金字塔未建立时直接由数据计算包络
+        '''
+        if not isinstance(data, PaddedSignal):
+            data = np.asarray(data)
+        self.columns = [data] if data.ndim == 1 else [data[:, i] for i in range(data.shape[1])]
+        self.pyramids = pyramids
+        self.ylim = None
+
+    def set_pyramids(self, pyramids):
+        self.pyramids = pyramids
+
+    def set_window(self, start):
+        '''
+        按控件像素宽度降采样绘制窗口[start, start + length)
+        '''
+        if self.columns is None:
+            return
+        width = max(self.width(), 1)
+        if self.pyramids is None:
+            for line, column in zip(self.lines, self.columns):
+                self.set_line_data(line, *direct_envelope(column, start, self.length, width))
+        else:
+            for line, pyramid in zip(self.lines, self.pyramids):
+                self.set_line_data(line, *pyramid.envelope(start, self.length, width))
+
+    def set_length(self, length):
+        '''
+        修改显示窗口长度(采样数), 绘制点数仍由像素宽度决定
+        '''
+        self.length = length
+        self.ylim = None
+        self.set_xlim(length)
+
+    def set_line_data(self, line, x, y):
+        raise NotImplementedError
+
+    def set_xlim(self, length):
+        raise NotImplementedError
+
+    def set_ylim(self, ymin, ymax):
+        raise NotImplementedError
+
+    def set_span(self, left, right):
+        '''
+        设置框选区域(数据坐标)
+        '''
+        raise NotImplementedError
+
+    def refresh(self):
+        raise NotImplementedError
+
+    '''
+    鼠标框选函数
+    '''
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self.rubberBand.raise_()
+            self.origin = event.pos()
+            self.rubberBand.setGeometry(QRect(self.origin, QSize()))
+            self.rubberBand.show()
+
+    def mouseMoveEvent(self, event):
+        if self.origin:
+            self.rubberBand.setGeometry(QRect(self.origin, event.pos()).normalized())
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            selected_area = self.rubberBand.geometry()
+            parent_width = self.width()
+            left_distance = parent_width - selected_area.left()
+            right_distance = parent_width - selected_area.right()
+            left_percent = min(100, (left_distance / parent_width) * 100)
+            right_percent = max(0, (right_distance / parent_width) * 100)
+            self.signal_select.emit((left_percent, right_percent))
+            self.rubberBand.hide()
+            self.origin = None
+
+
+class MplCanvas(PlotBackend, FigureCanvas):
+    '''
+    基础绘图类(matplotlib后端)
+    '''
+    signal_select = pyqtSignal(tuple)
+
+    def __init__(self, length, parent=None, width=5, height=4, dpi=100, zero_line=False, color='green', lines=1,
+                 blit=True):
+        fig = Figure(figsize=(width, height), dpi=dpi)
+        self.blit_mode = blit
+        self.background = None
+        self.axes = fig.add_subplot(111)
+        self.axes.set_facecolor('white')
+        super(MplCanvas, self).__init__(fig)
+        self.init_backend(length)
+        fig.tight_layout()
+        self.axes.xaxis.set_visible(False)
+        self.axes.set_position([0, 0, 1, 1])
+        self.axes.set_xlim(0, length)
+        # 坐标轴占满画布, 刻度标签在画布外不可见, 不再排版
+        self.axes.tick_params(axis='both', which='both', bottom=False, top=False, left=False, right=False,
+                              labelleft=False)
+        fig.subplots_adjust(left=0, right=1, top=1, bottom=0)
+        self.axes.yaxis.grid(True, linestyle='--', color='gray')
+        if zero_line:
+            self.axes.yaxis.set_ticks([0])
+            self.axes.yaxis.grid(True, linestyle='-', color='black')
+        if lines == 1:
+            plot_refs = self.axes.plot(np.zeros(length), color=color)[0]
+        else:
+            colors = ['blue', 'green', 'red']
+            plot_refs = [self.axes.plot(np.zeros(length), color=colors[i])[0] for i in range(lines)]
+        self.plot = plot_refs
+        self.lines = plot_refs if lines > 1 else [plot_refs]
+        # 每条曲线对应一个包络填充带, 窗口采样数超过像素宽度时代替折线显示; 多条时半透明, 互不遮挡
+        self.fills = {line: self.axes.add_patch(Polygon(np.zeros((1, 2)), closed=True, color=line.get_color(),
+                                                        alpha=None if lines == 1 else 0.5, linewidth=0,
+                                                        visible=False))
+                      for line in self.lines}
+        self.envelopes = {}
+        self.artists = self.lines + list(self.fills.values())
+        self.span = None
+        if self.blit_mode:
+            # 曲线不参与整图绘制, 每帧在缓存背景上单独重绘
+            for artist in self.artists:
+                artist.set_animated(True)
+            self.mpl_connect('draw_event', self.on_draw)
+
+        # 设置rcParams参数
+        plt.rcParams['agg.path.chunksize'] = 1000
+        plt.rcParams['figure.dpi'] = 80
+        plt.rcParams['figure.figsize'] = [6, 4]
+        plt.rcParams['savefig.dpi'] = 100
+
+    def set_line_data(self, line, x, y):
+        '''
+        原始采样画折线; 包络(x成对重复, y交替为各桶最小值/最大值)画成最小值与最大值之间的填充带,
+        agg描上下贯穿的密集锯齿线比填充同一区域慢3~4倍
+        '''
+        fill = self.fills[line]
+        envelope = len(x) > 1 and x[0] == x[1]
+        line.set_visible(not envelope)
+        fill.set_visible(envelope)
+        if envelope:
+            self.envelopes[fill] = (np.concatenate((x[0::2], x[-2::-2])), y[1::2], y[-2::-2])
+        else:
+            line.set_data(x, y)
+
+    def update_fills(self):
+        '''
+        按当前y轴范围生成填充带顶点, 上下各加宽半个线宽(0.75像素), 平直段与折线一样可见
+        '''
+        low, high = self.axes.get_ylim()
+        pad = (high - low) * 0.75 / max(self.height(), 1)
+        for fill, (x, maxs, mins) in self.envelopes.items():
+            fill.set_xy(np.column_stack((x, np.concatenate((maxs + pad, mins - pad)))))
+
+    def set_xlim(self, length):
+        self.axes.set_xlim(0, length)
+        self.background = None
+
+    def set_ylim(self, ymin, ymax):
+        '''
+        设置y轴范围, 范围变化时背景缓存失效
+        blit模式下仅在数据超出当前范围或收缩到一半以下时调整, 减少整图重绘
+        '''
+        if self.blit_mode and self.ylim is not None:
+            low, high = self.ylim
+            if low <= ymin and ymax <= high and (ymax - ymin) * 2 >= high - low:
+                return
+            margin = (ymax - ymin) * 0.1
+            ymin, ymax = ymin - margin, ymax + margin
+        if self.ylim != (ymin, ymax):
+            self.ylim = (ymin, ymax)
+            self.axes.set_ylim(ymin, ymax)
+            self.background = None
+
+    def set_span(self, left, right):
+        if self.span is not None:
+            self.span.remove()
+        self.span = self.axes.axvspan(left, right, color='lightcoral', alpha=0.5)
+        self.background = None
+
+    def on_draw(self, event):
+        '''
+        整图绘制后缓存静态背景(坐标轴/网格/框选区域)并补画曲线
+        '''
+        self.background = self.copy_from_bbox(self.figure.bbox)
+        for artist in self.artists:
+            self.axes.draw_artist(artist)
+
+    def refresh(self):
+        '''
+        刷新显示, 有背景缓存时只重绘曲线, 否则整图重绘
+        '''
+        self.update_fills()
+        if not self.blit_mode or self.background is None:
+            self.draw()
+            return
+        self.restore_region(self.background)
+        for artist in self.artists:
+            self.axes.draw_artist(artist)
+        self.blit(self.figure.bbox)
+
+
+class PgCanvas(PlotBackend, PlotWidget):
+    '''
+    基础绘图类(pyqtgraph后端, 软件光栅)
+    '''
+    signal_select = pyqtSignal(tuple)
+
+    def __init__(self, length, parent=None, zero_line=False, color='green', lines=1, **kwargs):
+        super(PgCanvas, self).__init__(parent, background='w')
+        self.init_backend(length)
+        plot_item = self.getPlotItem()
+        plot_item.hideAxis('bottom')
+        plot_item.hideAxis('left')
+        plot_item.hideButtons()
+        plot_item.setMouseEnabled(False, False)
+        plot_item.setMenuEnabled(False)
+        plot_item.showGrid(y=True)
+        plot_item.setXRange(0, length, padding=0)
+        if zero_line:
+            plot_item.addLine(y=0, pen=pg.mkPen('k'))
+        colors = [color] if lines == 1 else ['blue', 'green', 'red']
+        self.lines = [plot_item.plot(np.zeros(length), pen=pg.mkPen(c)) for c in colors]
+        self.span = None
+
+    def set_line_data(self, line, x, y):
+        line.setData(x, y)
+
+    def set_xlim(self, length):
+        self.getPlotItem().setXRange(0, length, padding=0)
+
+    def set_ylim(self, ymin, ymax):
+        if self.ylim != (ymin, ymax):
+            self.ylim = (ymin, ymax)
+            self.getPlotItem().setYRange(ymin, ymax, padding=0)
+
+    def set_span(self, left, right):
+        if self.span is None:
+            self.span = pg.LinearRegionItem(brush=pg.mkBrush(240, 128, 128, 128), movable=False)
+            self.getPlotItem().addItem(self.span)
+        self.span.setRegion((left, right))
+
+    def refresh(self):
+        # pyqtgraph在数据变化后自行重绘
+        pass
+
+
+PLOT_BACKENDS = {'matplotlib': MplCanvas, 'pyqtgraph': PgCanvas}
+
+
+plot_backend = 'matplotlib'
+
+
+def set_plot_backend(name):
+    '''
+    选择绘图后端, 需在创建绘图控件前调用
+    '''
+    global plot_backend
+    if name not in PLOT_BACKENDS:
+        raise ValueError(f"未知绘图后端: {name}")
+    if name == 'pyqtgraph':
+        if pg is None:
+            raise ImportError("pyqtgraph未安装")
+        pg.setConfigOptions(useOpenGL=False, antialias=False)
+    plot_backend = name
+
+
+def create_canvas(**kwargs):
+    return PLOT_BACKENDS[plot_backend](**kwargs)
+
+
+class SpectrogramTask(QRunnable):
+    '''
+    后台分块计算谱图任务
+    '''
+
+    def __init__(self, panel, filepath, spectrogram, data, scale):
+        super().__init__()
+        self.panel = panel
+        self.filepath = filepath
+        self.spectrogram = spectrogram
+        self.data = data
+        self.scale = scale
+
+    def run(self):
+        try:
+            build_spectrogram(self.filepath, self.spectrogram, self.data, self.scale,
+                              lambda: self.panel.progress.emit(self.spectrogram))
+        except Exception:
+            self.spectrogram.cancelled = True  # 计算失败或面板已销毁, 未完成部分保持空白
+
+
+class SpectrogramPanel(QWidget):
+    '''
+    音频谱图面板, 显示与波形相同的窗口, 默认隐藏
+    谱图每个文件只计算一次(首次显示时在后台分块计算, 之后读取侧边缓存),
+    播放时只把当前窗口的列按色表转换后缩放绘制, 不重复计算FFT
+    '''
+    progress = pyqtSignal(object)
+
+    def __init__(self, parent=None, window_length=DEFAULT_WINDOW):
+        super().__init__(parent)
+        self.window_length = window_length
+        self.source = None
+        self.spectrogram = None
+        self.position = 0
+        self.column = None
+        # 色表: uint8级别 -> RGB32
+        colors = plt.get_cmap('magma')(np.arange(256), bytes=True)
+        self.lut = np.ascontiguousarray(colors[:, [2, 1, 0, 3]]).view(np.uint32).ravel()
+        self.progress.connect(self.on_progress)
+        self.hide()
+
+    def set_source(self, filepath, data, scale, samplerate):
+        if self.spectrogram is not None:
+            self.spectrogram.cancelled = True
+        self.source = (filepath, data, scale, samplerate)
+        self.spectrogram = None
+        if self.isVisible():
+            self.build()
+        self.update()
+
+    def build(self):
+        if self.spectrogram is not None or self.source is None:
+            return
+        filepath, data, scale, samplerate = self.source
+        self.spectrogram = load_spectrogram(filepath, len(data), samplerate, **FEATURE_PARAMS)
+        if not self.spectrogram.complete:
+            QThreadPool.globalInstance().start(SpectrogramTask(self, filepath, self.spectrogram, data, scale), -1)
+
+    def showEvent(self, event):
+        self.build()
+        super().showEvent(event)
+
+    def on_progress(self, spectrogram):
+        if spectrogram is self.spectrogram:
+            self.update()
+
+    def set_window_length(self, window_length):
+        self.window_length = window_length
+        self.update()
+
+    def set_position(self, position):
+        # 窗口未移过一列时不重画
+        self.position = position
+        column = position // FEATURE_PARAMS['hop']
+        if self.isVisible() and column != self.column:
+            self.column = column
+            self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor.fromRgb(int(self.lut[0])))
+        spectrogram = self.spectrogram
+        if spectrogram is not None:
+            hop, frame = spectrogram.params['hop'], spectrogram.params['frame']
+            # 窗口[position - window_length, position]对应的列坐标(第i列左边缘为i * hop + (frame - hop) / 2毫秒)
+            end = (self.position - (frame - hop) / 2) / hop
+            start = end - self.window_length / hop
+            first, last = max(int(start), 0), min(int(np.ceil(end)), spectrogram.ready)
+            if last > first:
+                pixels = np.ascontiguousarray(self.lut[spectrogram.image[:, first:last]])
+                image = QImage(pixels.data, last - first, pixels.shape[0], 4 * (last - first), QImage.Format_RGB32)
+                scale = self.width() / (end - start)
+                painter.drawImage(QRectF((first - start) * scale, 0, (last - first) * scale, self.height()), image)
+        painter.end()
+
+
+class DynamicPlot_Audio(QWidget):
+    '''
+    音频类
+    '''
+
+    def __init__(self):
+        super().__init__()
+        self.audio_player = QMediaPlayer()
+        self.signal_window = None
+        self.interval = 15
+        self.samplerate = 16000
+        self.window_length = DEFAULT_WINDOW
+        self.max_value, self.min_value = 0, 0
+        self.length = int(self.window_length * self.samplerate / 1000)
+        self.data = None
+        self.scale = 1.0
+        self.dir_path, self.file_name = None, None
+        self.plot_data = None
+        self.window_sample = int(self.interval / 1000 * self.samplerate)
+        self.raise_()
+        layout = QVBoxLayout()
+        self.canvas = create_canvas(parent=self, length=self.length, color='blue', width=5, height=4, dpi=30)
+        self.setMouseTracking(True)
+        layout.addWidget(self.canvas, 2)
+        self.spectrogram = SpectrogramPanel(self, self.window_length)
+        layout.addWidget(self.spectrogram, 1)
+        self.setLayout(layout)
+        self.canvas.signal_select.connect(self.update_win)
+        self.indexer = SignalIndexer(self)
+        self.indexer.indexed.connect(self.on_indexed)
+
+    def setData(self, filepath):
+        '''
+        设置数据路径
+        '''
+        self.apply(self.load(filepath))
+
+    def load(self, filepath):
+        '''
+        读取音频并生成绘图数据, 不操作界面, 可在后台线程执行
+        乘self.scale得到[-1, 1]幅值
+        '''
+        return prepare_audio(filepath, self.samplerate, self.interval, lazy=True)
+
+    def apply(self, loaded):
+        '''
+        在界面线程中应用load的结果
+        '''
+        self.stop()
+        filepath = loaded['filepath']
+        self.dir_path, self.file_name = os.path.split(filepath)
+        self.root_path = extract_process_folder(self.dir_path)
+        self.data, self.scale = loaded['data'], loaded['scale']
+        self.audio_duration = len(self.data) / self.samplerate
+        media_content = QMediaContent(QUrl.fromLocalFile(filepath))
+        self.audio_player.setMedia(media_content)
+        self.signal_window = loaded['signal_window']
+        self.signal_window.set_view_length(self.length)
+        self.totalIndex = self.signal_window.totalIndex
+        self.canvas.set_source(self.signal_window.padded_data, self.signal_window.pyramids)
+        # 首次打开时完整索引在后台建立, 期间按窗口直接计算
+        self.indexer.build(loaded['filepath'], self.signal_window, self.interval)
+        self.spectrogram.set_source(filepath, self.data, self.scale, self.samplerate)
+
+    def on_indexed(self, signal_window):
+        if signal_window is self.signal_window:
+            self.canvas.set_pyramids(signal_window.pyramids)
+
+    def show_spectrogram(self, visible):
+        self.spectrogram.setVisible(visible)
+
+    def build_window(self, data):
+        '''
+        生成播放窗口数据
+        '''
+        # 尾部补齐到整步, 每步窗口直接从数据中切片, 不再逐步复制
+        window_ends, padding_length = audio_window_ends(len(data), self.window_sample)
+        return SignalWindow(data, window_ends, self.length, tail=padding_length,
+                            padding=int(max(WINDOW_LENGTHS) * self.samplerate / 1000))
+
+    def dataGenerator(self):
+        '''
+        抽取绘图数据
+        '''
+        self.signal_window = self.build_window(self.data)
+        self.totalIndex = self.signal_window.totalIndex
+        self.canvas.set_source(self.signal_window.padded_data, build_pyramids(self.signal_window.padded_data))
+
+    def play(self):
+        if self.audio_player.state() == QMediaPlayer.State.PlayingState:
+            self.audio_player.pause()
+        else:
+            self.audio_player.play()
+
+    def stop(self):
+        self.audio_player.stop()
+        self.min_value, self.max_value = 0, 0
+
+    def update_win(self, events):
+        '''
+        重新绘制窗口
+        '''
+        if self.plot_data is not None:
+            data_lenth = len(self.plot_data)
+            left = data_lenth * (1 - events[0] / 100)
+            right = data_lenth * (1 - events[1] / 100)
+            self.canvas.set_span(left, right)
+            self.canvas.set_window(self.plot_start)
+            self.canvas.set_ylim(self.plot_ymin, self.plot_ymax)
+            self.canvas.refresh()
+
+    def update(self, position):
+        '''
+        更新展示数据
+        '''
+        if self.signal_window is None:
+            return
+        current_index = position // self.interval
+        if current_index > self.totalIndex:
+            current_index = self.totalIndex
+        self.plot_data = self.signal_window.window(current_index)
+        self.plot_start = self.signal_window.start(current_index)
+        self.plot_ymin, self.plot_ymax = self.signal_window.yrange(current_index)
+        self.canvas.set_window(self.plot_start)
+        self.canvas.set_ylim(self.plot_ymin, self.plot_ymax)
+        self.canvas.refresh()
+        self.spectrogram.set_position(position)
+
+    def setPosition(self, position):
+        self.audio_player.setPosition(position)
+
+    def set_window_length(self, window_length):
+        '''
+        修改显示窗口长度(ms), 播放步长和索引不变
+        '''
+        self.window_length = window_length
+        self.length = int(window_length * self.samplerate / 1000)
+        self.canvas.set_length(self.length)
+        if self.signal_window is not None:
+            self.signal_window.set_view_length(self.length)
+        self.spectrogram.set_window_length(window_length)
+
+
+class DynamicPlot_Gas(QWidget):
+    '''
+    气流量类
+    '''
+    def __init__(self):
+        super().__init__()
+        self.setMouseTracking(True)
+        self.signal_window = None
+        self.interval = 15
+        self.samplerate = 100
+        self.window_length = DEFAULT_WINDOW
+        self.max_value, self.min_value = 0, 0
+        self.length = int(self.window_length * self.samplerate / 1000)
+        self.canvas = create_canvas(length=self.length,
+                                    parent=self, width=5,
+                                    height=4,
+                                    dpi=80,
+                                    zero_line=True,
+                                    color='green')
+        self.data = None
+        self.plot_data = None
+        self.window_sample = int(self.interval / 1000 * self.samplerate)
+        layout = QVBoxLayout()
+        layout.addWidget(self.canvas)
+        self.setLayout(layout)
+        self.indexer = SignalIndexer(self)
+        self.indexer.indexed.connect(self.on_indexed)
+
+    def update_win(self, events):
+        '''
+        重绘框选区域
+        '''
+        if self.plot_data is not None:
+            data_lenth = len(self.plot_data)
+            left = data_lenth * (1 - events[0] / 100)
+            right = data_lenth * (1 - events[1] / 100)
+            self.canvas.set_span(left, right)
+            self.canvas.set_window(self.plot_start)
+            self.canvas.set_ylim(self.plot_ymin, self.plot_ymax)
+            self.canvas.refresh()
+
+    def setData(self, filepath):
+        self.apply(self.load(filepath))
+
+    def load(self, filepath):
+        '''
+        读取气流量数据并生成绘图数据, 不操作界面, 可在后台线程执行
+        '''
+        return prepare_table(filepath, ['value'], self.samplerate, self.interval, lazy=True)
+
+    def apply(self, loaded):
+        self.stop()
+        self.filepath = loaded['filepath']
+        self.data = loaded['data']
+        self.signal_window = loaded['signal_window']
+        self.signal_window.set_view_length(self.length)
+        self.totalIndex = self.signal_window.totalIndex
+        self.canvas.set_source(self.signal_window.padded_data, self.signal_window.pyramids)
+        # 首次打开时完整索引在后台建立, 期间按窗口直接计算
+        self.indexer.build(loaded['filepath'], self.signal_window, self.interval)
+
+    def on_indexed(self, signal_window):
+        if signal_window is self.signal_window:
+            self.canvas.set_pyramids(signal_window.pyramids)
+
+    def build_window(self, data):
+        window_ends = time_window_ends(data['time'].values, self.interval)
+        return SignalWindow(data['value'].values, window_ends, self.length,
+                            padding=int(max(WINDOW_LENGTHS) * self.samplerate / 1000))
+
+    def dataGenerator(self):
+        '''
+        生成展示数据
+        '''
+        self.signal_window = self.build_window(self.data)
+        self.totalIndex = self.signal_window.totalIndex
+        self.canvas.set_source(self.signal_window.padded_data, build_pyramids(self.signal_window.padded_data))
+
+    def stop(self):
+        self.min_value, self.max_value = 0, 0
+
+    def set_window_length(self, window_length):
+        '''
+        修改显示窗口长度(ms), 播放步长和索引不变
+        '''
+        self.window_length = window_length
+        self.length = int(window_length * self.samplerate / 1000)
+        self.canvas.set_length(self.length)
+        if self.signal_window is not None:
+            self.signal_window.set_view_length(self.length)
+
+    def update(self, position):
+        if self.signal_window is None:
+            return
+        current_index = position // self.interval
+        if current_index > self.totalIndex:
+            current_index = self.totalIndex
+        self.plot_data = self.signal_window.window(current_index)
+        self.plot_start = self.signal_window.start(current_index)
+        self.plot_ymin, self.plot_ymax = self.signal_window.yrange(current_index)
+        self.canvas.set_window(self.plot_start)
+        self.canvas.set_ylim(self.plot_ymin, self.plot_ymax)
+        self.canvas.refresh()
+
+
+class DynamicPlot_Imu(QWidget):
+    '''
+    三轴数据类
+    '''
+    def __init__(self):
+        super().__init__()
+        self.setMouseTracking(True)
+        self.signal_window = None
+        self.interval = 15
+        self.samplerate = 1000
+        self.window_length = DEFAULT_WINDOW
+        self.max_value, self.min_value = 0, 0
+        self.length = int(self.window_length * self.samplerate / 1000)
+        self.canvas = create_canvas(length=self.length, parent=self, width=5, height=4, dpi=20, color='red', lines=3)
+        self.data = None
+        self.plot_data = None
+        self.window_sample = int(self.interval / 1000 * self.samplerate)
+        layout = QVBoxLayout()
+        layout.addWidget(self.canvas)
+        self.setLayout(layout)
+        self.indexer = SignalIndexer(self)
+        self.indexer.indexed.connect(self.on_indexed)
+
+    def update_win(self, events):
+        if self.plot_data is not None:
+            data_lenth = len(self.plot_data)
+            left = data_lenth * (1 - events[0] / 100)
+            right = data_lenth * (1 - events[1] / 100)
+            self.canvas.set_span(left, right)
+            self.canvas.set_window(self.plot_start)
+            self.canvas.set_ylim(self.plot_ymin, self.plot_ymax)
+            self.canvas.refresh()
+
+    def setData(self, filepath):
+        self.apply(self.load(filepath))
+
+    def load(self, filepath):
+        '''
+        读取三轴数据并生成绘图数据, 不操作界面, 可在后台线程执行
+        '''
+        return prepare_table(filepath, ['X', 'Y', 'Z'], self.samplerate, self.interval, lazy=True)
+
+    def apply(self, loaded):
+        self.stop()
+        self.filepath = loaded['filepath']
+        self.data = loaded['data']
+        self.signal_window = loaded['signal_window']
+        self.signal_window.set_view_length(self.length)
+        self.totalIndex = self.signal_window.totalIndex
+        self.canvas.set_source(self.signal_window.padded_data, self.signal_window.pyramids)
+        # 首次打开时完整索引在后台建立, 期间按窗口直接计算
+        self.indexer.build(loaded['filepath'], self.signal_window, self.interval)
+
+    def on_indexed(self, signal_window):
+        if signal_window is self.signal_window:
+            self.canvas.set_pyramids(signal_window.pyramids)
+
+    def build_window(self, data):
+        window_ends = time_window_ends(data['time'].values, self.interval)
+        return SignalWindow(data[['X', 'Y', 'Z']].values, window_ends, self.length,
+                            padding=int(max(WINDOW_LENGTHS) * self.samplerate / 1000))
+
+    def dataGenerator(self):
+        self.signal_window = self.build_window(self.data)
+        self.totalIndex = self.signal_window.totalIndex
+        self.canvas.set_source(self.signal_window.padded_data, build_pyramids(self.signal_window.padded_data))
+
+    def stop(self):
+        self.min_value, self.max_value = 0, 0
+
+    def set_window_length(self, window_length):
+        '''
+        修改显示窗口长度(ms), 播放步长和索引不变
+        '''
+        self.window_length = window_length
+        self.length = int(window_length * self.samplerate / 1000)
+        self.canvas.set_length(self.length)
+        if self.signal_window is not None:
+            self.signal_window.set_view_length(self.length)
+
+    def update(self, position):
+        if self.signal_window is None:
+            return
+        current_index = position // self.interval
+        if current_index > self.totalIndex:
+            current_index = self.totalIndex
+        self.plot_data = self.signal_window.window(current_index)
+        self.plot_start = self.signal_window.start(current_index)
+        self.plot_ymin, self.plot_ymax = self.signal_window.yrange(current_index)
+        self.canvas.set_window(self.plot_start)
+        self.canvas.set_ylim(self.plot_ymin, self.plot_ymax)
+        self.canvas.refresh()
+
+
+class DynamicPlot(QWidget):
+    '''
+    多种数据绘制窗口
+    '''
+    def __init__(self):
+        super().__init__()
+        self.interval = 15
+        self.imuPlot = DynamicPlot_Imu()
+        self.gasPlot = DynamicPlot_Gas()
+        self.audioPlot = DynamicPlot_Audio()
+        self.label1 = QLabel()
+        font = QFont()
+        font.setPointSize(12)  # 设置字体大小
+        self.label1.setFont(font)
+        self.label1.setSizePolicy(QSizePolicy.Policy.Preferred,
+                                  QSizePolicy.Policy.Maximum)
+        self.label1.setStyleSheet("color: green;")
+        self.label1.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.label1.setText('Time: s')
+        self.label2 = QLabel()
+        font = QFont()
+        font.setPointSize(16)  # 设置字体大小
+        self.label2.setFont(font)
+        self.label2.setSizePolicy(QSizePolicy.Policy.Preferred,
+                                  QSizePolicy.Policy.Maximum)
+        self.label2.setStyleSheet("color: green;")
+        self.label2.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.label2.setText(' - ')
+        sub_layout1 = QHBoxLayout()
+        sub_layout1.setContentsMargins(0, 0, 0, 0)
+        sub_layout1.addWidget(self.label1)
+        sub_layout1.addWidget(self.label2)
+        self.label3 = QLabel()
+        font = QFont()
+        font.setPointSize(12)  # 设置字体大小
+        self.label3.setFont(font)
+        self.label3.setStyleSheet("color: black;")
+        self.label3.setAlignment(Qt.AlignmentFlag.AlignTrailing)
+        self.label3.setText('PAS:')
+        self.combo_box = QComboBox(self)
+        font_size = 25
+        self.combo_box.setStyleSheet(f"font-size: {font_size}px;")
+        self.combo_box.addItem('1')
+        self.combo_box.addItem('2')
+        self.combo_box.addItem('3')
+        self.combo_box.addItem('4')
+        self.combo_box.addItem('5')
+        self.combo_box.addItem('6')
+        self.combo_box.addItem('7')
+        self.combo_box.addItem('8')
+        self.select_button = QPushButton('Seg')
+        self.select_button.setStyleSheet(
+            "QPushButton:pressed { background-color: red; border-style: inset; }")
+        self.delet_button = QPushButton('Del')
+        self.delet_button.setStyleSheet(
+            "QPushButton:pressed { background-color: red; border-style: inset; }")
+        sub_layout2 = QHBoxLayout()
+        sub_layout2.setContentsMargins(0, 0, 0, 0)
+        sub_layout2.addWidget(self.label3)
+        sub_layout2.addWidget(self.combo_box)
+        sub_layout2.addWidget(self.select_button)
+        sub_layout2.addWidget(self.delet_button)
+        # 布局
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.imuPlot, 1)
+        layout.addWidget(self.gasPlot, 1)
+        layout.addWidget(self.audioPlot, 1)
+        layout.addLayout(sub_layout1)
+        layout.addLayout(sub_layout2)
+        self.setLayout(layout)
+
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.update)
+        self.audioPlot.stopSignal.connect(self.stop)
+        self.audioPlot.canvas.signal_select.connect(self.audioPlot.update_win)
+        self.audioPlot.canvas.signal_select.connect(self.imuPlot.update_win)
+        self.audioPlot.canvas.signal_select.connect(self.gasPlot.update_win)
+
+    def setPosition(self, position):
+        self.audioPlot.setPosition(position)
+
+    def play(self, state):
+        self.audioPlot.play()
+        self.gasPlot.play()
+        self.imuPlot.play()
+        if state:
+            self.timer.start(self.interval)
+        else:
+            self.timer.stop()
+
+    def update(self):
+        positon = self.audioPlot.audio_player.position()
+        self.audioPlot.update(positon)
+        self.imuPlot.update(positon)
+        self.gasPlot.update(positon)
+
+    def stop(self):
+        self.timer.stop()
+        self.audioPlot.stop()
+        self.imuPlot.stop()
+        self.gasPlot.stop()
+
+    '''
+    设置文件路径
+    '''
+    def setCsv(self, file_path):
+        if 'wav' in file_path:
+            self.audioPlot.setData(file_path)
+        elif 'gas' in file_path:
+            self.gasPlot.setData(file_path)
+        elif 'imu' in file_path:
+            self.imuPlot.setData(file_path)
+
+
+class OverviewStrip(QWidget):
+    '''
+    整段记录概览条
+    音频能量、气流量、imu幅值各占一行, 叠加标注片段、模型预测片段(虚线框/顶部条)、当前播放窗口和播放位置, 点击或拖动跳转
+    包络按控件宽度选层绘制为背景图, 仅在数据、标注或尺寸变化时重绘, 播放时只重画位置
+    '''
+    seek = pyqtSignal(int)
+    rows = [('audio', '音频', 'blue'), ('gas', '气流量', 'green'), ('imu', 'imu', 'red')]
+    segment_colors = ['lightcoral', 'orange', 'gold', 'yellowgreen', 'skyblue', 'plum', 'silver']
+    band_height = 6  # 底部分期片段条/顶部预测分期条高度
+
+    def __init__(self, parent=None, window_length=3000):
+        super().__init__(parent)
+        self.window_length = window_length
+        self.envelopes = {}
+        self.segments = []
+        self.predictions = []
+        self.media_duration = 0
+        self.position = 0
+        self.background = None
+        self.setFixedHeight(90)
+
+    @property
+    def duration(self):
+        return max([self.media_duration] + [envelope.duration for envelope in self.envelopes.values()])
+
+    def clear(self):
+        self.envelopes, self.segments, self.predictions, self.media_duration = {}, [], [], 0
+        self.redraw()
+
+    def redraw(self):
+        self.background = None
+        self.update()
+
+    def set_envelope(self, name, envelope):
+        self.envelopes[name] = envelope
+        self.redraw()
+
+    def set_duration(self, duration):
+        self.media_duration = duration
+        self.redraw()
+
+    def set_segments(self, segments):
+        '''
+        segments: [(列号, 起点ms, 终点ms), ...]
+        '''
+        self.segments = segments
+        self.redraw()
+
+    def set_predictions(self, predictions):
+        '''
+        模型预测片段, 格式同set_segments, 只作叠加显示
+        '''
+        self.predictions = predictions
+        self.redraw()
+
+    def x_of(self, position):
+        return position * self.width() / self.duration if self.duration > 0 else 0
+
+    def set_position(self, position):
+        # 位置未跨过像素时不重画
+        moved = int(self.x_of(position)) != int(self.x_of(self.position))
+        self.position = position
+        if moved:
+            self.update()
+
+    def render_background(self):
+        '''
+        绘制包络和标注片段
+        '''
+        pixmap = QPixmap(self.size())
+        pixmap.fill(Qt.GlobalColor.white)
+        duration, width = self.duration, max(self.width(), 1)
+        if duration <= 0:
+            return pixmap
+        painter = QPainter(pixmap)
+        scale = width / duration
+        height = self.height() - self.band_height
+        # 吞咽片段铺满整条, 分期片段画在底部
+        for column, start, end in self.segments:
+            color = QColor(self.segment_colors[column % len(self.segment_colors)])
+            if column == 0:
+                color.setAlpha(90)
+                painter.fillRect(QRectF(start * scale, 0, max((end - start) * scale, 1), height), color)
+            else:
+                painter.fillRect(QRectF(start * scale, height, max((end - start) * scale, 1), self.band_height),
+                                 color)
+        # 预测的吞咽片段画虚线框, 预测的分期片段画在顶部
+        for column, start, end in self.predictions:
+            color = QColor(self.segment_colors[column % len(self.segment_colors)])
+            if column == 0:
+                painter.setPen(QPen(color.darker(150), 1, Qt.PenStyle.DashLine))
+                painter.drawRect(QRectF(start * scale, 0, max((end - start) * scale, 1), height - 1))
+            else:
+                painter.fillRect(QRectF(start * scale, 0, max((end - start) * scale, 1), self.band_height / 2),
+                                 color)
+        row_height = height / len(self.rows)
+        for row, (name, label, color) in enumerate(self.rows):
+            envelope = self.envelopes.get(name)
+            if envelope is None:
+                continue
+            times, mins, maxs = envelope.envelope(0, duration, width)
+            low, high = envelope.limits
+            span = (high - low) or 1.0
+            top = row * row_height
+            xs = times * scale
+            tops = top + (1 - (maxs - low) / span) * (row_height - 1)
+            bottoms = np.maximum(top + (1 - (mins - low) / span) * (row_height - 1), tops + 1)
+            painter.setPen(QPen(QColor(color)))
+            painter.drawLines([QLineF(x, y0, x, y1)
+                               for x, y0, y1 in zip(xs.tolist(), tops.tolist(), bottoms.tolist())])
+            painter.setPen(QPen(QColor('black')))
+            painter.drawText(QPointF(2, top + 12), label)
+        painter.end()
+        return pixmap
+
+    def paintEvent(self, event):
+        if self.background is None or self.background.size() != self.size():
+            self.background = self.render_background()
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self.background)
+        if self.duration > 0:
+            x = self.x_of(self.position)
+            left = self.x_of(max(self.position - self.window_length, 0))
+            painter.fillRect(QRectF(left, 0, max(x - left, 1), self.height()), QColor(255, 224, 138, 120))
+            painter.setPen(QPen(QColor('black')))
+            painter.drawLine(QLineF(x, 0, x, self.height()))
+        painter.end()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self.seek_to(event.pos().x())
+
+    def mouseMoveEvent(self, event):
+        if event.buttons() & Qt.MouseButton.LeftButton:
+            self.seek_to(event.pos().x())
+
+    def seek_to(self, x):
+        if self.duration > 0:
+            self.seek.emit(int(min(max(x / max(self.width(), 1), 0), 1) * self.duration))
+
+
+class VideoWidget(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.mediaPlayer = QMediaPlayer(None, QMediaPlayer.Flag.VideoSurface)
+        self.videoWidget = QVideoWidget()
+        self.videoWidget.setStyleSheet("background-color: gray;")
+        sizePolicy_v = self.videoWidget.sizePolicy()
+        sizePolicy_v.setHorizontalStretch(0)
+        sizePolicy_v.setVerticalStretch(0)
+        sizePolicy_v.setHeightForWidth(self.videoWidget.sizePolicy().hasHeightForWidth())
+        self.videoWidget.setSizePolicy(sizePolicy_v)
+        self.mediaPlayer.setVideoOutput(self.videoWidget)
+        layout = QVBoxLayout()
+        layout.addWidget(self.videoWidget)
+        self.setLayout(layout)
+        self.frames = None
+
+    def setMedia(self, filepath):
+        if self.mediaPlayer.state() == QMediaPlayer.State.PlayingState:
+            self.mediaPlayer.stop()
+        media = QMediaContent(QUrl.fromLocalFile(filepath))
+        self.mediaPlayer.setMedia(media)
+
+    def load(self, filepath):
+        '''
+        后台建立帧索引, 失败时退化为按固定帧率步进
+        '''
+        try:
+            frames = read_frame_index(filepath)
+        except Exception:
+            frames = None
+        return {'filepath': os.path.abspath(filepath), 'frames': frames}
+
+    def apply(self, loaded):
+        self.frames = loaded['frames']
+        self.setMedia(loaded['filepath'])
+
+
+class MasterClock(QObject):
+    '''
+    播放主时钟: 以单调时钟计时, 两次查询之间无需播放器上报位置
+    各播放器作为从属, 定期比较其位置与主时钟, 偏差超过容差时校正, 偏差记录在offset_log中
+    '''
+
+    def __init__(self, parent=None, sync_interval=500):
+        super().__init__(parent)
+        self.players = {}
+        self.base_position = 0
+        self.base_time = None
+        self.duration = None
+        self.offset_log = []
+        self.sync_timer = QTimer(self)
+        self.sync_timer.setInterval(sync_interval)
+        self.sync_timer.timeout.connect(self.correct_drift)
+
+    def add_player(self, name, player, tolerance=80):
+        self.players[name] = (player, tolerance)
+
+    def set_duration(self, duration):
+        self.duration = duration or None
+
+    @property
+    def running(self):
+        return self.base_time is not None
+
+    def position(self):
+        '''
+        当前播放位置(ms)
+        '''
+        if self.base_time is None:
+            return self.base_position
+        position = self.base_position + int((time.perf_counter() - self.base_time) * 1000)
+        return min(position, self.duration) if self.duration else position
+
+    def start(self):
+        for player, _ in self.players.values():
+            player.setPosition(self.base_position)
+            player.play()
+        self.base_time = time.perf_counter()
+        self.sync_timer.start()
+
+    def pause(self):
+        self.base_position = self.position()
+        self.base_time = None
+        self.sync_timer.stop()
+        for player, _ in self.players.values():
+            player.pause()
+
+    def stop(self):
+        self.base_position = 0
+        self.base_time = None
+        self.sync_timer.stop()
+        for player, _ in self.players.values():
+            player.stop()
+
+    def seek(self, position, names=None):
+        '''
+        跳转主时钟, names为None时所有播放器随之跳转, 否则只跳转names中的播放器
+        '''
+        self.base_position = max(int(position), 0)
+        if self.base_time is not None:
+            self.base_time = time.perf_counter()
+        for name, (player, _) in self.players.items():
+            if names is None or name in names:
+                player.setPosition(self.base_position)
+
+    def correct_drift(self):
+        '''
+        记录各播放器与主时钟的偏差, 超过容差的播放器跳转到主时钟位置
+        '''
+        position = self.position()
+        for name, (player, tolerance) in self.players.items():
+            if player.state() != QMediaPlayer.State.PlayingState or position >= player.duration():
+                continue
+            offset = player.position() - position
+            corrected = abs(offset) > tolerance
+            if corrected:
+                player.setPosition(position)
+            self.offset_log.append((position, name, offset, corrected))
+
+    def drift_report(self):
+        '''
+        各播放器偏差统计: {名称: (次数, 平均偏差, 最大绝对偏差, 校正次数)}
+        '''
+        report = {}
+        for name in self.players:
+            offsets = [(offset, corrected) for _, player, offset, corrected in self.offset_log if player == name]
+            if offsets:
+                values = np.array([offset for offset, _ in offsets])
+                report[name] = (len(values), float(values.mean()), int(np.abs(values).max()),
+                                sum(corrected for _, corrected in offsets))
+        return report
+
+    def save_offset_log(self, filepath):
+        pd.DataFrame(self.offset_log, columns=['clock', 'player', 'offset', 'corrected']).to_csv(filepath, index=False)
+
+
+class AnnotationTableModel(QAbstractTableModel):
+    '''
+    标注表格模型: 每列对应一个IntervalIndex, 修改时只通知受影响的单元格
+    播放位置所在的片段高亮, 不在吞咽片段内的分期片段标红
+    模型预测片段作为只读层排在各列标注之后(灰色斜体), 不写入标注存储
+    '''
+
+    def __init__(self, column_name, parent=None):
+        super().__init__(parent)
+        self.column_name = column_name
+        self.store = None
+        self.predictions = {}
+        self.active = {}
+
+    def set_store(self, store):
+        self.beginResetModel()
+        self.store = store
+        self.active = {}
+        self.endResetModel()
+
+    def set_predictions(self, predictions):
+        '''
+        设置预测层{列名: [(起点s, 终点s), ...]}
+        '''
+        self.beginResetModel()
+        self.predictions = {name: sorted(segments) for name, segments in predictions.items()}
+        self.endResetModel()
+
+    def column_rows(self, name):
+        return len(self.store.indexes[name]) + len(self.predictions.get(name, ()))
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.store is None:
+            return 0
+        return max(self.column_rows(name) for name in self.column_name)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.column_name)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.column_name[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        name = self.column_name[index.column()]
+        row = index.row()
+        if self.store is None or row >= self.column_rows(name):
+            return None
+        if row >= len(self.store.indexes[name]):
+            return self.prediction_data(self.predictions[name][row - len(self.store.indexes[name])], role)
+        if role == Qt.ItemDataRole.DisplayRole:
+            start, end = self.store.indexes[name].keys[row]
+            return f'{start}s - {end}s'
+        elif role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignHCenter
+        elif role == Qt.ItemDataRole.BackgroundRole:
+            if row in self.active.get(index.column(), ()):
+                return QBrush(QColor(255, 224, 138))
+        elif role == Qt.ItemDataRole.ForegroundRole:
+            if self.store.outside(name, row):
+                return QBrush(QColor(200, 0, 0))
+        elif role == Qt.ItemDataRole.ToolTipRole:
+            if self.store.outside(name, row):
+                return "不在任何吞咽片段内"
+        return None
+
+    def prediction_data(self, segment, role):
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f'{segment[0]}s - {segment[1]}s'
+        elif role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignHCenter
+        elif role == Qt.ItemDataRole.ForegroundRole:
+            return QBrush(QColor(128, 128, 128))
+        elif role == Qt.ItemDataRole.FontRole:
+            font = QFont()
+            font.setItalic(True)
+            return font
+        elif role == Qt.ItemDataRole.ToolTipRole:
+            return "模型预测, 不保存"
+        return None
+
+    def column_changed(self, column, first_row):
+        '''
+        通知column列first_row之后的单元格变化, 吞咽列变化时分期列的一致性标记也需刷新
+        '''
+        last_row = self.rowCount() - 1
+        if column == 0:
+            self.dataChanged.emit(self.index(first_row, 0), self.index(last_row, len(self.column_name) - 1))
+        elif first_row <= last_row:
+            self.dataChanged.emit(self.index(first_row, column), self.index(last_row, column))
+
+    def insert(self, column, start, end):
+        name = self.column_name[column]
+        rows = self.rowCount()
+        grows = self.column_rows(name) == rows
+        if grows:
+            self.beginInsertRows(QModelIndex(), rows, rows)
+        row = self.store.insert(name, start, end)
+        if grows:
+            self.endInsertRows()
+        self.active.pop(column, None)
+        self.column_changed(column, row)
+
+    def remove(self, column, row):
+        name = self.column_name[column]
+        rows = self.rowCount()
+        shrinks = self.column_rows(name) == rows and \
+            sum(self.column_rows(other) == rows for other in self.column_name) == 1
+        if shrinks:
+            self.beginRemoveRows(QModelIndex(), rows - 1, rows - 1)
+        self.store.remove(name, row)
+        if shrinks:
+            self.endRemoveRows()
+        self.active.pop(column, None)
+        self.column_changed(column, row)
+
+    def set_position(self, time_point):
+        '''
+        更新播放位置所在片段的高亮, 只通知高亮变化的单元格
+        '''
+        if self.store is None:
+            return
+        for column, name in enumerate(self.column_name):
+            active = set(self.store.indexes[name].at(time_point))
+            previous = self.active.get(column, set())
+            self.active[column] = active
+            for row in active ^ previous:
+                self.dataChanged.emit(self.index(row, column), self.index(row, column),
+                                      [Qt.ItemDataRole.BackgroundRole])
+
+
+class DataTableWidget(QWidget):
+    changed = pyqtSignal()  # 标注内容变化(打开、编辑、模型分割)
+
+    def __init__(self):
+        super().__init__()
+        self.initUI()
+
+    def initUI(self):
+        layout = QVBoxLayout()
+
+        # 创建表格控件
+        self.column_name = ['吞咽', '口腔期', '咽期', '食管期', "吞咽前", "吞咽暂停", "吞咽后"]
+        self.table_model = AnnotationTableModel(self.column_name, self)
+        self.table_view = QTableView()
+        self.table_view.setModel(self.table_model)
+
+        layout.addWidget(self.table_view)
+        self.setLayout(layout)
+        self.json_path = None
+        self.store = None
+
+    def set_json_table(self, file_path):
+        self.apply(self.load(file_path))
+
+    def load(self, file_path):
+        return {'filepath': file_path, 'store': AnnotationStore.open(file_path)}
+
+    def apply(self, loaded):
+        reopen = self.store is not None and os.path.abspath(self.store.json_path) == os.path.abspath(loaded['filepath'])
+        self.close_store()
+        if reopen:
+            # 同一文件在后台打开时旧存储尚未合并, 合并后重新打开, 以免丢失期间的编辑
+            loaded = self.load(loaded['filepath'])
+        self.store = loaded['store']
+        self.json_dict = self.store.json_dict
+        self.json_path = loaded['filepath']
+        self.table_model.set_store(self.store)
+        self.changed.emit()
+
+    def set_predictions(self, predictions):
+        self.table_model.set_predictions(predictions)
+
+    def segments(self):
+        '''
+        所有标注片段[(列号, 起点ms, 终点ms), ...]
+        '''
+        if self.store is None:
+            return []
+        return [(column, start * 1000, end * 1000) for column, name in enumerate(self.column_name)
+                for start, end in self.store.indexes[name].keys]
+
+    def close_store(self):
+        '''
+        切换病人或退出时合并标注日志
+        '''
+        if self.store is not None:
+            self.store.compact()
+            self.store = None
+
+    def set_position(self, position):
+        self.table_model.set_position(position / 1000)
+
+    def add_content(self, column, start, end, checked):
+        '''
+        有序插入片段; 删除模式下删除该列与所选时间段重叠最多的片段
+        '''
+        start = round(start / 1000, 3)
+        end = round(end / 1000, 3)
+        if checked:
+            row = self.store.best_overlap(self.column_name[column], start, end)
+            if row is not None:
+                self.table_model.remove(column, row)
+        else:
+            self.table_model.insert(column, start, end)
+        self.changed.emit()
+
+
+class Mainwindows(QWidget):
+    def __init__(self, cache_mb=1024, sync_log=None):
+        super().__init__()
+        self.cache = PatientCache(cache_mb)
+        self.sync_log = sync_log
+        self.setWindowTitle("吞咽分割检测系统")
+        self.setWindowIcon(QApplication.style().standardIcon(QStyle.StandardPixmap.SP_MediaPlay))
+        self.init_ui()
+        self.showMaximized()
+
+    def init_ui(self):
+        '''
+        初始化控件
+        '''
+        self.current_state = State.IDLE
+        self.video_groupBox = QGroupBox("视频造影")
+        self.data_groupBox = QGroupBox("数据可视化")
+        self.console_groupBox = QGroupBox("控制台")
+        self.table_groupBox = QGroupBox("分割结果")
+        self.videoCT = VideoWidget()
+        self.videoWin = VideoWidget()
+        self.imu_win = DynamicPlot_Imu()
+        self.gas_win = DynamicPlot_Gas()
+        self.audio_win = DynamicPlot_Audio()
+        self.console = Console()
+        self.treeConsole = TreeWidget()
+        self.treeConsole.setVisible(False)
+        self.json_table = DataTableWidget()
+        self.overview = OverviewStrip(window_length=self.audio_win.window_length)
+        self.data_show_timer = QTimer(self)
+        self.data_show_timer.setInterval(30)
+        self.ui_timer = QTimer(self)
+        self.ui_timer.setInterval(150)
+        # 音频、视频均从属于主时钟, 界面定时器只读取主时钟
+        self.clock = MasterClock(self)
+        self.clock.add_player('audio', self.audio_win.audio_player, tolerance=150)
+        self.clock.add_player('video', self.videoWin.mediaPlayer)
+        self.clock.add_player('video_ct', self.videoCT.mediaPlayer)
+        self.loader = PatientLoader(self, self.cache)
+        self.switch_message = None
+        self.segmenter = PatientLoader(self)
+        self.predictions = {}
+        for plot in (self.imu_win, self.gas_win, self.audio_win):
+            # 索引在加载后才建立, 建立完成后重新计入缓存占用
+            plot.indexer.indexed.connect(lambda _: self.cache.update_sizes())
+
+        vedio_layout = QHBoxLayout()
+        vedio_layout.addWidget(self.videoWin, 2)
+        vedio_layout.addWidget(self.videoCT, 2)
+        self.video_groupBox.setLayout(vedio_layout)
+
+        data_layout = QVBoxLayout()
+        data_layout.addWidget(self.imu_win, 1)
+        data_layout.addWidget(self.gas_win, 1)
+        data_layout.addWidget(self.audio_win, 1)
+        data_layout.addWidget(self.overview)
+        self.data_groupBox.setLayout(data_layout)
+
+        view_layout = QHBoxLayout()
+        view_layout.addWidget(self.video_groupBox, 4)
+        view_layout.addWidget(self.data_groupBox, 3)
+
+        self.console_groupBox.setLayout(self.console.layout())
+        self.table_groupBox.setLayout(self.json_table.layout())
+        console_layout = QHBoxLayout()
+        console_layout.addWidget(self.console_groupBox, 4)
+        console_layout.addWidget(self.table_groupBox, 3)
+
+        main_layout = QVBoxLayout()
+        main_layout.addLayout(view_layout, 2)
+        main_layout.addLayout(console_layout, 1)
+
+        tree_layout = QHBoxLayout()
+        tree_layout.addWidget(self.treeConsole, 2)
+        tree_layout.addLayout(main_layout, 9)
+        self.setLayout(tree_layout)
+
+        # 播放
+        self.console.playButton.clicked.connect(self.play)
+
+        # 播放结束
+        self.console.stopbutton.clicked.connect(self.stop)
+
+        # 拖动位置
+        self.console.contrlSlider.sliderMoved.connect(self.sliderPosition)
+
+        # 概览条点击跳转, 显示标注片段
+        self.overview.seek.connect(self.overview_seek)
+        self.json_table.changed.connect(lambda: self.overview.set_segments(self.json_table.segments()))
+
+        # 播放时间改变
+        self.audio_win.audio_player.durationChanged.connect(self.console.set_slider_duration)
+        self.audio_win.audio_player.durationChanged.connect(self.clock.set_duration)
+        self.audio_win.audio_player.durationChanged.connect(self.overview.set_duration)
+
+        # 播放结束
+        self.audio_win.audio_player.stateChanged.connect(self.check_status)
+
+        # 打开目录
+        self.console.openButton.clicked.connect(self.treeConsole.tree_open)
+        self.console.nextButton.clicked.connect(self.treeConsole.next)
+        self.console.preButton.clicked.connect(self.treeConsole.pre)
+
+        # 逐帧前进/后退, 后退30帧
+        self.console.quickButton.clicked.connect(lambda: self.step_frames(1))
+        self.console.preFrameButton.clicked.connect(lambda: self.step_frames(-1))
+        self.console.backButton.clicked.connect(lambda: self.step_frames(-30))
+
+        # 拖动结束时精确跳转到帧
+        self.console.contrlSlider.sliderReleased.connect(
+            lambda: self.seek_frame(self.console.contrlSlider.value()))
+
+        # 显示音频谱图
+        self.console.spectrogram_checkbox.toggled.connect(self.audio_win.show_spectrogram)
+
+        # 缩放显示窗口
+        self.console.window_comboBox.currentIndexChanged.connect(
+            lambda index: self.set_window_length(WINDOW_LENGTHS[index]))
+
+        # 树目录设置选择文件
+        self.console.treetogle.clicked.connect(self.treetogle)
+        self.treeConsole.select_file.connect(self.set_source)
+        self.treeConsole.select_folder.connect(self.load_patient)
+        self.loader.finished.connect(self.patient_loaded)
+
+        # 模型分割
+        self.console.model_segment_button.clicked.connect(lambda: self.model_segment('swallow'))
+        self.console.detail_segment_button.clicked.connect(lambda: self.model_segment('detail'))
+        self.segmenter.finished.connect(self.model_segmented)
+        self.console.model_comboBox.currentTextChanged.connect(lambda _: self.show_predictions())
+
+        # 设置当前时间
+        self.console.get_positon_button.clicked.connect(self.get_cur_postion)
+
+        # 定时更新
+        self.data_show_timer.timeout.connect(self.update)
+        self.ui_timer.timeout.connect(self.updata_ui)
+
+        # 更新表格内容
+        self.console.swallow_record.clicked.connect(
+            lambda: self.json_table.add_content(0,
+                                                self.console.segment_pre_time,
+                                                self.console.segment_aft_time,
+                                                self.console.checkbox.isChecked()))
+        self.console.detail_swallow1.clicked.connect(
+            lambda: self.json_table.add_content(1,
+                                                self.console.segment_pre_time,
+                                                self.console.segment_aft_time,
+                                                self.console.checkbox.isChecked()))
+        self.console.detail_swallow2.clicked.connect(
+            lambda: self.json_table.add_content(2,
+                                                self.console.segment_pre_time,
+                                                self.console.segment_aft_time,
+                                                self.console.checkbox.isChecked()))
+        self.console.detail_swallow3.clicked.connect(
+            lambda: self.json_table.add_content(3,
+                                                self.console.segment_pre_time,
+                                                self.console.segment_aft_time,
+                                                self.console.checkbox.isChecked()))
+        self.console.detail_swallow4.clicked.connect(
+            lambda: self.json_table.add_content(4,
+                                                self.console.segment_pre_time,
+                                                self.console.segment_aft_time,
+                                                self.console.checkbox.isChecked()))
+        self.console.detail_swallow5.clicked.connect(
+            lambda: self.json_table.add_content(5,
+                                                self.console.segment_pre_time,
+                                                self.console.segment_aft_time,
+                                                self.console.checkbox.isChecked()))
+        self.console.detail_swallow6.clicked.connect(
+            lambda: self.json_table.add_content(6,
+                                                self.console.segment_pre_time,
+                                                self.console.segment_aft_time,
+                                                self.console.checkbox.isChecked()))
+
+    def get_cur_postion(self):
+        positon = self.clock.position()
+        self.console.set_cur_time(positon)
+
+    def check_status(self, state):
+        if state == QMediaPlayer.State.StoppedState:
+            self.stop()
+
+    def update(self):
+        positon = self.clock.position()
+        self.audio_win.update(positon)
+        self.imu_win.update(positon)
+        self.gas_win.update(positon)
+        self.overview.set_position(positon)
+        self.console.time_label.setText(f"{format_time(positon)} ms")
+
+    def updata_ui(self):
+        position = self.clock.position()
+        self.console.contrlSlider.setValue(position)
+        self.json_table.set_position(position)
+
+    def source_handler(self, file_path):
+        '''
+        按文件类型返回(加载函数, 界面应用函数)
+        '''
+        source = classify_source(file_path)
+        if source == 'audio':
+            return self.audio_win.load, partial(self.apply_plot, self.audio_win, source)
+        elif source == 'video_ct':
+            return self.videoCT.load, self.videoCT.apply
+        elif source == 'video':
+            return self.videoWin.load, self.videoWin.apply
+        elif source == 'imu':
+            return self.imu_win.load, partial(self.apply_plot, self.imu_win, source)
+        elif source == 'gas':
+            return self.gas_win.load, partial(self.apply_plot, self.gas_win, source)
+        elif source == 'annotation':
+            return self.json_table.load, self.json_table.apply
+        else:
+            raise Exception("type error")
+
+    def set_source(self, file_path):
+        if classify_source(file_path) in ('prediction', 'journal', None):
+            return  # 预测结果与标注日志不单独打开, 同load_patient
+        load_func, apply_func = self.source_handler(file_path)
+        apply_func(load_func(file_path))
+
+    def apply_plot(self, plot, source, loaded):
+        plot.apply(loaded)
+        plot.update(self.clock.position())
+        self.overview.set_envelope(source, loaded['overview'])
+
+    def load_patient(self, dir_path, message):
+        '''
+        后台加载病人文件夹, 各模态加载完成后依次显示
+        '''
+        try:
+            tasks = []
+            for entry in os.listdir(dir_path):
+                file_path = os.path.join(dir_path, entry)
+                if os.path.isdir(file_path):
+                    continue
+                try:
+                    load_func, apply_func = self.source_handler(file_path)
+                except Exception:
+                    continue  # 无法识别的文件(临时文件、预测结果、日志等)跳过, 同prefetch_neighbours
+                tasks.append((file_path, load_func, apply_func))
+        except Exception as e:
+            show_message(f"切换失败: {e}", closeFlg=False)
+            return
+        self.switch_message = message
+        self.overview.clear()
+        self.predictions = read_predictions(dir_path)
+        self.show_predictions()
+        self.loader.load(tasks)
+
+    def prefetch_neighbours(self):
+        '''
+        预取前后相邻病人
+        '''
+        folders, current = self.treeConsole.folders, self.treeConsole.current_fold_idx
+        tasks = []
+        for index in (current + 1, current - 1):
+            if 0 <= index < len(folders):
+                for entry in os.listdir(folders[index]):
+                    file_path = os.path.join(folders[index], entry)
+                    try:
+                        load_func, _ = self.source_handler(file_path)
+                    except Exception:
+                        continue
+                    tasks.append((file_path, load_func))
+        self.loader.prefetch(tasks)
+
+    def patient_loaded(self, errors):
+        self.prefetch_neighbours()
+        if errors:
+            show_message(f"切换失败: {'; '.join(errors)}", closeFlg=False)
+        else:
+            show_message(self.switch_message)
+
+    def model_segment(self, task):
+        '''
+        后台运行所选模型分割当前病人, 结果写入PREDICTION_FILE, 在表格预测层和概览条上显示, 不修改人工标注
+        '''
+        plots = (self.audio_win, self.imu_win, self.gas_win)
+        if any(plot.signal_window is None for plot in plots) or self.json_table.json_path is None:
+            show_message("请先打开包含音频、imu、气流量和标注文件的病人", closeFlg=False)
+            return
+        model_name = self.console.model_comboBox.currentText()
+        audio, scale, imu, gas = self.audio_win.data, self.audio_win.scale, self.imu_win.data, self.gas_win.data
+        self.console.model_segment_button.setEnabled(False)
+        self.console.detail_segment_button.setEnabled(False)
+        dir_path = os.path.dirname(self.json_table.json_path)
+
+        def run(_):
+            result = {'version': segment_model_version(model_name, task),
+                      'segments': segment_signals(model_name, task, audio, scale, imu, gas)}
+            return write_predictions(dir_path, model_name, {task: result})
+
+        self.segmenter.load([(dir_path, run, partial(self.apply_predictions, dir_path))])
+
+    def apply_predictions(self, dir_path, predictions):
+        if self.json_table.json_path is not None and os.path.dirname(self.json_table.json_path) == dir_path:
+            self.predictions = predictions
+            self.show_predictions()
+
+    def show_predictions(self):
+        '''
+        在表格预测层和概览条上显示所选模型对当前病人的分割结果
+        '''
+        column_name = self.json_table.column_name
+        results = self.predictions.get(self.console.model_comboBox.currentText(), {})
+        predictions = {}
+        for result in results.values():
+            for label, segments in result['segments'].items():
+                if label in column_name:
+                    predictions.setdefault(label, []).extend((segment['start'], segment['end'])
+                                                             for segment in segments)
+        self.json_table.set_predictions(predictions)
+        self.overview.set_predictions([(column_name.index(label), start * 1000, end * 1000)
+                                       for label, segments in predictions.items() for start, end in segments])
+
+    def model_segmented(self, errors):
+        self.console.model_segment_button.setEnabled(True)
+        self.console.detail_segment_button.setEnabled(True)
+        if errors:
+            show_message(f"模型分割失败: {'; '.join(errors)}", closeFlg=False)
+        else:
+            show_message(f"模型分割完成, 结果已保存到{PREDICTION_FILE}")
+
+    def sliderPosition(self, position):
+        if not self.console.contrlSlider.isSliderDown():
+            self.clock.seek(position)
+            self.update()
+            return
+        # 拖动中有帧索引的视频只跳到关键帧, 响应快; 松开后由seek_frame精确跳转
+        keyframe_videos = {name: video for name, video in (('video', self.videoWin), ('video_ct', self.videoCT))
+                           if video.frames is not None and len(video.frames)}
+        self.clock.seek(position, [name for name in self.clock.players if name not in keyframe_videos])
+        for video in keyframe_videos.values():
+            video.mediaPlayer.setPosition(video.frames.keyframe_before(position))
+        self.update()
+
+    def overview_seek(self, position):
+        self.console.contrlSlider.setValue(position)
+        self.sliderPosition(position)
+
+    def set_window_length(self, window_length):
+        '''
+        三个数据窗口同步缩放, 概览条上的当前窗口随之变化
+        '''
+        for plot in (self.imu_win, self.gas_win, self.audio_win):
+            plot.set_window_length(window_length)
+        self.overview.window_length = window_length
+        self.overview.update()
+        self.update()
+
+    def reference_frames(self):
+        '''
+        逐帧步进所依据的帧索引: 优先造影视频
+        '''
+        for video in (self.videoCT, self.videoWin):
+            if video.frames is not None and len(video.frames):
+                return video.frames
+        return None
+
+    def seek_frame(self, position):
+        '''
+        对齐到position所在帧的起始时间后跳转, 视频与信号显示同一帧
+        '''
+        frames = self.reference_frames()
+        if frames is not None:
+            position = frames.time_of(frames.frame_at(position))
+        self.clock.seek(position)
+        self.console.contrlSlider.setValue(position)
+        self.update()
+
+    def step_frames(self, count):
+        '''
+        暂停后前进/后退count帧, 无帧索引时按30帧/秒
+        '''
+        if self.current_state == State.RUNNING:
+            self.play()  # 先暂停
+        position = self.clock.position()
+        frames = self.reference_frames()
+        if frames is not None:
+            position = frames.time_of(frames.frame_at(position) + count)
+        else:
+            position = max(position + round(count * 1000 / 30), 0)
+        self.seek_frame(position)
+
+    def closeEvent(self, event):
+        self.json_table.close_store()
+        if self.sync_log:
+            self.clock.save_offset_log(self.sync_log)
+            for name, (count, mean, largest, corrected) in self.clock.drift_report().items():
+                print(f"{name}: 采样{count}次, 平均偏差{mean:.1f}ms, 最大偏差{largest}ms, 校正{corrected}次")
+        super().closeEvent(event)
+
+    def treetogle(self):
+        self.treeConsole.setVisible(not self.treeConsole.isVisible())
+
+    def play(self):
+        if self.current_state == State.RUNNING:
+            self.clock.pause()
+            self.data_show_timer.stop()
+            self.ui_timer.stop()
+            self.current_state = State.PAUSED
+            self.console.set_icon(QStyle.StandardPixmap.SP_MediaPause)
+        else:
+            self.clock.start()
+            self.data_show_timer.start()
+            self.ui_timer.start()
+            self.current_state = State.RUNNING
+            self.console.set_icon(QStyle.StandardPixmap.SP_MediaPlay)
+
+    def stop(self):
+        self.clock.stop()
+        self.imu_win.stop()
+        self.gas_win.stop()
+        self.audio_win.stop()
+        self.data_show_timer.stop()
+        self.ui_timer.stop()
+        self.current_state = State.STOPPED
+
+
+def format_time(pos):
+    total_seconds, ms = divmod(pos, 1000)  # 将时间转换为总秒数
+    minutes, seconds = divmod(total_seconds, 60)  # 分钟和秒钟的整除和余数
+    hours, minutes = divmod(minutes, 60)  # 小时和分钟的整除和余数
+
+    # 格式化为字符串
+    time_string = "{:02d}:{:02d}:{:02d}:{:03d}".format(hours, minutes, seconds, ms)
+    return time_string
+
+
+def run_application(backend='matplotlib', cache_mb=1024, sync_log=None):
+    '''
+    主程序入口
+    '''
+    app = QApplication(sys.argv)
+    set_plot_backend(backend)
+    window = Mainwindows(cache_mb, sync_log)
+    window.show()
+    sys.exit(app.exec_())
+
+
+def run_benchmark(frames=300, duration=60):
+    '''
+    绘图后端帧率对比: 用合成数据按30ms节拍同时刷新三个信号窗口
+    '''
+    app = QApplication(sys.argv)
+    rng = np.random.default_rng(0)
+    time_column = np.arange(duration * 1000)
+    gas_data = pd.DataFrame({'time': time_column[::10], 'value': rng.normal(size=duration * 100)})
+    imu_data = pd.DataFrame({'time': time_column, 'X': rng.normal(size=duration * 1000),
+                             'Y': rng.normal(size=duration * 1000), 'Z': rng.normal(size=duration * 1000)})
+    audio_data = rng.normal(size=duration * 16000)
+    for name in PLOT_BACKENDS:
+        try:
+            set_plot_backend(name)
+        except ImportError as e:
+            print(f"{name}: 跳过({e})")
+            continue
+        plots = [DynamicPlot_Audio(), DynamicPlot_Gas(), DynamicPlot_Imu()]
+        for plot, data in zip(plots, [audio_data, gas_data, imu_data]):
+            plot.data = data
+            plot.dataGenerator()
+            plot.resize(800, 200)
+            plot.show()
+        app.processEvents()
+        start_time = time.perf_counter()
+        for frame in range(frames):
+            for plot in plots:
+                plot.update(frame * 30)
+            app.processEvents()
+        elapsed = time.perf_counter() - start_time
+        print(f"{name}: {frames / elapsed:.1f} FPS ({elapsed / frames * 1000:.1f} ms/帧, 三个窗口)")
+        for window_length in WINDOW_LENGTHS:
+            start_time = time.perf_counter()
+            for plot in plots:
+                plot.set_window_length(window_length)
+                plot.update(duration * 500)
+            app.processEvents()
+            print(f"    缩放到{window_length}ms: {(time.perf_counter() - start_time) * 1000:.1f} ms")
+        for plot in plots:
+            plot.close()
@@ -3,226 +3,302 @@ import sys
 import os
 import pandas as pd
 import numpy as np
-from enum import Enum
 import json
+import time
+import struct
+import argparse
+import threading
+import hashlib
+import bisect
+import sqlite3
+import subprocess
+from functools import partial
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-from PyQt5.QtWidgets import QApplication, QStyle, QWidget, QVBoxLayout, QHBoxLayout, QFileDialog, QSizePolicy, QLabel, \
-        QPushButton, QRubberBand, QFileSystemModel, QTreeView, QSlider, QComboBox, QMessageBox, QTableWidget, QTableWidgetItem, \
-        QGroupBox, QGridLayout, QCheckBox
-from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
-from PyQt5.QtMultimediaWidgets import QVideoWidget
-from PyQt5.QtCore import Qt, QUrl, pyqtSignal, QTimer, QSize, QRect, QDir, QModelIndex
-from PyQt5.QtGui import QFont
 from moviepy.editor import AudioFileClip
+try:
+    import onnxruntime as ort
+except ImportError:  # onnxruntime为可选推理后端
+    ort = None
+try:
+    import torch
+except ImportError:  # torch为可选推理后端
+    torch = None
+try:
+    import imageio_ffmpeg  # moviepy自带的ffmpeg, 用于建立视频帧索引
+except ImportError:
+    imageio_ffmpeg = None
+
+
+def estimate_nbytes(obj):
+    '''
+    估算加载结果占用的内存(字节), 内存映射的数据不计
+    '''
+    if isinstance(obj, np.memmap):
+        return 0
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True).sum())
+    if isinstance(obj, dict):
+        return sum(estimate_nbytes(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(estimate_nbytes(value) for value in obj)
+    return getattr(obj, 'nbytes', 0)
+
+
+class PatientCache:
+    '''
+    已加载文件的LRU缓存
+    以(路径, 修改时间, 大小)为键, 文件被修改(如标注保存)后自动失效; 超出内存预算时淘汰最久未用的文件
+    '''
 
+    def __init__(self, budget_mb=1024):
+        self.budget = budget_mb * 1024 * 1024
+        self.entries = OrderedDict()
+        self.keys = {}
+        self.loading = {}
+        self.nbytes = 0
+        self.lock = threading.Lock()
 
-class State(Enum):
-    IDLE = 1
-    RUNNING = 2
-    PAUSED = 3
-    STOPPED = 4
-
-
-def show_message(message, closeFlg=True):
-    msg = QMessageBox()
-    msg.setIcon(QMessageBox.Icon.Information)
-    msg.setText(message)
-    msg.setWindowTitle("提示")
-    if closeFlg:
-        QTimer.singleShot(1000, msg.close)
-    msg.exec_()
-
-
-class Console(QWidget):
-    '''
-    控制台
-    '''
-
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.treetogle = QPushButton(self, text="显示目录")
-        self.treetogle.setIcon(QApplication.style().standardIcon(QStyle.StandardPixmap.SP_ArrowLeft))
-
-        self.openButton = QPushButton(self, text="打开文件")
-        self.openButton.setIcon(QApplication.style().standardIcon(QStyle.StandardPixmap.SP_DirHomeIcon))
-
-        self.stopbutton = QPushButton(self, text="停止")
-        self.stopbutton.setIcon(QApplication.style().standardIcon(QStyle.StandardPixmap.SP_MediaStop))
-
-        self.playButton = QPushButton(self, text="播放")
-        self.playButton.setIcon(QApplication.style().standardIcon(QStyle.StandardPixmap.SP_MediaPlay))
-
-        self.preButton = QPushButton(self, text="上一个")
-        self.preButton.setIcon(QApplication.style().standardIcon(QStyle.StandardPixmap.SP_MediaSkipBackward))
-
-        self.nextButton = QPushButton(self, text="下一个")
-        self.nextButton.setIcon(QApplication.style().standardIcon(QStyle.StandardPixmap.SP_MediaSkipForward))
-
-        self.backButton = QPushButton(self, text="后退1秒(30帧)")
-        self.quickButton = QPushButton(self, text="快进10帧")
-
-        self.checkbox = QCheckBox("删除模式")
-
-        horizontalLayout = QHBoxLayout()
-        horizontalLayout.addWidget(self.treetogle)
-        horizontalLayout.addWidget(self.openButton)
-        horizontalLayout.addWidget(self.stopbutton)
-        horizontalLayout.addWidget(self.playButton)
-        horizontalLayout.addWidget(self.preButton)
-        horizontalLayout.addWidget(self.nextButton)
-        horizontalLayout.addWidget(self.backButton)
-        horizontalLayout.addWidget(self.quickButton)
-        horizontalLayout.addWidget(self.checkbox)
-
-        self.contrlSlider = QSlider(self)
-        self.contrlSlider.setOrientation(Qt.Orientation.Horizontal)
-        self.contrlSlider.setValue(0)
-
-        self.time_label = QLabel()
-        self.time_label.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Maximum)
-        self.time_label.setText("00:00:00:000 ms")
-
-        slider_layout = QHBoxLayout()
-        slider_layout.addWidget(self.contrlSlider)
-        slider_layout.addWidget(self.time_label)
-
-        self.get_positon_button = QPushButton(self, text="设置当前时间")
-        self.swallow_record = QPushButton(self, text="吞咽")
-        self.detail_swallow1 = QPushButton(self, text="口腔期")
-        self.detail_swallow2 = QPushButton(self, text="咽期")
-        self.detail_swallow3 = QPushButton(self, text="食管期")
-        self.detail_swallow4 = QPushButton(self, text="吞咽前")
-        self.detail_swallow5 = QPushButton(self, text="吞咽暂停")
-        self.detail_swallow6 = QPushButton(self, text="吞咽后")
-
-        self.segment_label = QLabel()
-        self.segment_label.setText("00:00:00:000 - 00:00:00:000 ms")
-        self.segment_pre_time = 0
-        self.segment_aft_time = 0
-
-        self.segment_groupBox = QGroupBox("吞咽分割")
-        segment_layout = QGridLayout()
-        segment_layout.addWidget(self.swallow_record, 0, 0)
-        segment_layout.addWidget(self.get_positon_button, 0, 1)
-        segment_layout.addWidget(self.segment_label, 0, 2)
-        segment_layout.addWidget(self.detail_swallow1, 1, 0)
-        segment_layout.addWidget(self.detail_swallow2, 1, 1)
-        segment_layout.addWidget(self.detail_swallow3, 1, 2)
-        segment_layout.addWidget(self.detail_swallow4, 2, 0)
-        segment_layout.addWidget(self.detail_swallow5, 2, 1)
-        segment_layout.addWidget(self.detail_swallow6, 2, 2)
-        self.segment_groupBox.setLayout(segment_layout)
-
-        self.selected_model_label = QLabel("选择模型")
-        self.model_comboBox = QComboBox()
-        self.model_comboBox.addItem("CFSCNet")
-        self.model_comboBox.addItem("Detail Model")
-        self.model_segment_button = QPushButton(self, text="模型吞咽分割")
-        self.detail_segment_button = QPushButton(self, text="模型细分割")
-        self.model_groupBox = QGroupBox("模型分割")
-
-        model_layout = QVBoxLayout()
-        h_layout = QHBoxLayout()
-        h_layout.addWidget(self.selected_model_label, 1)
-        h_layout.addWidget(self.model_comboBox, 4)
-        model_layout.addLayout(h_layout)
-        model_layout.addWidget(self.model_segment_button)
-        model_layout.addWidget(self.detail_segment_button)
-        self.model_groupBox.setLayout(model_layout)
-
-        verti_layout = QVBoxLayout()
-        verti_layout.addLayout(slider_layout)
-        verti_layout.addLayout(horizontalLayout)
-        h_layout = QHBoxLayout()
-        h_layout.addWidget(self.model_groupBox, 1)
-        h_layout.addWidget(self.segment_groupBox, 4)
-        verti_layout.addLayout(h_layout)
-        self.setLayout(verti_layout)
-
-    def set_icon(self, icon_type):
-        self.playButton.setIcon(QApplication.style().standardIcon(icon_type))
-
-    def set_slider_duration(self, duration):
-        self.contrlSlider.setRange(0, duration)
-
-    def set_cur_time(self, postion):
-        self.segment_pre_time = self.segment_aft_time
-        self.segment_aft_time = postion
-        self.segment_label.setText(f"{format_time(self.segment_pre_time)} - {format_time(self.segment_aft_time)} ms")
-
-
-class TreeWidget(QWidget):
-    '''
-    目录控件
-    '''
-    select_file = pyqtSignal(str)
-
-    def __init__(self, parent=None):
-        super().__init__(parent)
-
-        self.treeview = QTreeView(self)
-        self.model = QFileSystemModel(self)
-        self.model.setRootPath(QDir.currentPath() + "/..")
-        self.model.setNameFilterDisables(False)
-        self.model.setNameFilters(["*.csv", "*.mp4", "*.wav", "*.avi", "*.json"])
-        self.treeview.setModel(self.model)
-        self.treeview.setColumnHidden(1, True)
-        self.treeview.setColumnHidden(2, True)
-        self.treeview.setColumnHidden(3, True)
-        self.treeview.setRootIndex(self.model.index(self.model.rootPath()))
-        self.treeview.clicked.connect(self.treeview_clicked)
-        layout = QVBoxLayout()
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.addWidget(self.treeview)
-        self.setLayout(layout)
-
-    def treeview_clicked(self, index: QModelIndex):
-        '''
-        选择文件
-        '''
-        file_path = self.model.filePath(index)
-        self.select_file.emit(file_path)
-
-    def tree_open(self):
-        '''
-        打开文件夹
-        '''
-        fileroot = QFileDialog.getExistingDirectory(self, 'open')
-        self.model.setRootPath(fileroot)
-        self.treeview.setRootIndex(self.model.index(fileroot))
-        self.folders = []
-        for foldername, subfolders, filenames in os.walk(fileroot):
-            if "Annotated.json" in filenames:
-                self.folders.append(foldername)
-        self.current_fold_idx = -1
-        self.next()
-
-    def next(self):
-        if self.current_fold_idx < len(self.folders) - 1:
-            try:
-                self.current_fold_idx += 1
-                dir_path = self.folders[self.current_fold_idx]
-                entries = os.listdir(dir_path)
-                for entry in entries:
-                    self.select_file.emit(os.path.join(dir_path, entry))
-                show_message("已切换下一个病人")
-            except Exception as e:
-                show_message(f"切换失败: {e}", closeFlg=False)
+    @staticmethod
+    def file_key(filepath):
+        stat = os.stat(filepath)
+        return os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size
+
+    def __contains__(self, filepath):
+        with self.lock:
+            return self.file_key(filepath) in self.entries
+
+    def load(self, filepath, load_func, key=None):
+        '''
+        命中直接返回, 否则加载并缓存; 同一文件被多个线程同时请求时只加载一次
+        key默认为file_key(filepath), 其第一项相同的旧条目在写入时被替换
+        '''
+        key = self.file_key(filepath) if key is None else key
+        while True:
+            with self.lock:
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    return self.entries[key][0]
+                event = self.loading.get(key)
+                if event is None:
+                    event = self.loading[key] = threading.Event()
+                    break
+            event.wait()
+        try:
+            result = load_func(filepath)
+            self.put(key, result)
+            return result
+        finally:
+            with self.lock:
+                del self.loading[key]
+            event.set()
+
+    def put(self, key, result):
+        nbytes = estimate_nbytes(result)
+        with self.lock:
+            old_key = self.keys.get(key[0])
+            if old_key is not None:
+                self.nbytes -= self.entries.pop(old_key)[1]
+            self.entries[key] = (result, nbytes)
+            self.keys[key[0]] = key
+            self.nbytes += nbytes
+            self.evict()
+
+    def update_sizes(self):
+        '''
+        重新估算各条目占用, 后台索引(RangeIndex、包络金字塔、逐步y轴范围)建立完成后调用
+        '''
+        with self.lock:
+            for key, (result, _) in self.entries.items():
+                self.entries[key] = (result, estimate_nbytes(result))
+            self.nbytes = sum(nbytes for _, nbytes in self.entries.values())
+            self.evict()
+
+    def evict(self):
+        '''
+        超出内存预算时淘汰最久未用的条目, 调用时需持有锁
+        '''
+        while self.nbytes > self.budget and len(self.entries) > 1:
+            evicted_key, (_, evicted_nbytes) = self.entries.popitem(last=False)
+            del self.keys[evicted_key[0]]
+            self.nbytes -= evicted_nbytes
+
+
+WAV_DTYPES = {(1, 8): 'u1', (1, 16): '<i2', (1, 32): '<i4', (3, 32): '<f4', (3, 64): '<f8'}
+
+
+# WAVE_FORMAT_EXTENSIBLE的SubFormat GUID: 前2字节为格式码, 其余为固定后缀
+WAV_GUID_SUFFIX = b'\x00\x00\x00\x00\x10\x00\x80\x00\x00\xaa\x00\x38\x9b\x71'
+
+
+def read_wav(filepath):
+    '''
+    内存映射读取WAV, 不解码不复制(8位无符号采样需平移到以0为中心, 复制一份)
+    返回(采样率, 第一通道原始采样, 归一化到[-1, 1]的缩放系数)
+    '''
+    with open(filepath, 'rb') as wav_file:
+        riff, _, wave = struct.unpack('<4sI4s', wav_file.read(12))
+        if riff != b'RIFF' or wave != b'WAVE':
+            raise ValueError(f"非WAV文件: {filepath}")
+        fmt = None
+        while True:
+            header = wav_file.read(8)
+            if len(header) < 8:
+                raise ValueError(f"WAV缺少data块: {filepath}")
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                fmt_data = wav_file.read(chunk_size + chunk_size % 2)
+                fmt = struct.unpack('<HHIIHH', fmt_data[:16])
+                sub_format = fmt_data[24:40]
+            elif chunk_id == b'data':
+                offset = wav_file.tell()
+                break
+            else:
+                wav_file.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+    if fmt is None:
+        raise ValueError(f"WAV缺少fmt块: {filepath}")
+    format_tag, channels, samplerate, _, block_align, bits = fmt
+    if format_tag == 0xFFFE and len(sub_format) == 16 and sub_format[2:] == WAV_GUID_SUFFIX:
+        # WAVE_FORMAT_EXTENSIBLE, 实际格式由SubFormat给出; 无法识别时报错, 由read_audio改用moviepy解码
+        format_tag = struct.unpack('<H', sub_format[:2])[0]
+    dtype = WAV_DTYPES.get((format_tag, bits))
+    if dtype is None:
+        raise ValueError(f"不支持的WAV格式: format={format_tag}, bits={bits}")
+    frames = min(chunk_size, os.path.getsize(filepath) - offset) // block_align
+    data = np.memmap(filepath, dtype=dtype, mode='r', offset=offset, shape=(frames, channels))[:, 0]
+    if format_tag == 3:
+        scale = 1.0
+    elif bits == 8:
+        data = (data ^ np.uint8(0x80)).view(np.int8)  # 8位为无符号, 中心128, 翻转最高位即减去128
+        scale = 1 / 128
+    else:
+        scale = 1 / 2 ** (bits - 1)
+    return samplerate, data, scale
 
-    def pre(self):
-        if self.current_fold_idx > 0:
-            try:
-                self.current_fold_idx -= 1
-                dir_path = self.folders[self.current_fold_idx]
-                entries = os.listdir(dir_path)
-                for entry in entries:
-                    self.select_file.emit(os.path.join(dir_path, entry))
-                show_message("已切换上一个病人")
-            except Exception as e:
-                show_message(f"切换失败: {e}", closeFlg=False)
+
+CACHE_DIR = '.cache'
+
+
+def cache_paths(filepath, tag='data'):
+    '''
+    侧边缓存路径: 同目录.cache下的<文件名>.<tag>.json(头信息)和<文件名>.<tag>.<数组名>.npy
+    '''
+    dir_path, file_name = os.path.split(filepath)
+    prefix = os.path.join(dir_path, CACHE_DIR, f"{file_name}.{tag}")
+    return prefix, prefix + '.json'
+
+
+def load_cache(filepath, tag='data', **expect):
+    '''
+    内存映射读取侧边缓存, 返回({数组名: 数组}, 头信息)
+    缓存不存在、源文件修改时间/大小变化或头信息与expect不符时返回None
+    '''
+    prefix, meta_path = cache_paths(filepath, tag)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as meta_file:
+            meta = json.load(meta_file)
+        stat = os.stat(filepath)
+        if meta['mtime_ns'] != stat.st_mtime_ns or meta['size'] != stat.st_size:
+            return None
+        if any(meta.get(key) != value for key, value in expect.items()):
+            return None
+        arrays = {name: np.load(f"{prefix}.{name}.npy", mmap_mode='r') for name in meta['arrays']}
+        return arrays, meta
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_cache(filepath, arrays, tag='data', **meta):
+    '''
+    写入侧边缓存, 头信息最后写入作为完成标记; 目录不可写时忽略
+    '''
+    prefix, meta_path = cache_paths(filepath, tag)
+    stat = os.stat(filepath)
+    meta.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size, arrays=list(arrays))
+    try:
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        for name, array in arrays.items():
+            with open(f"{prefix}.{name}.npy.tmp", 'wb') as array_file:
+                np.save(array_file, array)
+            os.replace(f"{prefix}.{name}.npy.tmp", f"{prefix}.{name}.npy")
+        with open(meta_path + '.tmp', 'w', encoding='utf-8') as meta_file:
+            json.dump(meta, meta_file, ensure_ascii=False)
+        os.replace(meta_path + '.tmp', meta_path)
+    except OSError:
+        pass
+
+
+def read_signal_csv(filepath):
+    '''
+    读取imu/gas的CSV, 优先内存映射侧边缓存(按列存储), 首次读取时写入缓存
+    '''
+    cached = load_cache(filepath)
+    if cached is not None:
+        arrays, meta = cached
+        return pd.DataFrame(arrays['data'].T, columns=meta['columns'], copy=False)
+    data = pd.read_csv(filepath)
+    if len(data) and all(np.issubdtype(dtype, np.number) for dtype in data.dtypes):
+        times = data['time'].values
+        samplerate = 1000 / np.median(np.diff(times)) if len(times) > 1 else 0.0
+        save_cache(filepath, {'data': np.ascontiguousarray(data.values.T, dtype=np.float64)},
+                   columns=list(data.columns), samplerate=float(samplerate), start_time=float(times[0]))
+    return data
+
+
+def read_audio(filepath, samplerate):
+    '''
+    读取音频第一通道, 返回(采样, 归一化到[-1, 1]的缩放系数)
+    '''
+    if filepath.lower().endswith('.wav'):
+        try:
+            # PCM WAV直接内存映射, 保持原始类型
+            wav_samplerate, data, scale = read_wav(filepath)
+            if wav_samplerate == samplerate:
+                return data, scale
+        except ValueError:
+            pass
+    # 其他容器或采样率不符时经moviepy解码重采样, 结果写入侧边缓存
+    cached = load_cache(filepath, samplerate=samplerate)
+    if cached is not None:
+        return cached[0]['data'], 1.0
+    audio_clip = AudioFileClip(filepath, fps=samplerate)
+    data = audio_clip.to_soundarray()[:, 0].astype(np.float32)
+    save_cache(filepath, {'data': data}, samplerate=samplerate, start_time=0.0)
+    return data, 1.0
+
+
+def find_patient_folders(root):
+    '''
+    查找root下所有包含Annotated.json的病人文件夹
+    '''
+    folders = []
+    for foldername, subfolders, filenames in os.walk(root):
+        # 跳过侧边缓存目录
+        subfolders[:] = sorted(folder for folder in subfolders if folder != CACHE_DIR)
+        if "Annotated.json" in filenames:
+            folders.append(foldername)
+    return folders
+
+
+def classify_source(file_path):
+    '''
+    按文件名判断模态: audio/video/video_ct/imu/gas/annotation/prediction/journal, 无法识别返回None
+    '''
+    if os.path.basename(file_path) == PREDICTION_FILE:
+        return 'prediction'
+    if file_path.endswith(JOURNAL_SUFFIX):
+        return 'journal'
+    file_name, file_extension = os.path.splitext(os.path.basename(file_path))
+    if file_extension == '.wav':
+        return 'audio'
+    elif file_extension == '.mp4' or file_extension == '.avi':
+        return 'video_ct' if 'ct' in file_name else 'video'
+    elif file_extension == '.csv':
+        return 'imu' if 'imu' in file_name else 'gas'
+    elif file_extension == '.json':
+        return 'annotation'
+    return None
 
 
 def extract_process_folder(filepath):
@@ -235,789 +311,1870 @@ def extract_process_folder(filepath):
         return None
 
 
-class MplCanvas(FigureCanvas):
-    '''
-    基础绘图类
-    '''
-    signal_select = pyqtSignal(tuple)
-
-    def __init__(self, length, parent=None, width=5, height=4, dpi=100, zero_line=False, color='green', lines=1):
-        fig = Figure(figsize=(width, height), dpi=dpi)
-        self.axes = fig.add_subplot(111)
-        self.axes.set_facecolor('white')
-        super(MplCanvas, self).__init__(fig)
-        fig.tight_layout()
-        self.axes.xaxis.set_visible(False)
-        self.axes.set_position([0, 0, 1, 1])
-        self.axes.set_xlim(0, length)
-        self.axes.tick_params(axis='both', which='both', bottom=False, top=False, left=False, right=False)
-        fig.subplots_adjust(left=0, right=1, top=1, bottom=0)
-        self.axes.yaxis.grid(True, linestyle='--', color='gray')
-        if zero_line:
-            self.axes.yaxis.set_ticks([0])
-            self.axes.yaxis.grid(True, linestyle='-', color='black')
-        if lines == 1:
-            plot_refs = self.axes.plot(np.zeros(length), color=color)[0]
-        else:
-            colors = ['blue', 'green', 'red']
-            plot_refs = [self.axes.plot(np.zeros(length), color=colors[i])[0] for i in range(lines)]
-        self.plot = plot_refs
-
-        # 设置rcParams参数
-        plt.rcParams['agg.path.chunksize'] = 1000
-        plt.rcParams['figure.dpi'] = 80
-        plt.rcParams['figure.figsize'] = [6, 4]
-        plt.rcParams['savefig.dpi'] = 100
-
-        self.rubberBand = QRubberBand(QRubberBand.Shape.Rectangle, self)
-        self.rubberBand.hide()
-        self.origin = None
-
-    '''
-    鼠标框选函数
-    '''
-    def mousePressEvent(self, event):
-        if event.button() == Qt.MouseButton.LeftButton:
-            self.rubberBand.raise_()
-            self.origin = event.pos()
-            self.rubberBand.setGeometry(QRect(self.origin, QSize()))
-            self.rubberBand.show()
-
-    def mouseMoveEvent(self, event):
-        if self.origin:
-            self.rubberBand.setGeometry(QRect(self.origin, event.pos()).normalized())
-
-    def mouseReleaseEvent(self, event):
-        if event.button() == Qt.MouseButton.LeftButton:
-            selected_area = self.rubberBand.geometry()
-            parent_width = self.width()
-            left_distance = parent_width - selected_area.left()
-            right_distance = parent_width - selected_area.right()
-            left_percent = min(100, (left_distance / parent_width) * 100)
-            right_percent = max(0, (right_distance / parent_width) * 100)
-            self.signal_select.emit((left_percent, right_percent))
-            self.rubberBand.hide()
-            self.origin = None
-
-
-class DynamicPlot_Audio(QWidget):
-    '''
-    音频类
-    '''
-
-    def __init__(self):
-        super().__init__()
-        self.audio_player = QMediaPlayer()
-        self.buffer = []
-        self.interval = 15
-        self.samplerate = 16000
-        self.window_length = 3000
-        self.max_value, self.min_value = 0, 0
-        self.length = int(self.window_length * self.samplerate / 1000)
-        self.data = None
-        self.dir_path, self.file_name = None, None
-        self.plot_data = None
-        self.window_sample = int(self.interval / 1000 * self.samplerate)
-        self.raise_()
-        layout = QVBoxLayout()
-        self.canvas = MplCanvas(parent=self, length=self.length, color='blue', width=5, height=4, dpi=30)
-        self.setMouseTracking(True)
-        layout.addWidget(self.canvas)
-        self.setLayout(layout)
-        self.canvas.signal_select.connect(self.update_win)
-
-    def setData(self, filepath):
-        '''
-        设置数据路径
-        '''
-        self.buffer = []
-        self.stop()
-        self.dir_path, self.file_name = os.path.split(filepath)
-        self.root_path = extract_process_folder(self.dir_path)
-        audio_clip = AudioFileClip(filepath, fps=self.samplerate)
-        self.audio_duration = audio_clip.duration
-        self.data = audio_clip.to_soundarray()[:, 0]
-        media_content = QMediaContent(QUrl.fromLocalFile(filepath))
-        self.audio_player.setMedia(media_content)
-        self.dataGenerator()
-
-    def dataGenerator(self):
-        '''
-        抽取绘图数据
-        '''
-        gen_plotdata = np.zeros(self.length)
-        padding_length = (self.window_sample - len(self.data) % self.window_sample) % self.window_sample
-        padded_data = np.pad(self.data, (0, padding_length), 'constant', constant_values=0)
-        segments = np.array_split(padded_data, len(padded_data) // self.window_sample)
-        buffer = []
-        shift = self.window_sample
-        self.totalIndex = len(segments) - 1
-        for segment in segments:
-            gen_plotdata = np.roll(gen_plotdata, -shift, axis=0)
-            gen_plotdata[-shift:] = segment
-            min_value = np.min(gen_plotdata)
-            max_value = np.max(gen_plotdata)
-            segment_with_minmax = np.concatenate(([min_value, max_value], gen_plotdata))
-            buffer.append(segment_with_minmax)
-        self.buffer = np.array(buffer)
-
-    def play(self):
-        if self.audio_player.state() == QMediaPlayer.State.PlayingState:
-            self.audio_player.pause()
+class RangeIndex:
+    '''
+    定长滑动窗口最值索引(van Herk/Gil-Werman)
+    预处理O(n), 任意起点的窗口[start, start + window)最值查询O(1)
+    '''
+
+    def __init__(self, data, window):
+        data = np.asarray(data)
+        if data.ndim > 1:
+            # 多通道数据按采样点先取各通道最值(逐列比较, 比沿短轴归约快)
+            columns = [data[:, i] for i in range(data.shape[1])]
+            lows, highs = columns[0], columns[0]
+            for column in columns[1:]:
+                lows, highs = np.minimum(lows, column), np.maximum(highs, column)
         else:
-            self.audio_player.play()
-
-    def stop(self):
-        self.audio_player.stop()
-        self.min_value, self.max_value = 0, 0
-
-    def update_win(self, events):
-        '''
-        重新绘制窗口
-        '''
-        if self.plot_data is not None:
-            for patch in self.canvas.axes.patches:
-                patch.remove()
-            data_lenth = len(self.plot_data)
-            left = data_lenth * (1 - events[0] / 100)
-            right = data_lenth * (1 - events[1] / 100)
-            self.canvas.axes.axvspan(left, right, color='lightcoral', alpha=0.5)
-            self.canvas.plot.set_ydata(self.plot_data)
-            self.canvas.axes.set_ylim(self.plot_ymin, self.plot_ymax)
-            self.canvas.draw()
-
-    def update(self, position):
-        '''
-        更新展示数据
-        '''
-        current_index = position // self.interval
-        if current_index > self.totalIndex:
-            current_index = self.totalIndex
-        self.plot_data = self.buffer[current_index][2:]
-        self.plot_ymin, self.plot_ymax = self.buffer[current_index][0], self.buffer[current_index][1]
-        self.canvas.plot.set_ydata(self.plot_data)
-        self.canvas.axes.set_ylim(self.plot_ymin, self.plot_ymax)
-        self.canvas.draw()
-
-    def setPosition(self, position):
-        self.audio_player.setPosition(position)
-
-
-class DynamicPlot_Gas(QWidget):
-    '''
-    气流量类
-    '''
-    def __init__(self):
-        super().__init__()
-        self.setMouseTracking(True)
-        self.buffer = []
-        self.interval = 15
-        self.samplerate = 100
-        self.window_length = 3000
-        self.max_value, self.min_value = 0, 0
-        self.length = int(self.window_length * self.samplerate / 1000)
-        self.canvas = MplCanvas(length=self.length,
-                                parent=self, width=5,
-                                height=4,
-                                dpi=80,
-                                zero_line=True,
-                                color='green')
-        self.data = None
-        self.plot_data = None
-        self.window_sample = int(self.interval / 1000 * self.samplerate)
-        layout = QVBoxLayout()
-        layout.addWidget(self.canvas)
-        self.setLayout(layout)
-
-    def update_win(self, events):
-        '''
-        重绘框选区域
-        '''
-        if self.plot_data is not None:
-            for patch in self.canvas.axes.patches:
-                patch.remove()
-            data_lenth = len(self.plot_data)
-            left = data_lenth * (1 - events[0] / 100)
-            right = data_lenth * (1 - events[1] / 100)
-            self.canvas.axes.axvspan(left, right, color='lightcoral', alpha=0.5)
-            self.canvas.plot.set_ydata(self.plot_data)
-            self.canvas.axes.set_ylim(self.plot_ymin, self.plot_ymax)
-            self.canvas.draw()
-
-    def setData(self, filepath):
-        self.buffer = []
-        self.stop()
-        self.filepath = filepath
-        self.data = pd.read_csv(filepath)
-        self.dataGenerator()
-
-    def dataGenerator(self):
-        '''
-        生成展示数据
-        '''
-        gen_plotdata = np.zeros(self.length)
-        time_start = self.data['time'].iloc[0]  # 起始时间值
-
-        def split_data(group):
-            group_values = group['value'].values
-            return group_values
-
-        segments = self.data.groupby((self.data['time'] - time_start) // self.interval).apply(split_data)
-        buffer = []
-        self.totalIndex = len(segments) - 1
-        for segment in segments:
-            shift = len(segment)
-            gen_plotdata = np.roll(gen_plotdata, -shift, axis=0)
-            gen_plotdata[-shift:] = segment
-            min_value = np.min(gen_plotdata)
-            max_value = np.max(gen_plotdata)
-            segment_with_minmax = np.concatenate(([min_value, max_value], gen_plotdata))
-            buffer.append(segment_with_minmax)
-        self.buffer = np.array(buffer)
-
-    def stop(self):
-        self.min_value, self.max_value = 0, 0
-
-    def update(self, position):
-        current_index = position // self.interval
-        if current_index > self.totalIndex:
-            current_index = self.totalIndex
-        self.plot_data = self.buffer[current_index][2:]
-        self.plot_ymin, self.plot_ymax = self.buffer[current_index][0], self.buffer[current_index][1]
-        self.canvas.plot.set_ydata(self.plot_data)
-        self.canvas.axes.set_ylim(self.plot_ymin, self.plot_ymax)
-        self.canvas.draw()
-
-
-class DynamicPlot_Imu(QWidget):
-    '''
-    三轴数据类
-    '''
-    def __init__(self):
-        super().__init__()
-        self.setMouseTracking(True)
-        self.buffer = []
-        self.interval = 15
-        self.samplerate = 1000
-        self.window_length = 3000
-        self.max_value, self.min_value = 0, 0
-        self.length = int(self.window_length * self.samplerate / 1000)
-        self.canvas = MplCanvas(length=self.length, parent=self, width=5, height=4, dpi=20, color='red', lines=3)
-        self.data = None
-        self.plot_data = None
-        self.window_sample = int(self.interval / 1000 * self.samplerate)
-        layout = QVBoxLayout()
-        layout.addWidget(self.canvas)
-        self.setLayout(layout)
-
-    def update_win(self, events):
-        if self.plot_data is not None:
-            min_value, max_value, samplex, sampley, samplez = self.plot_data
-            for patch in self.canvas.axes.patches:
-                patch.remove()
-            data_lenth = len(samplex)
-            left = data_lenth * (1 - events[0] / 100)
-            right = data_lenth * (1 - events[1] / 100)
-            self.canvas.axes.axvspan(left, right, color='lightcoral', alpha=0.5)
-            self.canvas.plot[0].set_ydata(samplex)
-            self.canvas.plot[1].set_ydata(sampley)
-            self.canvas.plot[2].set_ydata(samplez)
-            self.canvas.axes.set_ylim(min_value, max_value)
-            self.canvas.draw()
-
-    def setData(self, filepath):
-        self.stop()
-        self.buffer = []
-        self.filepath = filepath
-        self.data = pd.read_csv(filepath)
-        self.dataGenerator()
-
-    def dataGenerator(self):
-        gen_plotdatax = np.zeros(self.length)
-        gen_plotdatay = np.zeros(self.length)
-        gen_plotdataz = np.zeros(self.length)
-        time_start = self.data['time'].iloc[0]
-
-        def split_data(group):
-            group_values_x = group['X'].values
-            group_values_y = group['Y'].values
-            group_values_z = group['Z'].values
-            return (group_values_x, group_values_y, group_values_z)
-
-        segments = self.data.groupby((self.data['time'] - time_start) // self.interval).apply(split_data)
-        self.totalIndex = len(segments) - 1
-        for segment_x, segment_y, segment_z in segments:
-            shift = len(segment_x)
-            gen_plotdatax = np.roll(gen_plotdatax, -shift, axis=0)
-            gen_plotdatay = np.roll(gen_plotdatay, -shift, axis=0)
-            gen_plotdataz = np.roll(gen_plotdataz, -shift, axis=0)
-            gen_plotdatax[-shift:] = segment_x
-            gen_plotdatay[-shift:] = segment_y
-            gen_plotdataz[-shift:] = segment_z
-            min_value = min(np.min(gen_plotdatax), np.min(gen_plotdatay), np.min(gen_plotdataz))
-            max_value = max(np.max(gen_plotdatax), np.max(gen_plotdatay), np.max(gen_plotdataz))
-            self.buffer.append((min_value, max_value, gen_plotdatax, gen_plotdatay, gen_plotdataz))
-
-    def stop(self):
-        self.min_value, self.max_value = 0, 0
-
-    def update(self, position):
-        current_index = position // self.interval
-        if current_index > self.totalIndex:
-            current_index = self.totalIndex
-        self.plot_data = self.buffer[current_index]
-        min_value, max_value, samplex, sampley, samplez = self.plot_data
-        self.canvas.plot[0].set_ydata(samplex)
-        self.canvas.plot[1].set_ydata(sampley)
-        self.canvas.plot[2].set_ydata(samplez)
-        self.canvas.axes.set_ylim(min_value, max_value)
-        self.canvas.draw()
-
-
-class DynamicPlot(QWidget):
-    '''
-    多种数据绘制窗口
-    '''
-    def __init__(self):
-        super().__init__()
-        self.interval = 15
-        self.imuPlot = DynamicPlot_Imu()
-        self.gasPlot = DynamicPlot_Gas()
-        self.audioPlot = DynamicPlot_Audio()
-        self.label1 = QLabel()
-        font = QFont()
-        font.setPointSize(12)  # 设置字体大小
-        self.label1.setFont(font)
-        self.label1.setSizePolicy(QSizePolicy.Policy.Preferred,
-                                  QSizePolicy.Policy.Maximum)
-        self.label1.setStyleSheet("color: green;")
-        self.label1.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.label1.setText('Time: s')
-        self.label2 = QLabel()
-        font = QFont()
-        font.setPointSize(16)  # 设置字体大小
-        self.label2.setFont(font)
-        self.label2.setSizePolicy(QSizePolicy.Policy.Preferred,
-                                  QSizePolicy.Policy.Maximum)
-        self.label2.setStyleSheet("color: green;")
-        self.label2.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.label2.setText(' - ')
-        sub_layout1 = QHBoxLayout()
-        sub_layout1.setContentsMargins(0, 0, 0, 0)
-        sub_layout1.addWidget(self.label1)
-        sub_layout1.addWidget(self.label2)
-        self.label3 = QLabel()
-        font = QFont()
-        font.setPointSize(12)  # 设置字体大小
-        self.label3.setFont(font)
-        self.label3.setStyleSheet("color: black;")
-        self.label3.setAlignment(Qt.AlignmentFlag.AlignTrailing)
-        self.label3.setText('PAS:')
-        self.combo_box = QComboBox(self)
-        font_size = 25
-        self.combo_box.setStyleSheet(f"font-size: {font_size}px;")
-        self.combo_box.addItem('1')
-        self.combo_box.addItem('2')
-        self.combo_box.addItem('3')
-        self.combo_box.addItem('4')
-        self.combo_box.addItem('5')
-        self.combo_box.addItem('6')
-        self.combo_box.addItem('7')
-        self.combo_box.addItem('8')
-        self.select_button = QPushButton('Seg')
-        self.select_button.setStyleSheet(
-            "QPushButton:pressed { background-color: red; border-style: inset; }")
-        self.delet_button = QPushButton('Del')
-        self.delet_button.setStyleSheet(
-            "QPushButton:pressed { background-color: red; border-style: inset; }")
-        sub_layout2 = QHBoxLayout()
-        sub_layout2.setContentsMargins(0, 0, 0, 0)
-        sub_layout2.addWidget(self.label3)
-        sub_layout2.addWidget(self.combo_box)
-        sub_layout2.addWidget(self.select_button)
-        sub_layout2.addWidget(self.delet_button)
-        # 布局
-        layout = QVBoxLayout()
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.addWidget(self.imuPlot, 1)
-        layout.addWidget(self.gasPlot, 1)
-        layout.addWidget(self.audioPlot, 1)
-        layout.addLayout(sub_layout1)
-        layout.addLayout(sub_layout2)
-        self.setLayout(layout)
-
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update)
-        self.audioPlot.stopSignal.connect(self.stop)
-        self.audioPlot.canvas.signal_select.connect(self.audioPlot.update_win)
-        self.audioPlot.canvas.signal_select.connect(self.imuPlot.update_win)
-        self.audioPlot.canvas.signal_select.connect(self.gasPlot.update_win)
-
-    def setPosition(self, position):
-        self.audioPlot.setPosition(position)
-
-    def play(self, state):
-        self.audioPlot.play()
-        self.gasPlot.play()
-        self.imuPlot.play()
-        if state:
-            self.timer.start(self.interval)
+            lows, highs = data, data
+        self.window = window
+        self.size = len(lows)
+        self.prefix_min, self.suffix_min = self._accumulate(lows, np.minimum)
+        self.prefix_max, self.suffix_max = self._accumulate(highs, np.maximum)
+
+    @property
+    def nbytes(self):
+        return self.prefix_min.nbytes + self.suffix_min.nbytes + self.prefix_max.nbytes + self.suffix_max.nbytes
+
+    def _accumulate(self, values, func):
+        '''
+        按窗口长度分块, 计算块内前缀/后缀累计最值
+        '''
+        padding_length = (self.window - len(values) % self.window) % self.window
+        blocks = np.pad(values, (0, padding_length), 'edge').reshape(-1, self.window)
+        prefix = func.accumulate(blocks, axis=1).ravel()
+        suffix = func.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+        return prefix, suffix
+
+    def query(self, start):
+        '''
+        返回窗口[start, start + window)的(最小值, 最大值)
+        '''
+        end = start + self.window - 1
+        return (float(min(self.suffix_min[start], self.prefix_min[end])),
+                float(max(self.suffix_max[start], self.prefix_max[end])))
+
+    def query_many(self, starts):
+        '''
+        批量查询, 返回最小值数组和最大值数组
+        '''
+        starts = np.asarray(starts)
+        ends = starts + self.window - 1
+        return (np.minimum(self.suffix_min[starts], self.prefix_min[ends]),
+                np.maximum(self.suffix_max[starts], self.prefix_max[ends]))
+
+
+def halve_levels(mins, maxs, bucket=1):
+    '''
+    逐层合并相邻两桶的最值, 返回[(每桶宽度, 最小值, 最大值), ...]
+    '''
+    levels = []
+    while len(mins) > 1:
+        if len(mins) % 2:
+            mins, maxs = np.pad(mins, (0, 1), 'edge'), np.pad(maxs, (0, 1), 'edge')
+        mins = np.minimum(mins[0::2], mins[1::2])
+        maxs = np.maximum(maxs[0::2], maxs[1::2])
+        bucket *= 2
+        levels.append((bucket, mins, maxs))
+    return levels
+
+
+class EnvelopePyramid:
+    '''
+    多分辨率最值包络金字塔
+    第j层保存每2^j个采样的最小值和最大值, 绘图时按像素宽度选层, 保留峰值
+    '''
+
+    def __init__(self, data):
+        # PaddedSignal保持原样, 只在建立各层时临时展开
+        self.data = data if isinstance(data, PaddedSignal) else np.asarray(data)
+        values = np.asarray(data)
+        self.levels = halve_levels(values, values)
+
+    @classmethod
+    def from_flat(cls, data, mins, maxs):
+        '''
+        由flat()导出的各层拼接数组恢复, 各层长度由数据长度确定
+        '''
+        pyramid = cls.__new__(cls)
+        pyramid.data = data if isinstance(data, PaddedSignal) else np.asarray(data)
+        pyramid.levels = []
+        size, bucket, offset = len(pyramid.data), 1, 0
+        while size > 1:
+            size, bucket = (size + 1) // 2, bucket * 2
+            pyramid.levels.append((bucket, mins[offset:offset + size], maxs[offset:offset + size]))
+            offset += size
+        return pyramid
+
+    def flat(self):
+        '''
+        各层最小值、最大值分别拼接为一维数组, 用于写入缓存
+        '''
+        if not self.levels:
+            return np.zeros(0, dtype=self.data.dtype), np.zeros(0, dtype=self.data.dtype)
+        return (np.concatenate([mins for _, mins, _ in self.levels]),
+                np.concatenate([maxs for _, _, maxs in self.levels]))
+
+    @property
+    def nbytes(self):
+        return sum(mins.nbytes + maxs.nbytes for _, mins, maxs in self.levels)
+
+    def envelope(self, start, length, width):
+        '''
+        返回窗口[start, start + length)的绘图点(x, y), 点数约为2 * width
+        '''
+        if length <= 2 * width or not self.levels:
+            return np.arange(length), self.data[start:start + length]
+        # 取每桶采样数不小于length / width的最细一层
+        for bucket, mins, maxs in self.levels:
+            if bucket * width >= length:
+                break
+        first, last = start // bucket, -(-(start + length) // bucket)
+        y = np.empty(2 * (last - first), dtype=mins.dtype)
+        y[0::2] = mins[first:last]
+        y[1::2] = maxs[first:last]
+        x = np.repeat((np.arange(first, last) + 0.5) * bucket - start, 2)
+        return x, y
+
+    def extent(self, start, length, buckets=64):
+        '''
+        窗口[start, start + length)的(最小值, 最大值), 取每桶不小于length / buckets的层, 只扫描覆盖窗口的桶
+        边缘桶可能超出窗口, 结果略宽于实际范围, 用于y轴范围
+        '''
+        if length <= buckets or not self.levels:
+            window = self.data[start:start + length]
+            return window.min(), window.max()
+        for bucket, mins, maxs in self.levels:
+            if bucket * buckets >= length:
+                break
+        first, last = start // bucket, -(-(start + length) // bucket)
+        return mins[first:last].min(), maxs[first:last].max()
+
+
+def direct_envelope(data, start, length, width):
+    '''
+    无金字塔时直接由原始数据计算窗口包络, 输出格式同EnvelopePyramid.envelope
+    '''
+    if length <= 2 * width:
+        return np.arange(length), data[start:start + length]
+    bucket = -(-length // width)
+    first, last = start // bucket, -(-(start + length) // bucket)
+    window = data[first * bucket:last * bucket]
+    if len(window) < (last - first) * bucket:
+        window = np.pad(window, (0, (last - first) * bucket - len(window)), 'edge')
+    window = window.reshape(-1, bucket)
+    y = np.empty(2 * (last - first), dtype=window.dtype)
+    y[0::2] = window.min(axis=1)
+    y[1::2] = window.max(axis=1)
+    x = np.repeat((np.arange(first, last) + 0.5) * bucket - start, 2)
+    return x, y
+
+
+def build_pyramids(data):
+    '''
+    为每列数据建立包络金字塔, 多列数据对应多条曲线
+    '''
+    if not isinstance(data, PaddedSignal):
+        data = np.asarray(data)
+    columns = [data] if data.ndim == 1 else [data[:, i] for i in range(data.shape[1])]
+    return [EnvelopePyramid(column) for column in columns]
+
+
+OVERVIEW_BUCKET = 10  # 概览包络第0层每桶时长(ms)
+
+
+class TimeEnvelope:
+    '''
+    按时间对齐的多分辨率包络, 用于整段记录概览
+    第0层每桶bucket毫秒, 逐层合并相邻两桶, 各层作为侧边缓存保存; 绘制时按像素宽度选层
+    '''
+
+    def __init__(self, mins, maxs, bucket=OVERVIEW_BUCKET):
+        mins, maxs = np.asarray(mins), np.asarray(maxs)
+        self.bucket = bucket
+        self.levels = [(bucket, mins, maxs)] + halve_levels(mins, maxs, bucket)
+
+    @classmethod
+    def from_flat(cls, mins, maxs, size, bucket=OVERVIEW_BUCKET):
+        '''
+        由flat()导出的各层拼接数组恢复, size为第0层桶数
+        '''
+        envelope = cls.__new__(cls)
+        envelope.bucket = bucket
+        envelope.levels = [(bucket, mins[:size], maxs[:size])]
+        offset = size
+        while size > 1:
+            size, bucket = (size + 1) // 2, bucket * 2
+            envelope.levels.append((bucket, mins[offset:offset + size], maxs[offset:offset + size]))
+            offset += size
+        return envelope
+
+    def flat(self):
+        return (np.concatenate([mins for _, mins, _ in self.levels]),
+                np.concatenate([maxs for _, _, maxs in self.levels]))
+
+    @property
+    def duration(self):
+        return len(self.levels[0][1]) * self.bucket
+
+    @property
+    def limits(self):
+        '''
+        整段的(最小值, 最大值), 即最粗一层的唯一桶
+        '''
+        _, mins, maxs = self.levels[-1]
+        return float(mins[0]), float(maxs[0])
+
+    def envelope(self, start, end, width):
+        '''
+        时间范围[start, end)(ms)的包络, 返回(各桶中心时间, 最小值, 最大值), 桶数不超过约width
+        '''
+        for bucket, mins, maxs in self.levels:
+            if bucket * width >= end - start:
+                break
+        first, last = max(int(start) // bucket, 0), -(-int(end) // bucket)
+        mins, maxs = mins[first:last], maxs[first:last]
+        return (np.arange(first, first + len(mins)) + 0.5) * bucket, mins, maxs
+
+
+def audio_energy(data, scale, samplerate, bucket=OVERVIEW_BUCKET):
+    '''
+    每bucket毫秒的音频均方根能量(归一化幅值), 分块计算, 不整段转换为浮点
+    '''
+    step = max(int(samplerate * bucket / 1000), 1)
+    energy = np.empty(-(-len(data) // step), dtype=np.float32)
+    chunk = 8192 * step
+    for first in range(0, len(data), chunk):
+        block = np.square(np.asarray(data[first:first + chunk], dtype=np.float32))
+        starts = np.arange(0, len(block), step)
+        counts = np.diff(np.append(starts, len(block)))
+        energy[first // step:first // step + len(starts)] = np.sqrt(np.add.reduceat(block, starts) / counts) * scale
+    return energy
+
+
+def table_envelope(times, values, bucket=OVERVIEW_BUCKET):
+    '''
+    按时间戳(ms)每bucket毫秒取最值, 返回(最小值, 最大值)
+    '''
+    relative = np.asarray(times) - times[0]
+    starts = np.searchsorted(relative, np.arange(int(relative[-1] // bucket) + 1) * bucket, side='left')
+    return np.minimum.reduceat(values, starts), np.maximum.reduceat(values, starts)
+
+
+def prepare_overview(filepath, compute, bucket=OVERVIEW_BUCKET):
+    '''
+    概览包络优先读取侧边缓存, 未命中时由compute()计算第0层(最小值, 最大值)并写入
+    '''
+    cached = load_cache(filepath, 'overview', bucket=bucket)
+    if cached is not None:
+        arrays, meta = cached
+        return TimeEnvelope.from_flat(arrays['mins'], arrays['maxs'], meta['buckets'], bucket)
+    envelope = TimeEnvelope(*compute(), bucket)
+    mins, maxs = envelope.flat()
+    save_cache(filepath, {'mins': mins, 'maxs': maxs}, 'overview', bucket=bucket, buckets=len(envelope.levels[0][1]))
+    return envelope
+
+
+WINDOW_LENGTHS = [500, 1000, 3000, 10000, 30000]  # 可选的显示窗口长度(ms)
+
+
+DEFAULT_WINDOW = 3000  # 逐步y轴范围索引对应的窗口长度(ms)
+
+
+def time_window_ends(times, interval):
+    '''
+    按时间戳(ms)一次性计算每个播放步长对应的采样终点(不含)
+    '''
+    relative = np.asarray(times) - times[0]
+    steps = np.arange(1, relative[-1] // interval + 2) * interval
+    return np.searchsorted(relative, steps, side='left')
+
+
+class PaddedSignal:
+    '''
+    前补padding个0、后补tail个0的采样序列, 不复制原始数据(可为内存映射)
+    切片落在原始数据内时返回视图, 跨越补0部分时只复制该切片; 整体转为数组(np.asarray)时才展开
+    '''
+
+    def __init__(self, values, padding, tail=0):
+        self.values = values
+        self.padding = padding
+        self.tail = tail
+        self.shape = (padding + len(values) + tail,) + values.shape[1:]
+        self.ndim = values.ndim
+        self.dtype = values.dtype
+
+    def __len__(self):
+        return self.shape[0]
+
+    @property
+    def nbytes(self):
+        return 0 if isinstance(self.values, np.memmap) else self.values.nbytes
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            # [:, i]取单列, 仍不复制
+            rows, column = key
+            padded_column = PaddedSignal(self.values[:, column], self.padding, self.tail)
+            return padded_column if rows == slice(None) else padded_column[rows]
+        if not isinstance(key, slice):
+            index = range(len(self))[key]
+            return self[index:index + 1][0]
+        start, stop, step = key.indices(len(self))
+        if step != 1:
+            return np.asarray(self)[key]
+        begin, end = start - self.padding, max(stop, start) - self.padding
+        if begin >= 0 and end <= len(self.values):
+            return self.values[begin:end]
+        result = np.zeros((end - begin,) + self.shape[1:], dtype=self.dtype)
+        low, high = max(begin, 0), min(end, len(self.values))
+        if high > low:
+            result[low - begin:high - begin] = self.values[low:high]
+        return result
+
+    def __array__(self, dtype=None):
+        result = self[0:len(self)]
+        return result if dtype is None else result.astype(dtype)
+
+
+class SignalWindow:
+    '''
+    播放窗口数据
+    采样数据前补padding个0(不小于窗口长度, 可容纳最大显示窗口), 补0在切片时进行, 不复制原始数据
+    每步窗口以视图形式切片
+    y轴范围优先取逐步结果(yranges)或RangeIndex; 两者都未建立时只计算请求的窗口,
+    并沿播放方向预先计算若干窗口, 完整索引由build_signal_index在后台建立
+    显示窗口(view_length)可缩放, 与索引窗口长度不同时由包络金字塔估计y轴范围
+    '''
+    recent_size = 64
+    warm_count = 8
+
+    def __init__(self, values, window_ends, length, tail=0, yranges=None, pyramids=None, padding=None):
+        values = np.asarray(values)
+        self.length = length
+        self.view_length = length
+        self.padding = length if padding is None else max(padding, length)
+        # 保持原始数据类型(如音频int16)和内存映射, 尾部可按需补0
+        self.padded_data = PaddedSignal(values, self.padding, tail)
+        self.window_ends = np.asarray(window_ends)
+        self.totalIndex = len(self.window_ends) - 1
+        self.yranges = yranges
+        self.pyramids = pyramids
+        self.building = False
+        self._range_index = None
+        self.recent = OrderedDict()
+        self.last_index = 0
+
+    @property
+    def range_index(self):
+        if self._range_index is None:
+            self._range_index = RangeIndex(self.padded_data, self.length)
+        return self._range_index
+
+    @property
+    def nbytes(self):
+        nbytes = self.padded_data.nbytes + self.window_ends.nbytes
+        if self._range_index is not None:
+            nbytes += self._range_index.nbytes
+        if self.pyramids is not None:
+            nbytes += sum(pyramid.nbytes for pyramid in self.pyramids)
+        return nbytes
+
+    def step_yranges(self):
+        '''
+        所有步的(最小值数组, 最大值数组)
+        '''
+        if self.yranges is None:
+            self.yranges = self.range_index.query_many(self.window_ends + self.padding - self.length)
+        return self.yranges
+
+    def set_view_length(self, length):
+        '''
+        修改显示窗口长度(采样数), 不超过补0长度
+        '''
+        length = min(length, self.padding)
+        if length != self.view_length:
+            self.view_length = length
+            self.recent.clear()
+
+    def offsets(self, current_index):
+        '''
+        第current_index步窗口在原始采样中的起止位置, 起点小于0的部分为补0
+        '''
+        end = int(self.window_ends[current_index])
+        return end - self.view_length, end
+
+    def start(self, current_index, length=None):
+        '''
+        第current_index步长度为length(默认为显示窗口)的窗口在padded_data中的起点
+        '''
+        length = self.view_length if length is None else length
+        return int(self.window_ends[current_index]) + self.padding - length
+
+    def window(self, current_index):
+        '''
+        第current_index步的绘图窗口(视图)
+        '''
+        start = self.start(current_index)
+        return self.padded_data[start:start + self.view_length]
+
+    def yrange(self, current_index):
+        '''
+        第current_index步窗口的(最小值, 最大值)
+        '''
+        if self.view_length == self.length:
+            if self.yranges is not None:
+                return float(self.yranges[0][current_index]), float(self.yranges[1][current_index])
+            if self._range_index is not None:
+                return self._range_index.query(self.start(current_index))
+        elif self.pyramids is not None:
+            start = self.start(current_index)
+            lows, highs = zip(*(pyramid.extent(start, self.view_length) for pyramid in self.pyramids))
+            return float(min(lows)), float(max(highs))
+        direction = 1 if current_index >= self.last_index else -1
+        self.last_index = current_index
+        result = self.window_yrange(current_index)
+        for step in range(1, self.warm_count + 1):
+            index = current_index + direction * step
+            if 0 <= index <= self.totalIndex:
+                self.window_yrange(index)
+        return result
+
+    def window_yrange(self, current_index):
+        '''
+        直接计算单个窗口的(最小值, 最大值), 最近的结果保存在recent中
+        '''
+        if current_index in self.recent:
+            self.recent.move_to_end(current_index)
+            return self.recent[current_index]
+        window = self.window(current_index)
+        result = float(window.min()), float(window.max())
+        self.recent[current_index] = result
+        if len(self.recent) > self.recent_size:
+            self.recent.popitem(last=False)
+        return result
+
+
+def prepare_signal(filepath, values, window_ends, length, interval, tail=0, lazy=False, padding=None):
+    '''
+    生成播放窗口和包络金字塔
+    逐步y轴范围与金字塔优先读取侧边缓存; 未命中时lazy为True则留待build_signal_index后台建立, 否则立即计算并写入
+    '''
+    points = len(values) + max(padding or 0, length) + tail
+    cached = load_cache(filepath, 'index', window=length, interval=interval, points=points,
+                        steps=len(window_ends))
+    if cached is not None:
+        arrays = cached[0]
+        signal_window = SignalWindow(values, window_ends, length, tail,
+                                     yranges=(arrays['step_min'], arrays['step_max']), padding=padding)
+        padded_data = signal_window.padded_data
+        columns = [padded_data] if padded_data.ndim == 1 else [padded_data[:, i] for i in range(padded_data.shape[1])]
+        signal_window.pyramids = [EnvelopePyramid.from_flat(column, mins, maxs)
+                                  for column, mins, maxs in zip(columns, arrays['pyramid_min'], arrays['pyramid_max'])]
+        return signal_window, signal_window.pyramids
+    signal_window = SignalWindow(values, window_ends, length, tail, padding=padding)
+    if lazy:
+        return signal_window, None
+    return signal_window, build_signal_index(filepath, signal_window, interval)
+
+
+def build_signal_index(filepath, signal_window, interval):
+    '''
+    计算逐步y轴范围和包络金字塔, 写入侧边缓存后返回金字塔
+    '''
+    pyramids = build_pyramids(signal_window.padded_data)
+    step_min, step_max = signal_window.step_yranges()
+    flats = [pyramid.flat() for pyramid in pyramids]
+    save_cache(filepath, {'step_min': step_min, 'step_max': step_max,
+                          'pyramid_min': np.stack([mins for mins, _ in flats]),
+                          'pyramid_max': np.stack([maxs for _, maxs in flats])},
+               'index', window=signal_window.length, interval=interval, points=len(signal_window.padded_data),
+               steps=len(signal_window.window_ends))
+    signal_window.pyramids = pyramids
+    return pyramids
+
+
+def audio_window_ends(size, window_sample):
+    '''
+    音频按固定采样数分步, 返回(各步采样终点, 尾部补0长度)
+    '''
+    padding_length = (window_sample - size % window_sample) % window_sample
+    total_steps = (size + padding_length) // window_sample
+    return np.arange(1, total_steps + 1) * window_sample, padding_length
+
+
+def prepare_audio(filepath, samplerate=16000, interval=15, window_length=DEFAULT_WINDOW, lazy=False):
+    '''
+    读取音频并生成绘图数据, 不依赖界面
+    '''
+    length = int(window_length * samplerate / 1000)
+    window_sample = int(interval / 1000 * samplerate)
+    data, scale = read_audio(filepath, samplerate)
+    window_ends, padding_length = audio_window_ends(len(data), window_sample)
+    signal_window, pyramids = prepare_signal(filepath, data, window_ends, length, interval, tail=padding_length,
+                                             lazy=lazy, padding=int(max(WINDOW_LENGTHS) * samplerate / 1000))
+    energy = partial(audio_energy, data, scale, samplerate)
+    overview = prepare_overview(filepath, lambda: (energy(),) * 2)
+    return {'filepath': filepath, 'data': data, 'scale': scale, 'signal_window': signal_window,
+            'pyramids': pyramids, 'overview': overview}
+
+
+def prepare_table(filepath, columns, samplerate, interval=15, window_length=DEFAULT_WINDOW, lazy=False):
+    '''
+    读取imu/gas数据并生成绘图数据, 不依赖界面
+    '''
+    length = int(window_length * samplerate / 1000)
+    data = read_signal_csv(filepath)
+    window_ends = time_window_ends(data['time'].values, interval)
+    values = data[columns].values if len(columns) > 1 else data[columns[0]].values
+    signal_window, pyramids = prepare_signal(filepath, values, window_ends, length, interval, lazy=lazy,
+                                             padding=int(max(WINDOW_LENGTHS) * samplerate / 1000))
+
+    def compute():
+        # 多列数据(imu)概览取向量幅值, 只在概览缓存未命中时计算
+        series = values if values.ndim == 1 else np.sqrt(np.square(values.astype(np.float64)).sum(axis=1))
+        return table_envelope(data['time'].values, series)
+
+    overview = prepare_overview(filepath, compute)
+    return {'filepath': filepath, 'data': data, 'signal_window': signal_window, 'pyramids': pyramids,
+            'overview': overview}
+
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+
+
+SEGMENT_MODELS = ['CFSCNet', 'Detail Model']
+
+
+PREDICTION_FILE = 'Predicted.json'
+
+
+# 分割任务及对应的表格列
+SEGMENT_LABELS = {
+    'swallow': ['吞咽'],
+    'detail': ['口腔期', '咽期', '食管期', '吞咽前', '吞咽暂停', '吞咽后'],
+}
+
+
+SEGMENT_SAMPLERATES = {'audio': 16000, 'imu': 1000, 'gas': 100}
+
+
+SEGMENT_WINDOW = 1000  # 模型输入窗口(ms)
+
+
+SEGMENT_HOP = 100  # 窗口步长, 即分割结果的时间分辨率(ms)
+
+
+SEGMENT_BATCH = 256
+
+
+SEGMENT_THREADS = os.cpu_count() or 1  # 单个模型推理线程数, 批量多进程时按进程数均分
+
+
+SEGMENT_MODEL_CACHE = {}
+
+
+SEGMENT_MODEL_LOCK = threading.Lock()
+
+
+class NumpySegmentModel:
+    '''
+    纯NumPy基线模型: 各模态窗口能量特征(会话内标准化)上的线性分类器
+    权重可由<模型名>.<任务>.npz(weight, bias)提供, 否则按音频能量阈值分割
+    '''
+
+    def __init__(self, classes, weights_path=None):
+        if weights_path is not None:
+            weights = np.load(weights_path)
+            self.weight, self.bias = weights['weight'], weights['bias']
         else:
-            self.timer.stop()
-
-    def update(self):
-        positon = self.audioPlot.audio_player.position()
-        self.audioPlot.update(positon)
-        self.imuPlot.update(positon)
-        self.gasPlot.update(positon)
-
-    def stop(self):
-        self.timer.stop()
-        self.audioPlot.stop()
-        self.imuPlot.stop()
-        self.gasPlot.stop()
-
-    '''
-    设置文件路径
-    '''
-    def setCsv(self, file_path):
-        if 'wav' in file_path:
-            self.audioPlot.setData(file_path)
-        elif 'gas' in file_path:
-            self.gasPlot.setData(file_path)
-        elif 'imu' in file_path:
-            self.imuPlot.setData(file_path)
-
-
-class VideoWidget(QWidget):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.mediaPlayer = QMediaPlayer(None, QMediaPlayer.Flag.VideoSurface)
-        self.videoWidget = QVideoWidget()
-        self.videoWidget.setStyleSheet("background-color: gray;")
-        sizePolicy_v = self.videoWidget.sizePolicy()
-        sizePolicy_v.setHorizontalStretch(0)
-        sizePolicy_v.setVerticalStretch(0)
-        sizePolicy_v.setHeightForWidth(self.videoWidget.sizePolicy().hasHeightForWidth())
-        self.videoWidget.setSizePolicy(sizePolicy_v)
-        self.mediaPlayer.setVideoOutput(self.videoWidget)
-        layout = QVBoxLayout()
-        layout.addWidget(self.videoWidget)
-        self.setLayout(layout)
-
-    def setMedia(self, filepath):
-        if self.mediaPlayer.state() == QMediaPlayer.State.PlayingState:
-            self.mediaPlayer.stop()
-        media = QMediaContent(QUrl.fromLocalFile(filepath))
-        self.mediaPlayer.setMedia(media)
-
-
-class DataTableWidget(QWidget):
-    def __init__(self):
-        super().__init__()
-        self.initUI()
-
-    def initUI(self):
-        layout = QVBoxLayout()
-
-        # 创建表格控件
-        self.table_widget = QTableWidget()
-        self.table_widget.setRowCount(0)  # 设置行数
-        self.table_widget.setColumnCount(7)  # 设置列数
-        self.column_name = ['吞咽', '口腔期', '咽期', '食管期', "吞咽前", "吞咽暂停", "吞咽后"]
-        self.table_widget.setHorizontalHeaderLabels(self.column_name)
-
-        layout.addWidget(self.table_widget)
-        self.setLayout(layout)
-        self.json_path = None
-
-    def refresh_data(self):
-        max_row_count = 0
-        for swallow_type in self.json_dict:
-            length = len(self.json_dict[swallow_type])
-            if length > max_row_count:
-                max_row_count = length
-        self.table_widget.setRowCount(max_row_count)
-
-        for row in range(self.table_widget.rowCount()):
-            for column, name in enumerate(self.column_name):
-                if row < len(self.json_dict[name]):
-                    item = QTableWidgetItem(f'{self.json_dict[name][row]["start"]}s - {self.json_dict[name][row]["end"]}s')
-                    item.setTextAlignment(Qt.AlignmentFlag.AlignHCenter)
-                    self.table_widget.setItem(row, column, item)
-                else:
-                    self.table_widget.setItem(row, column, QTableWidgetItem(''))
-
-    def down_load_json_table(self):
-        with open(self.json_path, 'w', encoding='utf-8') as json_file:
-            json_file.write(json.dumps(self.json_dict, indent=4, ensure_ascii=False))
-
-    def set_json_table(self, file_path):
-        with open(file_path, 'r', encoding='utf-8') as json_file:
-            self.json_dict = json.load(json_file)
-        self.json_path = file_path
-        self.refresh_data()
-
-    def add_content(self, column, start, end, checked):
-        if checked:
-            self.json_dict[self.column_name[column]].pop()
+            # 默认: 背景得分为0, 各前景类得分为音频能量减1个标准差
+            self.weight = np.zeros((6, classes))
+            self.weight[0, 1:] = 1.0
+            self.bias = np.array([0.0] + [-1.0] * (classes - 1))
+        self.running = None
+
+    def online(self):
+        '''
+        在线推理用的副本: 用已见窗口的累计均值、方差代替整个会话的标准化
+        '''
+        model = NumpySegmentModel.__new__(NumpySegmentModel)
+        model.weight, model.bias = self.weight, self.bias
+        model.running = (0, 0.0, 0.0)
+        return model
+
+    def features(self, audio, imu, gas):
+        return np.column_stack((np.sqrt(np.mean(np.square(audio), axis=1)), imu.std(axis=2), gas.std(axis=1),
+                                gas.mean(axis=1)))
+
+    def run(self, windows):
+        '''
+        特征在整个会话上标准化, 再分批求logits
+        '''
+        features = np.concatenate([self.features(*batch) for batch in windows])
+        if self.running is None:
+            mean, std = features.mean(axis=0), features.std(axis=0)
         else:
-            start = start / 1000
-            end = end / 1000
-            self.json_dict[self.column_name[column]].append({'start': round(start, 3), 'end': round(end, 3)})
-        self.refresh_data()
-        self.down_load_json_table()
-
-
-class Mainwindows(QWidget):
-    def __init__(self):
-        super().__init__()
-        self.setWindowTitle("吞咽分割检测系统")
-        self.setWindowIcon(QApplication.style().standardIcon(QStyle.StandardPixmap.SP_MediaPlay))
-        self.init_ui()
-        self.showMaximized()
-
-    def init_ui(self):
-        '''
-        初始化控件
-        '''
-        self.current_state = State.IDLE
-        self.video_groupBox = QGroupBox("视频造影")
-        self.data_groupBox = QGroupBox("数据可视化")
-        self.console_groupBox = QGroupBox("控制台")
-        self.table_groupBox = QGroupBox("分割结果")
-        self.videoCT = VideoWidget()
-        self.videoWin = VideoWidget()
-        self.imu_win = DynamicPlot_Imu()
-        self.gas_win = DynamicPlot_Gas()
-        self.audio_win = DynamicPlot_Audio()
-        self.console = Console()
-        self.treeConsole = TreeWidget()
-        self.treeConsole.setVisible(False)
-        self.json_table = DataTableWidget()
-        self.data_show_timer = QTimer(self)
-        self.data_show_timer.setInterval(30)
-        self.ui_timer = QTimer(self)
-        self.ui_timer.setInterval(150)
-        self.forward_timer = QTimer()
-        self.forward_timer.setSingleShot(True)  # 设置为只触发一次
-
-        vedio_layout = QHBoxLayout()
-        vedio_layout.addWidget(self.videoWin, 2)
-        vedio_layout.addWidget(self.videoCT, 2)
-        self.video_groupBox.setLayout(vedio_layout)
-
-        data_layout = QVBoxLayout()
-        data_layout.addWidget(self.imu_win, 1)
-        data_layout.addWidget(self.gas_win, 1)
-        data_layout.addWidget(self.audio_win, 1)
-        self.data_groupBox.setLayout(data_layout)
-
-        view_layout = QHBoxLayout()
-        view_layout.addWidget(self.video_groupBox, 4)
-        view_layout.addWidget(self.data_groupBox, 3)
-
-        self.console_groupBox.setLayout(self.console.layout())
-        self.table_groupBox.setLayout(self.json_table.layout())
-        console_layout = QHBoxLayout()
-        console_layout.addWidget(self.console_groupBox, 4)
-        console_layout.addWidget(self.table_groupBox, 3)
-
-        main_layout = QVBoxLayout()
-        main_layout.addLayout(view_layout, 2)
-        main_layout.addLayout(console_layout, 1)
-
-        tree_layout = QHBoxLayout()
-        tree_layout.addWidget(self.treeConsole, 2)
-        tree_layout.addLayout(main_layout, 9)
-        self.setLayout(tree_layout)
-
-        # 播放
-        self.console.playButton.clicked.connect(self.play)
-
-        # 播放结束
-        self.console.stopbutton.clicked.connect(self.stop)
-
-        # 拖动位置
-        self.console.contrlSlider.sliderMoved.connect(self.sliderPosition)
-
-        # 播放时间改变
-        self.audio_win.audio_player.durationChanged.connect(self.console.set_slider_duration)
-
-        # 播放结束
-        self.audio_win.audio_player.stateChanged.connect(self.check_status)
-
-        # 打开目录
-        self.console.openButton.clicked.connect(self.treeConsole.tree_open)
-        self.console.nextButton.clicked.connect(self.treeConsole.next)
-        self.console.preButton.clicked.connect(self.treeConsole.pre)
-
-        # 快进10帧
-        self.console.quickButton.clicked.connect(self.fast_forward)
-        self.forward_timer.timeout.connect(self.forward_timerout)
-
-        # 后退30帧
-        self.console.backButton.clicked.connect(self.backward)
-
-        # 滑块改变
-        self.console.contrlSlider.sliderMoved.connect(self.sliderPosition)
-
-        # 树目录设置选择文件
-        self.console.treetogle.clicked.connect(self.treetogle)
-        self.treeConsole.select_file.connect(self.set_source)
-
-        # 设置当前时间
-        self.console.get_positon_button.clicked.connect(self.get_cur_postion)
-
-        # 定时更新
-        self.data_show_timer.timeout.connect(self.update)
-        self.ui_timer.timeout.connect(self.updata_ui)
-
-        # 更新表格内容
-        self.console.swallow_record.clicked.connect(
-            lambda: self.json_table.add_content(0,
-                                                self.console.segment_pre_time,
-                                                self.console.segment_aft_time,
-                                                self.console.checkbox.isChecked()))
-        self.console.detail_swallow1.clicked.connect(
-            lambda: self.json_table.add_content(1,
-                                                self.console.segment_pre_time,
-                                                self.console.segment_aft_time,
-                                                self.console.checkbox.isChecked()))
-        self.console.detail_swallow2.clicked.connect(
-            lambda: self.json_table.add_content(2,
-                                                self.console.segment_pre_time,
-                                                self.console.segment_aft_time,
-                                                self.console.checkbox.isChecked()))
-        self.console.detail_swallow3.clicked.connect(
-            lambda: self.json_table.add_content(3,
-                                                self.console.segment_pre_time,
-                                                self.console.segment_aft_time,
-                                                self.console.checkbox.isChecked()))
-        self.console.detail_swallow4.clicked.connect(
-            lambda: self.json_table.add_content(4,
-                                                self.console.segment_pre_time,
-                                                self.console.segment_aft_time,
-                                                self.console.checkbox.isChecked()))
-        self.console.detail_swallow5.clicked.connect(
-            lambda: self.json_table.add_content(5,
-                                                self.console.segment_pre_time,
-                                                self.console.segment_aft_time,
-                                                self.console.checkbox.isChecked()))
-        self.console.detail_swallow6.clicked.connect(
-            lambda: self.json_table.add_content(6,
-                                                self.console.segment_pre_time,
-                                                self.console.segment_aft_time,
-                                                self.console.checkbox.isChecked()))
-
-    def get_cur_postion(self):
-        positon = self.audio_win.audio_player.position()
-        self.console.set_cur_time(positon)
-
-    def check_status(self, state):
-        if state == QMediaPlayer.State.StoppedState:
-            self.stop()
-
-    def update(self):
-        positon = self.audio_win.audio_player.position()
-        self.audio_win.update(positon)
-        self.imu_win.update(positon)
-        self.gas_win.update(positon)
-        self.console.time_label.setText(f"{format_time(positon)} ms")
-
-    def updata_ui(self):
-        position = self.audio_win.audio_player.position()
-        self.console.contrlSlider.setValue(position)
-
-    def set_source(self, file_path):
-        file_name, file_extension = os.path.splitext(os.path.basename(file_path))
-        if file_extension == '.wav':
-            self.audio_win.setData(file_path)
-        elif file_extension == '.mp4' or file_extension == '.avi':
-            if 'ct' in file_name:
-                self.videoCT.setMedia(file_path)
-            else:
-                self.videoWin.setMedia(file_path)
-        elif file_extension == '.csv':
-            if 'imu' in file_name:
-                self.imu_win.setData(file_path)
+            # 合并本批的均值与平方差和(Chan等的并行Welford算法)
+            count, mean, m2 = self.running
+            total = count + len(features)
+            delta = features.mean(axis=0) - mean
+            mean = mean + delta * len(features) / total
+            m2 = m2 + features.var(axis=0) * len(features) + delta ** 2 * count * len(features) / total
+            self.running = (total, mean, m2)
+            std = np.sqrt(m2 / total)
+        features = (features - mean) / (std + 1e-9)
+        return features @ self.weight + self.bias
+
+
+class OnnxSegmentModel:
+    '''
+    ONNX模型, 输入audio(n, 采样), imu(n, 3, 采样), gas(n, 采样), 输出(n, 类别) logits
+    '''
+
+    def __init__(self, model_path):
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = SEGMENT_THREADS
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+
+    def online(self):
+        return self
+
+    def run(self, windows):
+        return np.concatenate([self.session.run(None, {'audio': audio, 'imu': imu, 'gas': gas})[0]
+                               for audio, imu, gas in windows])
+
+
+class TorchSegmentModel:
+    '''
+    TorchScript模型, forward(audio, imu, gas)的输入输出同ONNX模型
+    '''
+
+    def __init__(self, model_path):
+        torch.set_num_threads(SEGMENT_THREADS)
+        self.module = torch.jit.load(model_path, map_location='cpu').eval()
+
+    def online(self):
+        return self
+
+    def run(self, windows):
+        outputs = []
+        with torch.inference_mode():
+            for audio, imu, gas in windows:
+                outputs.append(self.module(torch.from_numpy(audio), torch.from_numpy(imu),
+                                           torch.from_numpy(gas)).numpy())
+        return np.concatenate(outputs)
+
+
+def find_segment_model(model_name, task):
+    '''
+    按MODEL_DIR下<模型名>.<任务>.onnx/.pt/.npz依次查找可用的模型文件, 都不存在时返回None(NumPy基线模型)
+    '''
+    prefix = os.path.join(MODEL_DIR, f"{model_name}.{task}")
+    if ort is not None and os.path.exists(prefix + '.onnx'):
+        return prefix + '.onnx'
+    if torch is not None and os.path.exists(prefix + '.pt'):
+        return prefix + '.pt'
+    if os.path.exists(prefix + '.npz'):
+        return prefix + '.npz'
+    return None
+
+
+def segment_model_version(model_name, task):
+    '''
+    模型版本: 模型文件内容的哈希, 基线模型为固定值
+    '''
+    model_path = find_segment_model(model_name, task)
+    if model_path is None:
+        return 'numpy-baseline'
+    digest = hashlib.sha1()
+    with open(model_path, 'rb') as model_file:
+        for block in iter(partial(model_file.read, 1 << 20), b''):
+            digest.update(block)
+    return f"{os.path.basename(model_path)}:{digest.hexdigest()[:12]}"
+
+
+def load_segment_model(model_name, task):
+    '''
+    加载find_segment_model找到的模型, 每个进程内同一模型只加载一次
+    '''
+    key = (model_name, task)
+    with SEGMENT_MODEL_LOCK:
+        if key not in SEGMENT_MODEL_CACHE:
+            model_path = find_segment_model(model_name, task)
+            classes = len(SEGMENT_LABELS[task]) + 1
+            if model_path is None:
+                model = NumpySegmentModel(classes)
+            elif model_path.endswith('.onnx'):
+                model = OnnxSegmentModel(model_path)
+            elif model_path.endswith('.pt'):
+                model = TorchSegmentModel(model_path)
             else:
-                self.gas_win.setData(file_path)
-        elif file_extension == '.json':
-            self.json_table.set_json_table(file_path)
-        else:
-            raise Exception("type error")
-
-    def sliderPosition(self, position):
-        self.videoCT.mediaPlayer.setPosition(position)
-        self.videoWin.mediaPlayer.setPosition(position)
-        self.audio_win.audio_player.setPosition(position)
-
-    def treetogle(self):
-        self.treeConsole.setVisible(not self.treeConsole.isVisible())
-
-    def fast_forward(self):
-        if self.current_state == State.RUNNING:
-            self.play()  # 先暂停
-        self.play()
-        self.forward_timer.start(33)  # 33ms后触发
-
-    def backward(self):
-        position = self.audio_win.audio_player.position()
-        self.console.contrlSlider.setValue(position - 1000)
-        self.sliderPosition(position - 1000)
-
-    def forward_timerout(self):
-        self.play()  # 先暂停
-
-    def play(self):
-        if self.current_state == State.RUNNING:
-            self.videoCT.mediaPlayer.pause()
-            self.videoWin.mediaPlayer.pause()
-            self.audio_win.audio_player.pause()
-            self.data_show_timer.stop()
-            self.ui_timer.stop()
-            self.current_state = State.PAUSED
-            self.console.set_icon(QStyle.StandardPixmap.SP_MediaPause)
-        else:
-            self.videoCT.mediaPlayer.play()
-            self.videoWin.mediaPlayer.play()
-            self.audio_win.audio_player.play()
-            self.data_show_timer.start()
-            self.ui_timer.start()
-            self.current_state = State.RUNNING
-            self.console.set_icon(QStyle.StandardPixmap.SP_MediaPlay)
+                model = NumpySegmentModel(classes, model_path)
+            SEGMENT_MODEL_CACHE[key] = model
+        return SEGMENT_MODEL_CACHE[key]
+
+
+def sliding_windows(values, length):
+    '''
+    尾部补0后返回所有起点的定长窗口视图(起点, [通道,] length), 按起点索引即可取窗口
+    '''
+    values = np.asarray(values)
+    padded = np.concatenate((values, np.zeros((length,) + values.shape[1:], dtype=values.dtype)))
+    return np.lib.stride_tricks.sliding_window_view(padded, length, axis=0)
+
+
+def segment_windows(audio, scale, imu, gas, window=SEGMENT_WINDOW, hop=SEGMENT_HOP, batch_size=SEGMENT_BATCH):
+    '''
+    按音频时长切分模型输入窗口, 逐批生成float32的(audio, imu, gas)
+    imu/gas按时间戳定位窗口起点
+    '''
+    audio_rate = SEGMENT_SAMPLERATES['audio']
+    total = max(int((len(audio) * 1000 / audio_rate - window) // hop) + 1, 1)
+    window_starts = np.arange(total) * hop
+    modalities = [
+        (sliding_windows(audio, window * audio_rate // 1000), window_starts * audio_rate // 1000, scale),
+        (sliding_windows(imu[['X', 'Y', 'Z']].values, window * SEGMENT_SAMPLERATES['imu'] // 1000),
+         np.searchsorted(imu['time'].values - imu['time'].values[0], window_starts), 1),
+        (sliding_windows(gas['value'].values, window * SEGMENT_SAMPLERATES['gas'] // 1000),
+         np.searchsorted(gas['time'].values - gas['time'].values[0], window_starts), 1),
+    ]
+    for begin in range(0, total, batch_size):
+        yield tuple(windows[starts[begin:begin + batch_size]].astype(np.float32) * np.float32(modality_scale)
+                    for windows, starts, modality_scale in modalities)
+
+
+def softmax(logits):
+    logits = logits - logits.max(axis=1, keepdims=True)
+    probs = np.exp(logits)
+    return probs / probs.sum(axis=1, keepdims=True)
+
+
+def logits_to_segments(logits, labels, window=SEGMENT_WINDOW, hop=SEGMENT_HOP):
+    '''
+    重叠窗口的概率按步长平均到时间帧, 取最大类别后合并连续帧为片段(秒)
+    '''
+    probs = softmax(logits)
+    span = max(window // hop, 1)
+    # 帧j被窗口[j - span + 1, j]覆盖, 用前缀和求覆盖窗口的概率之和
+    cumsum = np.cumsum(np.vstack((np.zeros((1, probs.shape[1])), probs)), axis=0)
+    frames = np.arange(len(probs) + span - 1)
+    frame_probs = cumsum[np.minimum(frames + 1, len(probs))] - cumsum[np.maximum(frames - span + 1, 0)]
+    classes = frame_probs.argmax(axis=1)
+    segments = {}
+    for index, label in enumerate(labels, start=1):
+        edges = np.diff(np.concatenate(([0], (classes == index).astype(np.int8), [0])))
+        starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        segments[label] = [{'start': round(start * hop / 1000, 3), 'end': round(end * hop / 1000, 3)}
+                           for start, end in zip(starts, ends)]
+    return segments
+
+
+def segment_signals(model_name, task, audio, scale, imu, gas):
+    '''
+    对一个病人的音频、imu、气流量数据运行分割模型, 返回{列名: [{'start', 'end'}]}
+    '''
+    model = load_segment_model(model_name, task)
+    logits = model.run(segment_windows(audio, scale, imu, gas))
+    return logits_to_segments(logits, SEGMENT_LABELS[task])
+
+
+def patient_sources(dir_path):
+    '''
+    病人文件夹下各模态的文件: {模态: 路径}, 同一模态有多个文件时取文件名排序后的第一个
+    '''
+    sources = {}
+    for entry in sorted(os.listdir(dir_path)):
+        sources.setdefault(classify_source(os.path.join(dir_path, entry)), os.path.join(dir_path, entry))
+    return sources
+
+
+def read_patient_signals(dir_path):
+    '''
+    读取病人文件夹下的音频、imu、气流量, 返回(音频, 音频缩放系数, imu表, 气流量表)
+    '''
+    sources = patient_sources(dir_path)
+    missing = [source for source in ('audio', 'imu', 'gas') if source not in sources]
+    if missing:
+        raise Exception(f"缺少{', '.join(missing)}")
+    audio, scale = read_audio(sources['audio'], SEGMENT_SAMPLERATES['audio'])
+    return audio, scale, read_signal_csv(sources['imu']), read_signal_csv(sources['gas'])
+
+
+FEATURE_PARAMS = {'frame': 25, 'hop': 10, 'n_fft': 512, 'n_mels': 64}  # 默认特征参数, 帧长/帧移单位ms
+
+
+FEATURE_BATCH = 4096  # 每批帧数, 限制分帧后临时数组的大小
+
+
+def frame_batches(values, frame, hop, batch=FEATURE_BATCH):
+    '''
+    按hop个采样的步长分帧(尾部补0), 逐批生成(首帧序号, 帧视图(帧数, [通道,] frame))
+    '''
+    frames = sliding_windows(values, frame)
+    count = -(-len(values) // hop)
+    for first in range(0, count, batch):
+        yield first, frames[first * hop:min(first + batch, count) * hop:hop]
+
+
+def mel_filterbank(samplerate, n_fft, n_mels, fmin=0.0, fmax=None):
+    '''
+    三角梅尔滤波器组(HTK刻度), 形状(n_mels, n_fft // 2 + 1)
+    '''
+    fmax = samplerate / 2 if fmax is None else fmax
+    mels = np.linspace(2595 * np.log10(1 + fmin / 700), 2595 * np.log10(1 + fmax / 700), n_mels + 2)
+    edges = 700 * (10 ** (mels / 2595) - 1)
+    freqs = np.fft.rfftfreq(n_fft, 1 / samplerate)
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (freqs - lower) / (center - lower)
+    falling = (upper - freqs) / (upper - center)
+    return np.maximum(0, np.minimum(rising, falling)).astype(np.float32)
+
+
+def stft_logmel(frames, window, mel, n_fft):
+    '''
+    一批帧(帧数, 帧长)加窗FFT后的对数梅尔能量(帧数, 梅尔带)
+    '''
+    power = np.square(np.abs(np.fft.rfft(frames * window, n_fft, axis=1)))
+    return np.log(power @ mel + 1e-10)
+
+
+def audio_features(audio, scale, samplerate=16000, frame=25, hop=10, n_fft=512, n_mels=64, on_batch=None):
+    '''
+    音频短时能量、过零率和对数梅尔谱, 每帧一行; 'time'为帧中心时间(ms)
+    每完成一批调用on_batch(特征, 首帧序号, 末帧序号), 返回True时中止计算并返回None
+    '''
+    frame_length, hop_length = samplerate * frame // 1000, samplerate * hop // 1000
+    count = -(-len(audio) // hop_length)
+    window = np.hanning(frame_length).astype(np.float32)
+    mel = mel_filterbank(samplerate, n_fft, n_mels).T
+    times = (np.arange(count) * hop_length + frame_length / 2) * 1000 / samplerate
+    features = {'time': times, 'energy': np.empty(count, dtype=np.float32), 'zcr': np.empty(count, dtype=np.float32),
+                'logmel': np.empty((count, n_mels), dtype=np.float32)}
+    for first, frames in frame_batches(audio, frame_length, hop_length):
+        frames = frames.astype(np.float32) * np.float32(scale)
+        last = first + len(frames)
+        features['energy'][first:last] = np.mean(np.square(frames), axis=1)
+        signs = np.signbit(frames)
+        features['zcr'][first:last] = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_length - 1)
+        features['logmel'][first:last] = stft_logmel(frames, window, mel, n_fft)
+        if on_batch is not None and on_batch(features, first, last):
+            return None
+    return features
+
+
+def time_derivative(values, times):
+    '''
+    按时间戳(ms)的后向差分(每秒), 首个采样为0; 时间戳重复时间隔按1µs计
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    dt = np.maximum(np.diff(times) / 1000, 1e-6).reshape((-1,) + (1,) * (values.ndim - 1))
+    return np.concatenate((np.zeros((1,) + values.shape[1:]), np.diff(values, axis=0) / dt))
 
-    def stop(self):
-        self.videoCT.mediaPlayer.stop()
-        self.videoWin.mediaPlayer.stop()
-        self.imu_win.stop()
-        self.gas_win.stop()
-        self.audio_win.stop()
-        self.data_show_timer.stop()
-        self.ui_timer.stop()
-        self.current_state = State.STOPPED
 
+def imu_features(imu):
+    '''
+    imu加速度向量幅值和加加速度(jerk)幅值, 每个采样一个值
+    '''
+    times = imu['time'].values
+    xyz = imu[['X', 'Y', 'Z']].values.astype(np.float64)
+    jerk = time_derivative(xyz, times)
+    return {'time': times - times[0], 'magnitude': np.sqrt(np.einsum('ij,ij->i', xyz, xyz)),
+            'jerk': np.sqrt(np.einsum('ij,ij->i', jerk, jerk))}
 
-def format_time(pos):
-    total_seconds, ms = divmod(pos, 1000)  # 将时间转换为总秒数
-    minutes, seconds = divmod(total_seconds, 60)  # 分钟和秒钟的整除和余数
-    hours, minutes = divmod(minutes, 60)  # 小时和分钟的整除和余数
 
-    # 格式化为字符串
-    time_string = "{:02d}:{:02d}:{:02d}:{:03d}".format(hours, minutes, seconds, ms)
-    return time_string
+def gas_features(gas):
+    '''
+    气流量对时间的导数(每秒)
+    '''
+    times = gas['time'].values
+    return {'time': times - times[0], 'derivative': time_derivative(gas['value'].values, times)}
+
+
+def extract_features(audio, scale, imu, gas, frame=25, hop=10, n_fft=512, n_mels=64):
+    '''
+    计算一个病人的派生特征, 返回{模态: {特征名: 数组}}, 各模态'time'为相对起点的时间(ms)
+    '''
+    return {'audio': audio_features(audio, scale, SEGMENT_SAMPLERATES['audio'], frame, hop, n_fft, n_mels),
+            'imu': imu_features(imu), 'gas': gas_features(gas)}
 
 
-def run_application():
+class FeatureCache(PatientCache):
     '''
-    主程序入口
+    派生特征的LRU缓存
+    以(源文件, 特征参数)为键, 同一文件不同参数分别缓存; 源文件修改后失效, 超出内存预算时淘汰最久未用的
+    音频特征以音频文件为键, 谱图面板和patient_features共用
     '''
-    app = QApplication(sys.argv)
-    window = Mainwindows()
-    window.show()
-    sys.exit(app.exec_())
+
+    def feature_key(self, filepaths, params):
+        filepaths = tuple(os.path.abspath(filepath) for filepath in filepaths)
+        return ((filepaths, tuple(sorted(params.items()))),
+                tuple(self.file_key(filepath)[1:] for filepath in filepaths))
+
+    def features(self, filepaths, compute, **params):
+        '''
+        命中直接返回, 否则调用compute(**params)并缓存
+        '''
+        key = self.feature_key(filepaths, params)
+        return self.load(key[0][0][0], lambda _: compute(**params), key)
+
+    def cached(self, filepaths, **params):
+        '''
+        命中时返回已缓存的特征, 否则返回None, 不计算
+        '''
+        key = self.feature_key(filepaths, params)
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            return self.entries[key][0]
+
+    def store(self, filepaths, features, **params):
+        '''
+        写入在别处计算好的特征(如谱图面板分块计算的音频特征)
+        '''
+        self.put(self.feature_key(filepaths, params), features)
+
+
+FEATURE_CACHE = FeatureCache(512)
+
+
+def patient_features(dir_path, cache=FEATURE_CACHE, **params):
+    '''
+    读取病人文件夹并计算派生特征, 参数见FEATURE_PARAMS; cache为None时不缓存
+    各模态分别缓存, 音频特征与谱图面板共用
+    '''
+    params = dict(FEATURE_PARAMS, **params)
+    sources = patient_sources(dir_path)
+    if cache is None or any(source not in sources for source in ('audio', 'imu', 'gas')):
+        return extract_features(*read_patient_signals(dir_path), **params)  # 缺少模态时由read_patient_signals报告
+
+    def audio(**params):
+        return audio_features(*read_audio(sources['audio'], params['samplerate']), **params)
+
+    return {'audio': cache.features([sources['audio']], audio, samplerate=SEGMENT_SAMPLERATES['audio'], **params),
+            'imu': cache.features([sources['imu']], lambda: imu_features(read_signal_csv(sources['imu']))),
+            'gas': cache.features([sources['gas']], lambda: gas_features(read_signal_csv(sources['gas'])))}
+
+
+SPECTROGRAM_RANGE = (-10.0, 10.0)  # 量化为uint8的对数梅尔能量范围(自然对数)
+
+
+class Spectrogram:
+    '''
+    音频对数梅尔谱图: (梅尔带, 帧)的uint8图像, 高频在上, 第i列为以i * hop + frame / 2毫秒为中心的帧
+    分块计算时ready为已完成的帧数
+    '''
+
+    def __init__(self, image, params, ready=0):
+        self.image = image
+        self.params = params
+        self.ready = ready
+        self.cancelled = False
+
+    @property
+    def complete(self):
+        return self.ready >= self.image.shape[1]
+
+
+def load_spectrogram(filepath, size, samplerate=16000, frame=25, hop=10, n_fft=512, n_mels=64):
+    '''
+    读取size个采样的音频的谱图侧边缓存, 未命中时返回待build_spectrogram计算的空谱图
+    '''
+    params = {'samplerate': samplerate, 'frame': frame, 'hop': hop, 'n_fft': n_fft, 'n_mels': n_mels}
+    count = -(-size // (samplerate * hop // 1000))
+    cached = load_cache(filepath, 'spectrogram', range=list(SPECTROGRAM_RANGE), **params)
+    if cached is not None and cached[0]['image'].shape == (n_mels, count):
+        return Spectrogram(cached[0]['image'], params, count)
+    return Spectrogram(np.zeros((n_mels, count), dtype=np.uint8), params)
+
+
+def build_spectrogram(filepath, spectrogram, audio, scale, on_chunk=None, cache=FEATURE_CACHE):
+    '''
+    填充谱图, 每完成一块调用on_chunk(); 全部完成后写入侧边缓存
+    音频特征已在cache中时直接量化其对数梅尔谱, 否则分块计算音频特征并写入cache
+    '''
+    low, high = SPECTROGRAM_RANGE
+
+    def fill(features, first, last):
+        if spectrogram.cancelled:
+            return True
+        levels = np.clip((features['logmel'][first:last] - low) * (255 / (high - low)), 0, 255).astype(np.uint8)
+        spectrogram.image[::-1, first:last] = levels.T
+        spectrogram.ready = last
+        if on_chunk is not None:
+            on_chunk()
+        return False
+
+    params = spectrogram.params
+    features = None if cache is None else cache.cached([filepath], **params)
+    if features is not None:
+        fill(features, 0, len(features['time']))
+    else:
+        features = audio_features(audio, scale, on_batch=fill, **params)
+        if features is None:
+            return
+        if cache is not None:
+            cache.store([filepath], features, **params)
+    save_cache(filepath, {'image': spectrogram.image}, 'spectrogram', range=list(SPECTROGRAM_RANGE), **params)
+
+
+class RingBuffer:
+    '''
+    定长环形缓冲区, 按写入总数计的绝对下标读取最近capacity个采样
+    '''
+
+    def __init__(self, capacity, shape=(), dtype=np.float32):
+        self.buffer = np.zeros((capacity,) + shape, dtype=dtype)
+        self.capacity = capacity
+        self.total = 0
+
+    def extend(self, samples):
+        samples = np.asarray(samples, dtype=self.buffer.dtype)
+        # 超过容量时只保留最后capacity个
+        skipped = max(len(samples) - self.capacity, 0)
+        self.total += skipped
+        samples = samples[skipped:]
+        position = self.total % self.capacity
+        first = min(len(samples), self.capacity - position)
+        self.buffer[position:position + first] = samples[:first]
+        self.buffer[:len(samples) - first] = samples[first:]
+        self.total += len(samples)
+
+    def read(self, start, length):
+        if start < self.total - self.capacity or start + length > self.total:
+            raise ValueError(f"采样[{start}, {start + length})不在缓冲区内")
+        return np.take(self.buffer, np.arange(start, start + length), axis=0, mode='wrap')
+
+
+class StreamingSegmenter:
+    '''
+    在线吞咽分割
+    各模态数据分块推入环形缓冲区, 模型窗口数据齐备即推理
+    缓冲区保留一个窗口加max_skew毫秒: 各模态到达的先后差在max_skew以内时等待落后的模态;
+    超出时领先模态中已被覆盖的窗口丢弃不推理, 只有这些窗口覆盖的帧沿用之前的判定
+    每帧在其起点之后latency毫秒判定, 只用届时已完整的窗口, 返回吞咽开始/结束事件
+    latency等于窗口长度时逐窗口概率与离线分割相同; 但NumPy基线模型在线时按已见数据标准化特征,
+    有状态的模型结果与离线只能近似
+    '''
+
+    def __init__(self, model_name=SEGMENT_MODELS[0], latency=500, window=SEGMENT_WINDOW, hop=SEGMENT_HOP,
+                 max_skew=2000):
+        if not hop <= latency <= window:
+            raise ValueError(f"延迟须在{hop}~{window}ms之间")
+        self.model = load_segment_model(model_name, 'swallow').online()
+        self.window, self.hop = window, hop
+        self.span = window // hop
+        # 处理完第i个窗口后判定到第i + lag帧(首个窗口处理后一并判定第0~lag帧)
+        self.lag = self.span - latency // hop
+        self.buffers = {name: RingBuffer((window + max_skew) * rate // 1000, (3,) if name == 'imu' else ())
+                        for name, rate in SEGMENT_SAMPLERATES.items()}
+        self.next_window = 0
+        self.dropped = 0
+        self.decided = -1
+        self.frame_probs = {}
+        self.active = False
+
+    def push(self, modality, samples):
+        '''
+        推入一个模态的新采样(imu为(n, 3)), 返回新判定的事件
+        '''
+        self.buffers[modality].extend(samples)
+        return self.process()
+
+    def ready_windows(self):
+        counts = [(buffer.total * 1000 // SEGMENT_SAMPLERATES[name] - self.window) // self.hop + 1
+                  for name, buffer in self.buffers.items()]
+        return max(min(counts), 0)
+
+    def first_window(self):
+        '''
+        各模态缓冲区中仍完整保留的最早窗口
+        '''
+        return max(-(-(buffer.total - buffer.capacity) * 1000 // (SEGMENT_SAMPLERATES[name] * self.hop))
+                   for name, buffer in self.buffers.items())
+
+    def process(self):
+        first = self.first_window()
+        if first > self.next_window:
+            # 落后的模态超出max_skew, 领先模态的这些窗口已被覆盖
+            self.dropped += first - self.next_window
+            self.next_window = first
+        end = self.ready_windows()
+        if end <= self.next_window:
+            return []
+        indexes = range(self.next_window, end)
+        batch = []
+        for name, buffer in self.buffers.items():
+            rate = SEGMENT_SAMPLERATES[name]
+            windows = np.stack([buffer.read(index * self.hop * rate // 1000, self.window * rate // 1000)
+                                for index in indexes])
+            batch.append(np.ascontiguousarray(windows.transpose(0, 2, 1)) if windows.ndim == 3 else windows)
+        probs = softmax(self.model.run([tuple(batch)]))
+        self.next_window = end
+        events = []
+        for index, prob in zip(indexes, probs):
+            for frame in range(max(index, self.decided + 1), index + self.span):
+                self.frame_probs[frame] = self.frame_probs.get(frame, 0) + prob
+            for frame in range(self.decided + 1, index + self.lag + 1):
+                events += self.decide(frame, (index * self.hop + self.window) / 1000)
+        return events
+
+    def decide(self, frame, stream_time):
+        self.decided = frame
+        prob = self.frame_probs.pop(frame, None)
+        active = self.active if prob is None else bool(prob.argmax() > 0)  # 所有覆盖窗口都被丢弃时沿用
+        if active == self.active:
+            return []
+        self.active = active
+        return [{'type': 'start' if active else 'end', 'time': frame * self.hop / 1000, 'decided': stream_time}]
+
+    def finish(self):
+        '''
+        数据结束: 仍处于吞咽中时以最后判定的帧结束
+        '''
+        if not self.active:
+            return []
+        self.active = False
+        end_time = (self.decided + 1) * self.hop / 1000
+        return [{'type': 'end', 'time': end_time, 'decided': end_time}]
+
+
+def replay_patient(dir_path, segmenter, chunk_ms=15, speed=1.0):
+    '''
+    将已录制的病人数据按chunk_ms分块、以speed倍真实时间推入segmenter(speed为0时不等待)
+    返回(事件列表, 各事件延迟ms): 延迟为事件判定时刻与事件时刻对应采样推入时刻的墙钟差
+    '''
+    audio, scale, imu, gas = read_patient_signals(dir_path)
+    streams = [('audio', audio, scale), ('imu', imu[['X', 'Y', 'Z']].values, 1), ('gas', gas['value'].values, 1)]
+    duration = len(audio) * 1000 // SEGMENT_SAMPLERATES['audio']
+    events, latencies, pushed = [], [], []
+    start_wall = time.perf_counter()
+    for begin in range(0, duration, chunk_ms):
+        end = min(begin + chunk_ms, duration)
+        if speed:
+            # [begin, end)的数据在end时刻才完整
+            time.sleep(max(start_wall + end / 1000 / speed - time.perf_counter(), 0))
+        pushed.append(time.perf_counter())
+        new_events = []
+        for name, values, value_scale in streams:
+            rate = SEGMENT_SAMPLERATES[name]
+            new_events += segmenter.push(name, values[begin * rate // 1000:end * rate // 1000] * value_scale)
+        now = time.perf_counter()
+        for event in new_events:
+            chunk = min(int(event['time'] * 1000) // chunk_ms, len(pushed) - 1)
+            latencies.append((now - pushed[chunk]) * 1000)
+        events += new_events
+    return events + segmenter.finish(), latencies
+
+
+def run_stream(dir_path, model_name, latency=500, speed=1.0):
+    '''
+    回放病人数据测试在线分割, 打印事件和延迟分位数, 返回退出码
+    '''
+    segmenter = StreamingSegmenter(model_name, latency)
+    events, latencies = replay_patient(dir_path, segmenter, speed=speed)
+    for event in events:
+        print(f"{'开始' if event['type'] == 'start' else '结束'} {event['time']:.3f}s (判定于{event['decided']:.3f}s)")
+    if latencies:
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+        print(f"{len(events)}个事件, 延迟 p50 {p50:.0f}ms, p90 {p90:.0f}ms, p99 {p99:.0f}ms, 最大{max(latencies):.0f}ms")
+    else:
+        print("未检测到吞咽")
+    return 0
+
+
+class FrameIndex:
+    '''
+    视频帧时间戳索引: 各帧显示时间(ms, 相对首帧)及关键帧
+    '''
+
+    def __init__(self, times, keyframes):
+        self.times = np.asarray(times)
+        self.keyframes = np.asarray(keyframes)
+
+    def __len__(self):
+        return len(self.times)
+
+    def frame_at(self, position):
+        '''
+        position(ms)时正在显示的帧
+        '''
+        return max(int(np.searchsorted(self.times, position, 'right')) - 1, 0)
+
+    def time_of(self, frame):
+        return int(np.ceil(self.times[min(max(frame, 0), len(self.times) - 1)]))
+
+    def keyframe_before(self, position):
+        '''
+        position之前最近的关键帧时间, 跳转到关键帧无需从前一关键帧解码; 索引为空(视频损坏)时返回position
+        '''
+        if not len(self.times):
+            return int(position)
+        index = max(int(np.searchsorted(self.keyframes, self.frame_at(position), 'right')) - 1, 0)
+        return self.time_of(int(self.keyframes[index])) if len(self.keyframes) else self.time_of(self.frame_at(position))
+
+
+def read_frame_index(filepath):
+    '''
+    用ffmpeg按数据包读取视频帧时间戳(不解码), 结果写入侧边缓存
+    '''
+    cached = load_cache(filepath, 'frames')
+    if cached is not None:
+        return FrameIndex(cached[0]['times'], cached[0]['keyframes'])
+    if imageio_ffmpeg is None:
+        raise ImportError("需要imageio_ffmpeg读取视频帧时间戳")
+    output = subprocess.run([imageio_ffmpeg.get_ffmpeg_exe(), '-v', 'error', '-i', filepath, '-map', '0:v:0',
+                             '-c', 'copy', '-f', 'framecrc', '-'], capture_output=True, text=True, check=True).stdout
+    timebase, packets = 1.0, []
+    for line in output.splitlines():
+        if line.startswith('#tb 0:'):
+            numerator, denominator = line.split(':')[1].strip().split('/')
+            timebase = int(numerator) / int(denominator)
+        elif line and not line.startswith('#'):
+            # stream, dts, pts, duration, size, hash[, F=flags], 未标注flags的为关键帧
+            fields = [field.strip() for field in line.split(',')]
+            flags = int(fields[6][2:], 16) if len(fields) > 6 and fields[6].startswith('F=') else 1
+            packets.append((int(fields[2]), flags & 1))
+    packets.sort()
+    pts = np.array([pts for pts, _ in packets], dtype=np.float64)
+    times = (pts - pts[0]) * timebase * 1000 if len(pts) else pts
+    keyframes = np.array([frame for frame, (_, key) in enumerate(packets) if key], dtype=np.int64)
+    save_cache(filepath, {'times': times, 'keyframes': keyframes}, 'frames', frames=len(times))
+    return FrameIndex(times, keyframes)
+
+
+JOURNAL_SUFFIX = '.journal'
+
+
+class IntervalIndex:
+    '''
+    一列标注片段的区间索引
+    片段按(起点, 终点)有序存放, 按起点二分并配合终点前缀最大值做时刻/区间查询, O(log n + k)
+    '''
+
+    def __init__(self, segments):
+        segments.sort(key=lambda segment: (segment['start'], segment['end']))
+        self.segments = segments  # 与标注字典中的列表为同一对象
+        self.keys = [(segment['start'], segment['end']) for segment in segments]
+        self._max_ends = None
+
+    def __len__(self):
+        return len(self.segments)
+
+    @property
+    def max_ends(self):
+        if self._max_ends is None:
+            ends = np.array([end for _, end in self.keys], dtype=np.float64)
+            self._max_ends = np.maximum.accumulate(ends) if len(ends) else ends
+        return self._max_ends
+
+    def insert(self, start, end):
+        '''
+        有序插入, 返回所在行
+        '''
+        row = bisect.bisect_right(self.keys, (start, end))
+        self.keys.insert(row, (start, end))
+        self.segments.insert(row, {'start': start, 'end': end})
+        self._max_ends = None
+        return row
+
+    def find(self, start, end):
+        row = bisect.bisect_left(self.keys, (start, end))
+        return row if row < len(self.keys) and self.keys[row] == (start, end) else None
+
+    def remove(self, row):
+        del self.keys[row]
+        del self.segments[row]
+        self._max_ends = None
+
+    def at(self, time_point):
+        '''
+        包含time_point的片段所在行
+        '''
+        high = bisect.bisect_right(self.keys, (time_point, float('inf')))
+        low = int(np.searchsorted(self.max_ends, time_point, 'left'))
+        return [row for row in range(low, high) if self.keys[row][1] >= time_point]
+
+    def overlapping(self, start, end):
+        '''
+        与(start, end)有重叠的片段所在行
+        '''
+        high = bisect.bisect_left(self.keys, (end, float('-inf')))
+        low = int(np.searchsorted(self.max_ends, start, 'right'))
+        return [row for row in range(low, high) if self.keys[row][1] > start]
+
+    def covers(self, start, end):
+        return any(self.keys[row][1] >= end for row in self.at(start))
+
+
+class AnnotationStore:
+    '''
+    标注存储: 每列一个IntervalIndex
+    每次修改追加一行日志并fsync, 崩溃后可由日志恢复
+    切换病人或退出时合并(compact)为Annotated.json, 原子替换后删除日志
+    日志首行记录其基于的Annotated.json摘要, 替换后删除日志前崩溃时摘要不再匹配, 不会重复重放
+    摘要在创建日志时重新读取文件计算, 打开后文件被同一路径的旧存储合并改写时仍与磁盘一致
+    '''
+
+    def __init__(self, json_path, json_dict, digest=None):
+        self.json_path = json_path
+        self.json_dict = json_dict
+        self.digest = digest
+        # 列表为各列片段, 其他键(如PAS)为病人属性
+        self.indexes = {name: IntervalIndex(segments) for name, segments in json_dict.items()
+                        if isinstance(segments, list)}
+        self.journal_path = json_path + JOURNAL_SUFFIX
+        self.journal = None
+
+    @classmethod
+    def open(cls, json_path):
+        '''
+        读取标注文件并重放未合并的日志(上次未正常退出时留下)
+        '''
+        with open(json_path, 'rb') as json_file:
+            data = json_file.read()
+        store = cls(json_path, json.loads(data.decode('utf-8')), hashlib.sha1(data).hexdigest())
+        try:
+            with open(store.journal_path, 'r', encoding='utf-8') as journal_file:
+                edits = []
+                for line in journal_file:
+                    try:
+                        edits.append(json.loads(line))
+                    except ValueError:
+                        break  # 写入中断的最后一行
+        except OSError:
+            return store
+        if edits and edits[0].get('op') == 'base':
+            if edits[0]['digest'] != store.digest:
+                os.remove(store.journal_path)  # 已合并入Annotated.json但未及删除的日志
+                return store
+            edits = edits[1:]
+        for edit in edits:
+            store.apply_edit(edit)
+        return store
+
+    def file_digest(self):
+        with open(self.json_path, 'rb') as json_file:
+            return hashlib.sha1(json_file.read()).hexdigest()
+
+    def write_journal(self, entry):
+        self.journal.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def apply_edit(self, edit):
+        index = self.indexes[edit['column']]
+        if edit['op'] == 'insert':
+            return index.insert(edit['start'], edit['end'])
+        elif edit['op'] == 'remove':
+            row = index.find(edit['start'], edit['end'])
+            if row is not None:
+                index.remove(row)
+            return row
+
+    def edit(self, edit):
+        result = self.apply_edit(edit)
+        if self.journal is None:
+            self.journal = open(self.journal_path, 'a', encoding='utf-8')
+            if self.journal.tell() == 0:
+                self.digest = self.file_digest()
+                self.write_journal({'op': 'base', 'digest': self.digest})
+        self.write_journal(edit)
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+        return result
+
+    def insert(self, column, start, end):
+        return self.edit({'op': 'insert', 'column': column, 'start': start, 'end': end})
+
+    def remove(self, column, row):
+        start, end = self.indexes[column].keys[row]
+        return self.edit({'op': 'remove', 'column': column, 'start': start, 'end': end})
+
+    def best_overlap(self, column, start, end):
+        '''
+        与(start, end)重叠最多的片段所在行, start == end时取包含该时刻的片段
+        '''
+        index = self.indexes[column]
+        rows = index.overlapping(start, end) if start < end else index.at(start)
+        if not rows:
+            return None
+        return max(rows, key=lambda row: min(index.keys[row][1], end) - max(index.keys[row][0], start))
+
+    def outside(self, column, row, container='吞咽'):
+        '''
+        分期片段是否不在任何吞咽片段内
+        '''
+        if column == container:
+            return False
+        return not self.indexes[container].covers(*self.indexes[column].keys[row])
+
+    def check_consistency(self, container='吞咽'):
+        '''
+        一致性检查: 同列片段重叠、分期片段不在吞咽片段内, 返回问题描述
+        '''
+        problems = []
+        for column, index in self.indexes.items():
+            for row, (start, end) in enumerate(index.keys):
+                if row > 0 and index.max_ends[row - 1] > start:
+                    problems.append(f"{column} {start}s - {end}s 与前一片段重叠")
+                if self.outside(column, row, container):
+                    problems.append(f"{column} {start}s - {end}s 不在任何{container}片段内")
+        return problems
+
+    def compact(self):
+        '''
+        合并日志: 完整写入临时文件并fsync后原子替换Annotated.json, 再删除日志
+        替换与删除之间崩溃时, 日志记录的摘要与新文件不符, 下次打开时丢弃
+        '''
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        if not os.path.exists(self.journal_path):
+            return
+        data = json.dumps(self.json_dict, indent=4, ensure_ascii=False).encode('utf-8')
+        with open(self.json_path + '.tmp', 'wb') as json_file:
+            json_file.write(data)
+            json_file.flush()
+            os.fsync(json_file.fileno())
+        os.replace(self.json_path + '.tmp', self.json_path)
+        self.digest = hashlib.sha1(data).hexdigest()
+        os.remove(self.journal_path)
+
+
+# 批处理预计算的模态及对应处理函数(与界面各窗口参数一致)
+PREPROCESS_FUNCS = {
+    'audio': prepare_audio,
+    'gas': partial(prepare_table, columns=['value'], samplerate=100),
+    'imu': partial(prepare_table, columns=['X', 'Y', 'Z'], samplerate=1000),
+    'video': read_frame_index,
+    'video_ct': read_frame_index,
+}
+
+
+def preprocess_folder(dir_path):
+    '''
+    预计算一个病人文件夹的侧边缓存, 不依赖界面
+    返回报告: 处理的文件、缺失的模态、错误及耗时
+    '''
+    start_time = time.perf_counter()
+    report = {'folder': dir_path, 'files': [], 'missing': [], 'errors': []}
+    found = set()
+    for entry in sorted(os.listdir(dir_path)):
+        file_path = os.path.join(dir_path, entry)
+        source = classify_source(file_path)
+        if os.path.isdir(file_path) or source not in PREPROCESS_FUNCS:
+            continue
+        found.add(source)
+        try:
+            PREPROCESS_FUNCS[source](file_path)
+            report['files'].append(entry)
+        except Exception as e:
+            report['errors'].append(f"{entry}: {e}")
+    report['missing'] = [source for source in PREPROCESS_FUNCS if source not in found]
+    report['seconds'] = time.perf_counter() - start_time
+    return report
+
+
+def run_preprocess(root, workers=None):
+    '''
+    批量预处理root下所有病人文件夹, 多进程并行, 返回退出码
+    '''
+    folders = find_patient_folders(root)
+    if not folders:
+        print(f"{root}: 未找到包含Annotated.json的病人文件夹")
+        return 1
+    start_time = time.perf_counter()
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for report in executor.map(preprocess_folder, folders):
+            status = "失败" if report['errors'] else "完成"
+            print(f"[{status}] {report['folder']} ({report['seconds']:.2f}s) 文件: {', '.join(report['files'])}")
+            if report['missing']:
+                print(f"    缺失: {', '.join(report['missing'])}")
+            for error in report['errors']:
+                print(f"    错误: {error}")
+            failed += bool(report['errors'])
+    print(f"共{len(folders)}个病人, 失败{failed}个, 用时{time.perf_counter() - start_time:.2f}s")
+    return 1 if failed else 0
+
+
+def read_predictions(dir_path):
+    '''
+    读取病人文件夹下的模型分割结果: {模型名: {任务: {'version', 'segments'}}}
+    '''
+    try:
+        with open(os.path.join(dir_path, PREDICTION_FILE), 'r', encoding='utf-8') as json_file:
+            return json.load(json_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_predictions(dir_path, model_name, results):
+    '''
+    合并写入模型分割结果{任务: {'version', 'segments'}}到PREDICTION_FILE(原子替换), 返回全部结果
+    标注文件Annotated.json不受影响
+    '''
+    predictions = read_predictions(dir_path)
+    predictions.setdefault(model_name, {}).update(results)
+    prediction_path = os.path.join(dir_path, PREDICTION_FILE)
+    with open(prediction_path + '.tmp', 'w', encoding='utf-8') as json_file:
+        json_file.write(json.dumps(predictions, indent=4, ensure_ascii=False))
+    os.replace(prediction_path + '.tmp', prediction_path)
+    return predictions
+
+
+def segment_folder(dir_path, model_name, tasks, versions):
+    '''
+    对一个病人文件夹运行模型分割, 结果按模型名、任务写入Annotated.json同目录的PREDICTION_FILE
+    返回报告: 完成的任务、错误及耗时
+    '''
+    start_time = time.perf_counter()
+    report = {'folder': dir_path, 'tasks': [], 'errors': []}
+    try:
+        audio, scale, imu, gas = read_patient_signals(dir_path)
+        results = {}
+        for task in tasks:
+            results[task] = {'version': versions[task],
+                             'segments': segment_signals(model_name, task, audio, scale, imu, gas)}
+        write_predictions(dir_path, model_name, results)
+        report['tasks'] = list(tasks)
+    except Exception as e:
+        report['errors'].append(str(e))
+    report['seconds'] = time.perf_counter() - start_time
+    return report
+
+
+def init_segment_worker(model_name, tasks, threads):
+    '''
+    批量分割子进程初始化: 均分推理线程并预先加载模型
+    '''
+    global SEGMENT_THREADS
+    SEGMENT_THREADS = threads
+    for task in tasks:
+        load_segment_model(model_name, task)
+
+
+def run_segment(root, model_name, tasks, workers=None, force=False):
+    '''
+    对root下所有病人文件夹批量运行模型分割, 已用同版本模型分割过的跳过, 返回退出码
+    '''
+    folders = find_patient_folders(root)
+    if not folders:
+        print(f"{root}: 未找到包含Annotated.json的病人文件夹")
+        return 1
+    versions = {task: segment_model_version(model_name, task) for task in tasks}
+    todo = []
+    for folder in folders:
+        done = read_predictions(folder).get(model_name, {})
+        if force or any(done.get(task, {}).get('version') != versions[task] for task in tasks):
+            todo.append(folder)
+    print(f"模型{model_name}({', '.join(f'{task}={version}' for task, version in versions.items())}): "
+          f"共{len(folders)}个病人, 跳过已完成{len(folders) - len(todo)}个")
+    if not todo:
+        return 0
+    workers = workers or min(os.cpu_count() or 1, len(todo))
+    threads = max((os.cpu_count() or 1) // workers, 1)
+    start_time = time.perf_counter()
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_segment_worker,
+                             initargs=(model_name, tasks, threads)) as executor:
+        futures = [executor.submit(segment_folder, folder, model_name, tasks, versions) for folder in todo]
+        for finished, future in enumerate(as_completed(futures), start=1):
+            report = future.result()
+            status = "失败" if report['errors'] else "完成"
+            print(f"[{finished}/{len(todo)}][{status}] {report['folder']} ({report['seconds']:.2f}s)")
+            for error in report['errors']:
+                print(f"    错误: {error}")
+            failed += bool(report['errors'])
+    elapsed = time.perf_counter() - start_time
+    print(f"分割{len(todo)}个病人, 失败{failed}个, 用时{elapsed:.2f}s, {len(todo) / elapsed * 60:.1f}病人/分钟")
+    return 1 if failed else 0
+
+
+CATALOG_FILE = 'catalog.sqlite'
+
+
+CATALOG_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS patients (
+    folder TEXT PRIMARY KEY, signature TEXT, attrs TEXT, audio TEXT, imu TEXT, gas TEXT);
+CREATE TABLE IF NOT EXISTS segments (
+    folder TEXT, phase TEXT, start_time REAL, end_time REAL, duration REAL, attrs TEXT,
+    audio_start INTEGER, audio_end INTEGER, imu_start INTEGER, imu_end INTEGER, gas_start INTEGER, gas_end INTEGER);
+CREATE INDEX IF NOT EXISTS segments_folder ON segments(folder);
+CREATE INDEX IF NOT EXISTS segments_phase_start ON segments(phase, start_time);
+CREATE INDEX IF NOT EXISTS segments_phase_duration ON segments(phase, duration);
+'''
+
+
+def folder_signature(dir_path):
+    '''
+    文件夹内所有文件的(名称, 修改时间, 大小), 任一文件变化即需重建该病人的索引
+    '''
+    signature = []
+    for entry in sorted(os.listdir(dir_path)):
+        file_path = os.path.join(dir_path, entry)
+        if os.path.isfile(file_path):
+            stat = os.stat(file_path)
+            signature.append([entry, stat.st_mtime_ns, stat.st_size])
+    return json.dumps(signature)
+
+
+def patient_segments(dir_path, sources):
+    '''
+    读取一个病人的标注(含未合并的日志)并计算各片段在音频、imu、气流量数据中的采样下标[start, end)
+    下标对应read_audio(16000Hz)/read_signal_csv读出的数据, 各模态以首个采样为共同时间零点
+    返回(病人属性, 片段列表, 标注一致性问题)
+    '''
+    store = AnnotationStore.open(sources.get('annotation', os.path.join(dir_path, 'Annotated.json')))
+    patient_attrs = {key: value for key, value in store.json_dict.items() if key not in store.indexes}
+    relative_times = {}
+    for source in ('imu', 'gas'):
+        if source in sources:
+            times = read_signal_csv(sources[source])['time'].values
+            relative_times[source] = times - times[0]
+    segments = []
+    for phase, index in store.indexes.items():
+        for segment in index.segments:
+            start, end = segment['start'], segment['end']
+            row = {'phase': phase, 'start': start, 'end': end,
+                   'attrs': dict(patient_attrs, **{key: value for key, value in segment.items()
+                                                  if key not in ('start', 'end')})}
+            if 'audio' in sources:
+                row['audio'] = (int(round(start * SEGMENT_SAMPLERATES['audio'])),
+                                int(round(end * SEGMENT_SAMPLERATES['audio'])))
+            for source in relative_times:
+                row[source] = tuple(np.searchsorted(relative_times[source], [start * 1000, end * 1000]).tolist())
+            segments.append(row)
+    return patient_attrs, segments, store.check_consistency()
+
+
+def catalog_folder(dir_path):
+    '''
+    生成一个病人的索引记录
+    '''
+    signature = folder_signature(dir_path)
+    sources = patient_sources(dir_path)
+    patient_attrs, segments, problems = patient_segments(dir_path, sources)
+    rows = []
+    for segment in segments:
+        offsets = []
+        for source in ('audio', 'imu', 'gas'):
+            offsets += segment.get(source, (None, None))
+        rows.append((dir_path, segment['phase'], segment['start'], segment['end'],
+                     round(segment['end'] - segment['start'], 3), json.dumps(segment['attrs'], ensure_ascii=False),
+                     *offsets))
+    return {'folder': dir_path, 'signature': signature, 'attrs': json.dumps(patient_attrs, ensure_ascii=False),
+            'sources': [sources.get(source) for source in ('audio', 'imu', 'gas')], 'segments': rows,
+            'problems': problems}
+
+
+def open_catalog(db_path):
+    connection = sqlite3.connect(db_path)
+    connection.executescript(CATALOG_SCHEMA)
+    return connection
+
+
+def update_catalog(root, db_path=None, workers=None):
+    '''
+    增量更新root下所有病人的标注索引: 只重建文件有变化的病人, 删除已不存在的病人
+    重建时检查标注一致性(同列重叠、分期不在吞咽内), 问题只作警告, 仍写入索引
+    返回(数据库路径, 更新数, 删除数, 未变化数, 错误列表, 警告列表)
+    '''
+    db_path = db_path or os.path.join(root, CACHE_DIR, CATALOG_FILE)
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    folders = find_patient_folders(root)
+    connection = open_catalog(db_path)
+    known = dict(connection.execute("SELECT folder, signature FROM patients"))
+    changed = [folder for folder in folders if known.get(folder) != folder_signature(folder)]
+    removed = set(known) - set(folders)
+    errors, warnings = [], []
+    with connection:
+        for folder in removed:
+            connection.execute("DELETE FROM segments WHERE folder = ?", (folder,))
+            connection.execute("DELETE FROM patients WHERE folder = ?", (folder,))
+    if changed:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(catalog_folder, folder): folder for folder in changed}
+            for future in as_completed(futures):
+                try:
+                    entry = future.result()
+                except Exception as e:
+                    errors.append(f"{futures[future]}: {e}")
+                    continue
+                warnings += [f"{entry['folder']}: {problem}" for problem in entry['problems']]
+                with connection:
+                    connection.execute("DELETE FROM segments WHERE folder = ?", (entry['folder'],))
+                    connection.execute("INSERT OR REPLACE INTO patients VALUES (?, ?, ?, ?, ?, ?)",
+                                       (entry['folder'], entry['signature'], entry['attrs'], *entry['sources']))
+                    connection.executemany("INSERT INTO segments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                           entry['segments'])
+    connection.close()
+    return db_path, len(changed) - len(errors), len(removed), len(folders) - len(changed), errors, warnings
+
+
+def query_catalog(db_path, where='1', params=()):
+    '''
+    按SQL条件查询片段, 属性用json_extract(attrs, '$.键')访问
+    例: phase = '咽期' AND duration > 1 AND json_extract(attrs, '$.PAS') >= 5
+    '''
+    connection = open_catalog(db_path)
+    connection.row_factory = sqlite3.Row
+    try:
+        rows = connection.execute(f"SELECT * FROM segments WHERE {where} ORDER BY folder, phase, start_time",
+                                  params).fetchall()
+        return [dict(row) for row in rows]
+    finally:
+        connection.close()
+
+
+def run_catalog(root, where=None, workers=None):
+    '''
+    更新标注索引, 给出查询条件时打印匹配的片段, 返回退出码
+    '''
+    start_time = time.perf_counter()
+    db_path, updated, removed, unchanged, errors, warnings = update_catalog(root, workers=workers)
+    print(f"{db_path}: 更新{updated}个, 删除{removed}个, 未变化{unchanged}个病人, 用时{time.perf_counter() - start_time:.2f}s")
+    for error in errors:
+        print(f"    错误: {error}")
+    for warning in warnings:
+        print(f"    警告: {warning}")
+    if where:
+        start_time = time.perf_counter()
+        rows = query_catalog(db_path, where)
+        for row in rows:
+            print(f"{row['folder']} {row['phase']} {row['start_time']}s - {row['end_time']}s "
+                  f"audio[{row['audio_start']}:{row['audio_end']}] imu[{row['imu_start']}:{row['imu_end']}] "
+                  f"gas[{row['gas_start']}:{row['gas_end']}] {row['attrs']}")
+        print(f"共{len(rows)}个片段, 查询用时{(time.perf_counter() - start_time) * 1000:.1f}ms")
+    return 1 if errors else 0
+
+
+EXPORT_INDEX = 'index.csv'
+
+
+def export_folder(dir_path, out_dir, shard):
+    '''
+    导出一个病人的所有标注片段为一个分片: 每个模态的片段按原采样率依次拼接, 存为可内存映射的.npy
+    返回该分片的索引行(各片段在分片数组中的起点和长度)
+    '''
+    sources = patient_sources(dir_path)
+    audio, scale, imu, gas = read_patient_signals(dir_path)
+    _, segments, _ = patient_segments(dir_path, sources)
+    signals = {'audio': audio, 'imu': imu[['X', 'Y', 'Z']].values, 'gas': gas['value'].values}
+    pieces = {source: [] for source in signals}
+    offsets = {source: 0 for source in signals}
+    rows = []
+    for segment in segments:
+        row = {'shard': shard, 'folder': dir_path, 'phase': segment['phase'], 'start': segment['start'],
+               'end': segment['end'], 'attrs': json.dumps(segment['attrs'], ensure_ascii=False)}
+        for source, values in signals.items():
+            begin, end = segment[source]
+            piece = values[begin:end]
+            pieces[source].append(piece)
+            row[f'{source}_offset'], row[f'{source}_length'] = offsets[source], len(piece)
+            offsets[source] += len(piece)
+        rows.append(row)
+    for source, values in signals.items():
+        shape = values.shape[1:]
+        data = np.concatenate(pieces[source]) if pieces[source] else np.zeros((0,) + shape)
+        data = data.astype(np.float32) * np.float32(scale if source == 'audio' else 1)
+        np.save(os.path.join(out_dir, f"shard_{shard:05d}.{source}.npy"), data)
+    return rows
+
+
+def run_export(root, out_dir, workers=None):
+    '''
+    并行导出root下所有病人的标注片段: 每个病人一个分片, 最后写入总索引和采样率信息, 返回退出码
+    读取分片: np.load(f"shard_{shard:05d}.{模态}.npy", mmap_mode='r')[offset:offset + length]
+    '''
+    folders = find_patient_folders(root)
+    if not folders:
+        print(f"{root}: 未找到包含Annotated.json的病人文件夹")
+        return 1
+    os.makedirs(out_dir, exist_ok=True)
+    start_time = time.perf_counter()
+    rows, failed = [], 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(export_folder, folder, out_dir, shard): folder
+                   for shard, folder in enumerate(folders)}
+        for future in as_completed(futures):
+            try:
+                rows += future.result()
+            except Exception as e:
+                print(f"    错误: {futures[future]}: {e}")
+                failed += 1
+    index = pd.DataFrame(rows).sort_values(['shard', 'audio_offset']) if rows else pd.DataFrame()
+    index.to_csv(os.path.join(out_dir, EXPORT_INDEX), index=False)
+    with open(os.path.join(out_dir, 'meta.json'), 'w', encoding='utf-8') as meta_file:
+        json.dump({'samplerates': SEGMENT_SAMPLERATES, 'imu_columns': ['X', 'Y', 'Z'], 'dtype': 'float32',
+                   'shards': len(folders)}, meta_file, ensure_ascii=False, indent=4)
+    elapsed = time.perf_counter() - start_time
+    nbytes = sum(os.path.getsize(os.path.join(out_dir, name)) for name in os.listdir(out_dir) if name.endswith('.npy'))
+    print(f"导出{len(folders) - failed}个病人, {len(rows)}个片段, {nbytes / 1024 / 1024:.1f}MB, 失败{failed}个, "
+          f"用时{elapsed:.2f}s ({len(folders) / elapsed * 60:.1f}病人/分钟, {nbytes / 1024 / 1024 / elapsed:.1f}MB/s)")
+    return 1 if failed else 0
+
+
+# 界面相关的类和函数在segmentation_gui中, 仍可从本模块导入(按需导入界面模块, 批量命令行不依赖PyQt5)
+GUI_EXPORTS = ('State', 'show_message', 'Console', 'TreeWidget', 'PrefetchTask', 'LoadTask', 'PatientLoader',
+               'IndexTask', 'SignalIndexer', 'PlotBackend', 'MplCanvas', 'PgCanvas', 'PLOT_BACKENDS',
+               'set_plot_backend', 'create_canvas', 'SpectrogramTask', 'SpectrogramPanel', 'DynamicPlot_Audio',
+               'DynamicPlot_Gas', 'DynamicPlot_Imu', 'DynamicPlot', 'OverviewStrip', 'VideoWidget', 'MasterClock',
+               'AnnotationTableModel', 'DataTableWidget', 'Mainwindows', 'format_time', 'run_application',
+               'run_benchmark')
+
+
+def __getattr__(name):
+    if name in GUI_EXPORTS:
+        import segmentation_gui
+        return getattr(segmentation_gui, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def main(argv=None):
+    '''
+    命令行入口, 返回退出码
+    '''
+    parser = argparse.ArgumentParser(description="吞咽分割检测系统")
+    parser.add_argument('--backend', choices=['matplotlib', 'pyqtgraph'], default='matplotlib', help="绘图后端")
+    parser.add_argument('--benchmark', action='store_true', help="对比各绘图后端帧率")
+    parser.add_argument('--cache-mb', type=int, default=1024, help="病人数据缓存内存预算(MB)")
+    parser.add_argument('--sync-log', metavar='CSV', help="退出时保存各播放器相对主时钟的偏差记录并打印统计")
+    parser.add_argument('--preprocess', metavar='ROOT', help="无界面批量预计算ROOT下所有病人的缓存")
+    parser.add_argument('--workers', type=int, default=None, help="批量预处理/分割进程数, 默认为CPU核数")
+    parser.add_argument('--segment', metavar='ROOT', help="无界面批量对ROOT下所有病人运行模型分割")
+    parser.add_argument('--model', choices=SEGMENT_MODELS, default=SEGMENT_MODELS[0], help="批量分割使用的模型")
+    parser.add_argument('--task', nargs='+', choices=list(SEGMENT_LABELS), default=list(SEGMENT_LABELS),
+                        help="批量分割任务")
+    parser.add_argument('--force', action='store_true', help="重新分割已用同版本模型分割过的病人")
+    parser.add_argument('--stream', metavar='DIR', help="按真实时间回放DIR病人数据测试在线分割")
+    parser.add_argument('--latency', type=int, default=500, help="在线分割判定延迟(ms)")
+    parser.add_argument('--speed', type=float, default=1.0, help="回放倍速, 0为不等待")
+    parser.add_argument('--catalog', metavar='ROOT', help="增量更新ROOT下所有病人的标注索引(SQLite)")
+    parser.add_argument('--query', metavar='WHERE', help="按SQL条件查询标注索引中的片段")
+    parser.add_argument('--export', metavar='ROOT', help="导出ROOT下所有标注片段为分片数据集")
+    parser.add_argument('--out', metavar='DIR', default='dataset', help="数据集导出目录")
+    args, _ = parser.parse_known_args(argv)
+    if args.preprocess:
+        return run_preprocess(args.preprocess, args.workers)
+    elif args.segment:
+        return run_segment(args.segment, args.model, args.task, args.workers, args.force)
+    elif args.stream:
+        return run_stream(args.stream, args.model, args.latency, args.speed)
+    elif args.catalog:
+        return run_catalog(args.catalog, args.query, args.workers)
+    elif args.export:
+        return run_export(args.export, args.out, args.workers)
+    elif args.benchmark:
+        from segmentation_gui import run_benchmark  # 界面模块依赖PyQt5, 只在需要界面时导入
+        run_benchmark()
+    else:
+        from segmentation_gui import run_application
+        run_application(args.backend, args.cache_mb, args.sync_log)
+    return 0
 
 
 if __name__ == "__main__":
-    run_application()
+    # 直接运行时本模块名为__main__, 登记为segmentation_system, 界面模块导入时不再重复执行本模块
+    sys.modules.setdefault('segmentation_system', sys.modules[__name__])
+    sys.exit(main())
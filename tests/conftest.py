@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def write_wav(path, samples, samplerate=16000, format_tag=1, sub_format=None):
+    '''
+    写入WAV: samples为(采样数[, 通道数])数组, 按其dtype写入; sub_format给出时写为WAVE_FORMAT_EXTENSIBLE
+    '''
+    samples = np.asarray(samples)
+    channels = 1 if samples.ndim == 1 else samples.shape[1]
+    width = samples.dtype.itemsize
+    fmt = struct.pack('<HHIIHH', format_tag if sub_format is None else 0xFFFE, channels, samplerate,
+                      samplerate * channels * width, channels * width, width * 8)
+    if sub_format is not None:
+        fmt += struct.pack('<HHI', 22, width * 8, 0) + sub_format
+    data = samples.tobytes()
+    body = b'WAVE' + b'fmt ' + struct.pack('<I', len(fmt)) + fmt + b'data' + struct.pack('<I', len(data)) + data
+    with open(path, 'wb') as wav_file:
+        wav_file.write(b'RIFF' + struct.pack('<I', len(body)) + body)
+
+
+@pytest.fixture
+def patient_dir(tmp_path):
+    '''
+    合成病人文件夹: 30秒音频(16kHz), imu(1kHz), 气流量(100Hz), 音频在10~12秒和20~21秒有强信号
+    '''
+    rng = np.random.default_rng(0)
+    duration = 30
+    audio = rng.normal(scale=0.01, size=duration * 16000)
+    audio[10 * 16000:12 * 16000] *= 50
+    audio[20 * 16000:21 * 16000] *= 50
+    write_wav(tmp_path / 'audio.wav', (np.clip(audio, -1, 1) * 32767).astype('<i2'))
+    times = np.arange(duration * 1000)
+    with open(tmp_path / 'imu.csv', 'w') as imu_file:
+        imu_file.write('time,X,Y,Z\n')
+        imu_file.writelines(f"{t},{x:.4f},{y:.4f},{z:.4f}\n" for t, (x, y, z)
+                            in zip(times, rng.normal(size=(len(times), 3))))
+    with open(tmp_path / 'gas.csv', 'w') as gas_file:
+        gas_file.write('time,value\n')
+        gas_file.writelines(f"{t},{v:.4f}\n" for t, v in zip(times[::10], rng.normal(size=len(times) // 10)))
+    with open(tmp_path / 'Annotated.json', 'w', encoding='utf-8') as json_file:
+        json.dump({'吞咽': [{'start': 10.0, 'end': 12.0}], '口腔期': []}, json_file, ensure_ascii=False)
+    return str(tmp_path)
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import random
+
+import pytest
+
+from segmentation_system import AnnotationStore
+
+
+@pytest.fixture
+def json_path(tmp_path):
+    path = tmp_path / 'Annotated.json'
+    path.write_text(json.dumps({'吞咽': [{'start': 1.0, 'end': 2.0}], '咽期': [], 'PAS': 3}, ensure_ascii=False),
+                    encoding='utf-8')
+    return str(path)
+
+
+def random_segments(rng, count):
+    segments = []
+    for _ in range(count):
+        start = round(rng.uniform(0, 100), 1)
+        segments.append({'start': start, 'end': round(start + rng.uniform(0, 15), 1)})
+    return segments
+
+
+def crash(store):
+    '''
+    模拟崩溃: 关闭日志但不合并
+    '''
+    store.journal.close()
+    store.journal = None
+
+
+def keys(store, column='吞咽'):
+    return list(store.indexes[column].keys)
+
+
+def test_journal_replayed_after_crash(json_path):
+    store = AnnotationStore.open(json_path)
+    store.insert('吞咽', 3.0, 4.0)
+    store.remove('吞咽', 0)
+    crash(store)
+    recovered = AnnotationStore.open(json_path)
+    assert keys(recovered) == [(3.0, 4.0)]
+    assert recovered.json_dict['PAS'] == 3
+
+
+def test_crash_between_replace_and_journal_removal(json_path):
+    store = AnnotationStore.open(json_path)
+    store.insert('吞咽', 3.0, 4.0)
+    crash(store)
+    with open(store.journal_path, 'rb') as journal_file:
+        journal = journal_file.read()
+    store.compact()
+    # 替换Annotated.json后、删除日志前崩溃
+    with open(store.journal_path, 'wb') as journal_file:
+        journal_file.write(journal)
+    recovered = AnnotationStore.open(json_path)
+    assert keys(recovered) == [(1.0, 2.0), (3.0, 4.0)]
+    assert not os.path.exists(recovered.journal_path)
+
+
+def test_reopen_edit_crash_recover(json_path):
+    # 打开同一文件时旧存储尚有日志, 随后旧存储合并改写文件
+    live = AnnotationStore.open(json_path)
+    live.insert('吞咽', 3.0, 4.0)
+    reopened = AnnotationStore.open(json_path)
+    live.compact()
+    reopened.insert('咽期', 1.2, 1.8)
+    crash(reopened)
+    recovered = AnnotationStore.open(json_path)
+    assert keys(recovered) == [(1.0, 2.0), (3.0, 4.0)]
+    assert keys(recovered, '咽期') == [(1.2, 1.8)]
+
+
+def test_compact_without_edits_keeps_file(json_path):
+    with open(json_path, 'rb') as json_file:
+        before = json_file.read()
+    AnnotationStore.open(json_path).compact()
+    with open(json_path, 'rb') as json_file:
+        assert json_file.read() == before
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_journal_replay_matches_brute_force(tmp_path, seed):
+    rng = random.Random(seed)
+    json_path = str(tmp_path / 'Annotated.json')
+    initial = {'吞咽': random_segments(rng, 10), '咽期': random_segments(rng, 5), 'PAS': 2}
+    with open(json_path, 'w', encoding='utf-8') as json_file:
+        json.dump(initial, json_file, ensure_ascii=False)
+    expected = {name: sorted((segment['start'], segment['end']) for segment in segments)
+                for name, segments in initial.items() if isinstance(segments, list)}
+    store = AnnotationStore.open(json_path)
+    for _ in range(100):
+        column = rng.choice(list(expected))
+        if expected[column] and rng.random() < 0.4:
+            row = rng.randrange(len(expected[column]))
+            store.remove(column, row)
+            del expected[column][row]
+        else:
+            start = round(rng.uniform(0, 100), 1)
+            end = round(start + rng.uniform(0, 5), 1)
+            store.insert(column, start, end)
+            expected[column] = sorted(expected[column] + [(start, end)])
+    crash(store)
+    recovered = AnnotationStore.open(json_path)
+    assert {name: index.keys for name, index in recovered.indexes.items()} == expected
+    recovered.compact()
+    assert {name: index.keys for name, index in AnnotationStore.open(json_path).indexes.items()} == expected
+    assert AnnotationStore.open(json_path).json_dict['PAS'] == 2
+
+
+def test_consistency_problems_match_brute_force(tmp_path):
+    json_path = str(tmp_path / 'Annotated.json')
+    with open(json_path, 'w', encoding='utf-8') as json_file:
+        json.dump({'吞咽': [{'start': 1.0, 'end': 3.0}, {'start': 2.5, 'end': 4.0}],
+                   '咽期': [{'start': 1.5, 'end': 2.0}, {'start': 3.5, 'end': 5.0}]}, json_file, ensure_ascii=False)
+    problems = AnnotationStore.open(json_path).check_consistency()
+    assert problems == ["吞咽 2.5s - 4.0s 与前一片段重叠", "咽期 3.5s - 5.0s 不在任何吞咽片段内"]
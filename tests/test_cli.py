@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+import ast
+import os
+import subprocess
+import sys
+
+import pytest
+
+import segmentation_system
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_gui_exports_are_defined_in_gui_module():
+    with open(os.path.join(ROOT, 'segmentation_gui.py'), encoding='utf-8') as gui_file:
+        tree = ast.parse(gui_file.read())
+    defined = {node.name for node in tree.body if isinstance(node, (ast.FunctionDef, ast.ClassDef))}
+    defined |= {target.id for node in tree.body if isinstance(node, ast.Assign)
+                for target in node.targets if isinstance(target, ast.Name)}
+    assert set(segmentation_system.GUI_EXPORTS) <= defined
+    with pytest.raises(AttributeError):
+        segmentation_system.no_such_name
+
+
+def test_main_runs_batch_commands(patient_dir, capsys):
+    assert segmentation_system.main(['--catalog', patient_dir]) == 0
+    assert '更新1个' in capsys.readouterr().out
+
+
+def test_script_batch_run_does_not_import_qt(patient_dir):
+    code = ("import runpy, sys; sys.argv = ['segmentation_system.py', '--catalog', sys.argv[1]]\n"
+            "try:\n    runpy.run_path(sys.argv[0], run_name='__main__')\n"
+            "except SystemExit as e:\n    print(e.code, any(name.startswith('PyQt5') for name in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code, patient_dir], cwd=ROOT,
+                            capture_output=True, text=True)
+    assert result.stdout.split()[-2:] == ['0', 'False']
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from segmentation_system import EnvelopePyramid, RangeIndex, direct_envelope
+
+
+@pytest.fixture(params=[1, 3])
+def data(request):
+    rng = np.random.default_rng(request.param)
+    shape = (1013,) if request.param == 1 else (1013, request.param)
+    return rng.normal(size=shape)
+
+
+@pytest.mark.parametrize('window', [1, 7, 64, 1013])
+def test_range_index_matches_brute_force(data, window):
+    index = RangeIndex(data, window)
+    starts = np.arange(len(data) - window + 1)
+    expected = [(data[start:start + window].min(), data[start:start + window].max()) for start in starts]
+    assert [index.query(start) for start in starts] == expected
+    mins, maxs = index.query_many(starts)
+    assert np.array_equal(mins, [low for low, _ in expected])
+    assert np.array_equal(maxs, [high for _, high in expected])
+
+
+def brute_buckets(values, bucket, first, last):
+    chunks = [values[i * bucket:min((i + 1) * bucket, len(values))] for i in range(first, last)]
+    return [chunk.min() for chunk in chunks], [chunk.max() for chunk in chunks]
+
+
+@pytest.mark.parametrize('start, length, width', [(0, 1013, 50), (100, 500, 40), (37, 911, 7), (5, 30, 20)])
+def test_pyramid_envelope_matches_brute_force(start, length, width):
+    values = np.random.default_rng(0).normal(size=1013)
+    pyramid = EnvelopePyramid(values)
+    x, y = pyramid.envelope(start, length, width)
+    if length <= 2 * width:
+        assert np.array_equal(y, values[start:start + length])
+        return
+    bucket = next(bucket for bucket, _, _ in pyramid.levels if bucket * width >= length)
+    first, last = start // bucket, -(-(start + length) // bucket)
+    mins, maxs = brute_buckets(values, bucket, first, last)
+    assert np.array_equal(y[0::2], mins) and np.array_equal(y[1::2], maxs)
+    assert len(y) <= 2 * (width + 2)
+    # 峰值不丢失
+    window = values[start:start + length]
+    assert y.min() <= window.min() and y.max() >= window.max()
+    x_direct, y_direct = direct_envelope(values, start, length, width)
+    assert y_direct.min() == window.min() and y_direct.max() == window.max()
+    assert len(x_direct) == len(y_direct)
+
+
+@pytest.mark.parametrize('start, length', [(0, 1013), (200, 100), (3, 40), (900, 113)])
+def test_pyramid_extent_covers_window(start, length):
+    values = np.random.default_rng(2).normal(size=1013)
+    low, high = EnvelopePyramid(values).extent(start, length)
+    window = values[start:start + length]
+    assert low <= window.min() and high >= window.max()
+    assert low >= values.min() and high <= values.max()
+
+
+@pytest.mark.parametrize('size', [1, 2, 5, 1013, 1024])
+def test_pyramid_flat_round_trip(size):
+    values = np.random.default_rng(size).normal(size=size)
+    pyramid = EnvelopePyramid(values)
+    restored = EnvelopePyramid.from_flat(values, *pyramid.flat())
+    assert len(restored.levels) == len(pyramid.levels)
+    for (bucket, mins, maxs), (expected_bucket, expected_mins, expected_maxs) in zip(restored.levels,
+                                                                                      pyramid.levels):
+        assert bucket == expected_bucket
+        assert np.array_equal(mins, expected_mins) and np.array_equal(maxs, expected_maxs)
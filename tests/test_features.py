@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+
+import numpy as np
+
+import segmentation_system
+from segmentation_system import (CACHE_DIR, FEATURE_PARAMS, FeatureCache, SEGMENT_SAMPLERATES, audio_features,
+                                 build_spectrogram, load_spectrogram, patient_features, read_audio,
+                                 read_patient_signals)
+
+
+def spectrogram_of(patient_dir, cache):
+    audio_path = os.path.join(patient_dir, 'audio.wav')
+    audio, scale = read_audio(audio_path, SEGMENT_SAMPLERATES['audio'])
+    spectrogram = load_spectrogram(audio_path, len(audio), SEGMENT_SAMPLERATES['audio'], **FEATURE_PARAMS)
+    build_spectrogram(audio_path, spectrogram, audio, scale, cache=cache)
+    return spectrogram
+
+
+def test_patient_features_match_uncached(patient_dir):
+    cache = FeatureCache(64)
+    features = patient_features(patient_dir, cache)
+    expected = patient_features(patient_dir, None)
+    for modality in expected:
+        for name in expected[modality]:
+            assert np.array_equal(features[modality][name], expected[modality][name])
+    assert patient_features(patient_dir, cache)['audio'] is features['audio']
+
+
+def test_spectrogram_shares_audio_features(patient_dir, monkeypatch):
+    cache = FeatureCache(64)
+    spectrogram = spectrogram_of(patient_dir, cache)
+    # 谱图面板算好的音频特征被patient_features直接使用
+    audio, scale = read_patient_signals(patient_dir)[:2]
+    expected = audio_features(audio, scale, SEGMENT_SAMPLERATES['audio'], **FEATURE_PARAMS)
+    features = patient_features(patient_dir, cache)['audio']
+    assert all(np.array_equal(features[name], expected[name]) for name in expected)
+
+    # 反之, 已缓存的音频特征直接量化为谱图, 不重复做STFT
+    shutil.rmtree(os.path.join(patient_dir, CACHE_DIR))
+    monkeypatch.setattr(segmentation_system, 'stft_logmel', None)
+    rebuilt = spectrogram_of(patient_dir, cache)
+    assert rebuilt.complete and np.array_equal(rebuilt.image, spectrogram.image)
+
+
+def test_cancelled_spectrogram_is_not_cached(patient_dir):
+    cache = FeatureCache(64)
+    audio_path = os.path.join(patient_dir, 'audio.wav')
+    audio, scale = read_audio(audio_path, SEGMENT_SAMPLERATES['audio'])
+    spectrogram = load_spectrogram(audio_path, len(audio), SEGMENT_SAMPLERATES['audio'], **FEATURE_PARAMS)
+    spectrogram.cancelled = True
+    build_spectrogram(audio_path, spectrogram, audio, scale, cache=cache)
+    assert cache.cached([audio_path], **spectrogram.params) is None and not spectrogram.complete
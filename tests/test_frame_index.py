@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from segmentation_system import FrameIndex
+
+
+@pytest.fixture
+def frames():
+    times = np.arange(100) * 33.37
+    return FrameIndex(times, [0, 30, 60, 90])
+
+
+def test_frame_at_matches_brute_force(frames):
+    for position in np.linspace(-10, 3500, 700):
+        shown = [frame for frame, time in enumerate(frames.times) if time <= position]
+        assert frames.frame_at(position) == (shown[-1] if shown else 0)
+
+
+def test_keyframe_before_matches_brute_force(frames):
+    for position in np.linspace(-10, 3500, 700):
+        frame = frames.frame_at(position)
+        keyframe = max((key for key in frames.keyframes if key <= frame), default=0)
+        assert frames.keyframe_before(position) == frames.time_of(keyframe)
+        assert frames.keyframe_before(position) <= max(position, 0) + 1
+
+
+def test_empty_index_returns_position():
+    frames = FrameIndex(np.zeros(0), np.zeros(0, dtype=np.int64))
+    assert len(frames) == 0
+    assert frames.keyframe_before(1234.5) == 1234
+    frames = FrameIndex(np.arange(10) * 40.0, np.zeros(0, dtype=np.int64))
+    assert frames.keyframe_before(100) == 80
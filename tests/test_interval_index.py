@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+
+from segmentation_system import IntervalIndex
+
+
+def random_segments(rng, count):
+    segments = []
+    for _ in range(count):
+        start = round(rng.uniform(0, 100), 1)
+        segments.append({'start': start, 'end': round(start + rng.uniform(0, 15), 1)})
+    return segments
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_queries_match_brute_force(seed):
+    rng = random.Random(seed)
+    index = IntervalIndex(random_segments(rng, 60))
+    keys = list(index.keys)
+    assert keys == sorted(keys)
+    for _ in range(200):
+        time_point = round(rng.uniform(-5, 120), 1)
+        assert index.at(time_point) == [row for row, (start, end) in enumerate(keys) if start <= time_point <= end]
+        start = round(rng.uniform(-5, 120), 1)
+        end = round(start + rng.uniform(0, 20), 1)
+        assert index.overlapping(start, end) == [row for row, (low, high) in enumerate(keys)
+                                                 if low < end and high > start]
+        assert index.covers(start, end) == any(low <= start and high >= end for low, high in keys)
+
+
+def test_edits_keep_order_and_shared_list():
+    rng = random.Random(7)
+    segments = []
+    index = IntervalIndex(segments)
+    expected = []
+    for _ in range(300):
+        if expected and rng.random() < 0.4:
+            key = rng.choice(expected)
+            row = index.find(*key)
+            assert index.keys[row] == key
+            index.remove(row)
+            expected.remove(key)
+        else:
+            start = round(rng.uniform(0, 50), 1)
+            key = (start, round(start + rng.uniform(0, 5), 1))
+            row = index.insert(*key)
+            assert index.keys[row] == key
+            expected.append(key)
+        expected.sort()
+        assert index.keys == expected
+        # 片段列表与标注字典共享, 修改后仍有序
+        assert [(segment['start'], segment['end']) for segment in segments] == expected
+        assert list(index.max_ends) == [max(end for _, end in expected[:row + 1]) for row in range(len(expected))]
+    assert index.find(-1.0, 0.0) is None
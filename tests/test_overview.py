@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+import segmentation_system
+from segmentation_system import prepare_table
+
+
+def test_table_overview_computed_once(tmp_path, monkeypatch):
+    path = tmp_path / 'imu.csv'
+    rng = np.random.default_rng(0)
+    with open(path, 'w') as imu_file:
+        imu_file.write('time,X,Y,Z\n')
+        imu_file.writelines(f"{t},{x:.4f},{y:.4f},{z:.4f}\n"
+                            for t, (x, y, z) in enumerate(rng.normal(size=(5000, 3))))
+    calls = []
+    table_envelope = segmentation_system.table_envelope
+    monkeypatch.setattr(segmentation_system, 'table_envelope',
+                        lambda *args: calls.append(args) or table_envelope(*args))
+    first = prepare_table(str(path), ['X', 'Y', 'Z'], 1000)
+    second = prepare_table(str(path), ['X', 'Y', 'Z'], 1000)
+    # 第二次命中概览缓存, 不再计算幅值
+    assert len(calls) == 1
+    values = first['data'][['X', 'Y', 'Z']].values
+    magnitude = np.sqrt(np.square(values).sum(axis=1))
+    for envelope in (first['overview'], second['overview']):
+        _, mins, maxs = envelope.levels[0]
+        assert np.allclose(mins, [magnitude[i:i + 10].min() for i in range(0, 5000, 10)])
+        assert np.allclose(maxs, [magnitude[i:i + 10].max() for i in range(0, 5000, 10)])
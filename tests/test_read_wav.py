@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import struct
+
+import numpy as np
+import pytest
+
+from conftest import write_wav
+from segmentation_system import WAV_GUID_SUFFIX, read_audio, read_wav
+
+
+def guid(format_tag):
+    return struct.pack('<H', format_tag) + WAV_GUID_SUFFIX
+
+
+def normalised(path):
+    samplerate, data, scale = read_wav(path)
+    return samplerate, np.asarray(data, dtype=np.float64) * scale
+
+
+def test_unsigned_8bit_is_centred(tmp_path):
+    path = tmp_path / 'u8.wav'
+    write_wav(path, np.array([0, 64, 128, 192, 255], dtype=np.uint8))
+    _, values = normalised(path)
+    assert np.array_equal(values, (np.array([0, 64, 128, 192, 255]) - 128) / 128)
+
+
+@pytest.mark.parametrize('dtype, format_tag, full_scale', [('<i2', 1, 2 ** 15), ('<i4', 1, 2 ** 31),
+                                                           ('<f4', 3, 1), ('<f8', 3, 1)])
+@pytest.mark.parametrize('extensible', [False, True])
+def test_formats_match_reference(tmp_path, dtype, format_tag, full_scale, extensible):
+    rng = np.random.default_rng(0)
+    if format_tag == 1:
+        samples = rng.integers(np.iinfo(dtype).min, np.iinfo(dtype).max, size=(1000, 2), dtype=dtype)
+    else:
+        samples = rng.uniform(-1, 1, size=(1000, 2)).astype(dtype)
+    path = tmp_path / 'signal.wav'
+    write_wav(path, samples, 8000, format_tag, guid(format_tag) if extensible else None)
+    samplerate, values = normalised(path)
+    assert samplerate == 8000
+    # 只取第一通道
+    assert np.array_equal(values, samples[:, 0].astype(np.float64) / full_scale)
+
+
+def test_unknown_extensible_subformat_is_rejected(tmp_path):
+    path = tmp_path / 'alaw.wav'
+    write_wav(path, np.zeros(100, dtype=np.uint8), sub_format=guid(6))  # A律
+    with pytest.raises(ValueError):
+        read_wav(path)
+    path = tmp_path / 'vendor.wav'
+    write_wav(path, np.zeros(100, dtype='<i2'), sub_format=b'\x01' * 16)
+    with pytest.raises(ValueError):
+        read_wav(path)
+
+
+def test_read_audio_keeps_memmap_for_matching_rate(tmp_path):
+    path = tmp_path / 'audio.wav'
+    samples = np.arange(-500, 500, dtype='<i2')
+    write_wav(path, samples)
+    data, scale = read_audio(str(path), 16000)
+    assert isinstance(data, np.memmap)
+    assert np.array_equal(data * scale, samples / 2 ** 15)
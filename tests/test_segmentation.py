@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+import segmentation_system
+from segmentation_system import SEGMENT_LABELS, read_predictions, segment_folder, segment_model_version
+
+
+@pytest.fixture
+def baseline_model(tmp_path_factory, monkeypatch):
+    '''
+    模型目录为空, 使用NumPy基线模型
+    '''
+    monkeypatch.setattr(segmentation_system, 'MODEL_DIR', str(tmp_path_factory.mktemp('models')))
+    monkeypatch.setattr(segmentation_system, 'SEGMENT_MODEL_CACHE', {})
+
+
+def overlaps(segment, start, end):
+    return segment['start'] < end and segment['end'] > start
+
+
+def test_numpy_model_end_to_end(patient_dir, baseline_model):
+    annotation_path = os.path.join(patient_dir, 'Annotated.json')
+    with open(annotation_path, 'rb') as json_file:
+        before = json_file.read()
+    tasks = list(SEGMENT_LABELS)
+    versions = {task: segment_model_version('CFSCNet', task) for task in tasks}
+    assert versions == {task: 'numpy-baseline' for task in tasks}
+    report = segment_folder(patient_dir, 'CFSCNet', tasks, versions)
+    assert report['errors'] == []
+    results = read_predictions(patient_dir)['CFSCNet']
+    assert set(results) == set(tasks)
+    swallows = results['swallow']['segments']['吞咽']
+    # 两段强信号各对应一个吞咽片段, 其他时间无吞咽
+    assert len(swallows) == 2
+    assert overlaps(swallows[0], 10, 12) and overlaps(swallows[1], 20, 21)
+    assert all(segment['start'] >= 9 and segment['end'] <= 22 for segment in swallows)
+    assert set(results['detail']['segments']) == set(SEGMENT_LABELS['detail'])
+    with open(annotation_path, 'rb') as json_file:
+        assert json_file.read() == before
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from segmentation_system import PaddedSignal, RangeIndex, SignalWindow, audio_window_ends, build_pyramids
+
+
+@pytest.fixture(params=[(), (3,)])
+def recording(tmp_path, request):
+    '''
+    内存映射的采样数据, 单通道或三通道
+    '''
+    shape = (5003,) + request.param
+    values = np.memmap(tmp_path / 'values.dat', dtype='<i2', mode='w+', shape=shape)
+    values[:] = np.random.default_rng(0).integers(-1000, 1000, size=shape)
+    values.flush()
+    return np.memmap(tmp_path / 'values.dat', dtype='<i2', mode='r', shape=shape)
+
+
+def reference(values, padding, tail):
+    zeros = np.zeros((padding,) + values.shape[1:], dtype=values.dtype)
+    return np.concatenate((zeros, values, np.zeros((tail,) + values.shape[1:], dtype=values.dtype)))
+
+
+def test_padded_signal_slices_match_concatenation(recording):
+    padded = PaddedSignal(recording, 700, 13)
+    expected = reference(recording, 700, 13)
+    assert len(padded) == len(expected) and padded.nbytes == 0
+    assert np.array_equal(np.asarray(padded), expected)
+    for start, stop in [(0, 10), (690, 710), (700, 800), (5600, 5716), (0, 5716), (3000, 3000), (5710, 6000)]:
+        assert np.array_equal(padded[start:stop], expected[start:stop])
+    assert padded[-1].tolist() == expected[-1].tolist() and padded[701].tolist() == expected[701].tolist()
+    # 落在原始数据内的切片不复制
+    assert isinstance(padded[1000:2000], np.memmap)
+    if recording.ndim > 1:
+        column = padded[:, 1]
+        assert isinstance(column, PaddedSignal)
+        assert np.array_equal(column[650:760], expected[650:760, 1])
+
+
+def test_signal_window_matches_padded_copy(recording):
+    window_ends, tail = audio_window_ends(len(recording), 240)
+    signal_window = SignalWindow(recording, window_ends, 480, tail, padding=1200)
+    expected = reference(recording, 1200, tail)
+    ranges = RangeIndex(expected, 480)
+    for index in range(signal_window.totalIndex + 1):
+        start = int(window_ends[index]) + 1200 - 480
+        assert np.array_equal(signal_window.window(index), expected[start:start + 480])
+        assert signal_window.yrange(index) == ranges.query(start)
+    assert np.array_equal(signal_window.step_yranges()[0], ranges.query_many(window_ends + 1200 - 480)[0])
+    pyramids = build_pyramids(signal_window.padded_data)
+    columns = [expected] if expected.ndim == 1 else [expected[:, i] for i in range(expected.shape[1])]
+    for pyramid, column in zip(pyramids, columns):
+        assert np.array_equal(pyramid.envelope(900, 3000, 100)[1],
+                              build_pyramids(column)[0].envelope(900, 3000, 100)[1])
+        assert np.array_equal(pyramid.envelope(900, 100, 100)[1], column[900:1000])
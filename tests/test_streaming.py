@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+import segmentation_system
+from segmentation_system import RingBuffer, SEGMENT_SAMPLERATES, StreamingSegmenter, segment_signals
+
+
+class EnergyModel:
+    '''
+    无状态模型: 音频窗口RMS超过0.5为吞咽
+    '''
+
+    def run(self, windows):
+        rms = np.concatenate([np.sqrt(np.mean(np.square(audio), axis=1)) for audio, _, _ in windows])
+        return np.column_stack((np.full_like(rms, 0.5), rms))
+
+    def online(self):
+        return self
+
+
+@pytest.fixture
+def signals(monkeypatch):
+    monkeypatch.setattr(segmentation_system, 'SEGMENT_MODEL_CACHE', {('energy', 'swallow'): EnergyModel()})
+    rng = np.random.default_rng(1)
+    duration = 40
+    audio = (rng.normal(size=duration * 16000) * 0.1).astype(np.float32)
+    for start, end in ((0, 2), (10, 13), (30, 31)):
+        audio[start * 16000:end * 16000] *= 20
+    times = np.arange(duration * 1000)
+    imu = pd.DataFrame({'time': times, 'X': rng.random(len(times)), 'Y': 0.0, 'Z': 0.0})
+    gas = pd.DataFrame({'time': times[::10], 'value': rng.random(len(times) // 10)})
+    return audio, imu, gas
+
+
+def stream(segmenter, audio, imu, gas, chunks):
+    '''
+    按chunks给出的(模态, 起点ms, 终点ms)顺序推入, 返回全部事件
+    '''
+    values = {'audio': audio, 'imu': imu[['X', 'Y', 'Z']].values, 'gas': gas['value'].values}
+    events = []
+    for name, begin, end in chunks:
+        rate = SEGMENT_SAMPLERATES[name]
+        events += segmenter.push(name, values[name][begin * rate // 1000:end * rate // 1000])
+    return events + segmenter.finish()
+
+
+def interleaved(duration, start=0, chunk_ms=15):
+    return [(name, begin, min(begin + chunk_ms, duration))
+            for begin in range(start, duration, chunk_ms) for name in ('audio', 'imu', 'gas')]
+
+
+def to_segments(events):
+    starts = [event['time'] for event in events if event['type'] == 'start']
+    ends = [event['time'] for event in events if event['type'] == 'end']
+    return [{'start': round(start, 3), 'end': round(end, 3)} for start, end in zip(starts, ends)]
+
+
+def test_ring_buffer_matches_concatenation():
+    rng = np.random.default_rng(0)
+    buffer = RingBuffer(50)
+    written = []
+    for size in rng.integers(0, 80, 40):
+        chunk = rng.random(size).astype(np.float32)
+        buffer.extend(chunk)
+        written.extend(chunk)
+        start = max(len(written) - 50, 0)
+        assert np.array_equal(buffer.read(start, len(written) - start), written[start:])
+
+
+def test_stream_matches_offline_for_stateless_model(signals):
+    audio, imu, gas = signals
+    offline = segment_signals('energy', 'swallow', audio, 1.0, imu, gas)['吞咽']
+    segmenter = StreamingSegmenter('energy', latency=1000)
+    assert to_segments(stream(segmenter, audio, imu, gas, interleaved(40000))) == offline
+    assert offline[0]['start'] == 0.0
+
+
+@pytest.mark.parametrize('latency', [100, 500])
+def test_events_delayed_by_latency(signals, latency):
+    audio, imu, gas = signals
+    events = stream(StreamingSegmenter('energy', latency=latency), audio, imu, gas, interleaved(40000))
+    # 首个吞咽从0秒开始, 在首个窗口完整时判定
+    assert events[0] == {'type': 'start', 'time': 0.0, 'decided': 1.0}
+    assert all(event['decided'] - event['time'] == pytest.approx(latency / 1000) for event in events[1:-1])
+    assert len(events) == 6
+
+
+def test_lagging_modality_within_skew_waits(signals):
+    audio, imu, gas = signals
+    segmenter = StreamingSegmenter('energy', latency=1000, max_skew=5000)
+    chunks = [(name, 0, 5000) for name in ('audio', 'imu', 'gas')] + interleaved(40000, 5000)
+    events = stream(segmenter, audio, imu, gas, chunks)
+    assert segmenter.dropped == 0
+    assert to_segments(events) == segment_signals('energy', 'swallow', audio, 1.0, imu, gas)['吞咽']
+
+
+def test_lagging_modality_beyond_skew_drops_windows(signals):
+    audio, imu, gas = signals
+    segmenter = StreamingSegmenter('energy', latency=1000, max_skew=2000)
+    chunks = [(name, 0, 5000) for name in ('audio', 'imu', 'gas')] + interleaved(40000, 5000)
+    events = stream(segmenter, audio, imu, gas, chunks)
+    assert segmenter.dropped > 0
+    # 丢弃的窗口只影响开头, 之后的吞咽照常检测
+    assert to_segments(events)[-2:] == [{'start': 9.5, 'end': 13.5}, {'start': 29.5, 'end': 31.5}]